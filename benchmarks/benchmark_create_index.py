@@ -0,0 +1,120 @@
+"""Benchmark Dataset.create_index against the previous per-image glob implementation and the index cache.
+
+Usage:
+    python benchmarks/benchmark_create_index.py --image_num 100000
+    python benchmarks/benchmark_create_index.py --image_num 100000 --storage sqlite --skip_legacy
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from waffle_hub import TaskType
+from waffle_hub.dataset import Dataset
+from waffle_hub.schema.fields import Annotation, Category, Image
+
+
+def create_records_only_dummy(
+    root_dir: Path, image_num: int, category_num: int, unlabeled_ratio: float, storage: str
+) -> Dataset:
+    """Dummy object detection dataset without raw images (create_index never reads them)."""
+    ds = Dataset.new(
+        name=f"benchmark_{image_num}",
+        task=TaskType.OBJECT_DETECTION,
+        root_dir=root_dir,
+        storage=storage,
+    )
+    ds.add_categories(
+        [
+            Category.object_detection(category_id=i, name=f"category_{i}", supercategory="object")
+            for i in range(1, category_num + 1)
+        ]
+    )
+
+    images, annotations = [], []
+    annotation_id = 1
+    for image_id in range(1, image_num + 1):
+        images.append(
+            Image(image_id=image_id, file_name=f"image_{image_id}.jpg", width=100, height=100)
+        )
+        if random.random() < unlabeled_ratio:
+            continue
+        for _ in range(random.randint(1, 3)):
+            annotations.append(
+                Annotation.object_detection(
+                    annotation_id=annotation_id,
+                    image_id=image_id,
+                    category_id=random.randint(1, category_num),
+                    bbox=[10, 10, 20, 20],
+                )
+            )
+            annotation_id += 1
+
+    ds.add_images(images)
+    ds.add_annotations(annotations)
+    return ds
+
+
+def legacy_index_reads(ds: Dataset):
+    """Record reads of the previous create_index: a glob (and full parse) of the annotations per image."""
+    image_dir, annotation_dir = ds.dataset_dir / "images", ds.dataset_dir / "annotations"
+
+    def get_annotations(image_id=None):
+        pattern = f"{image_id}/*.json" if image_id else "*/*.json"
+        return [Annotation.from_json(f, ds.task) for f in annotation_dir.glob(pattern)]
+
+    def get_images(labeled=True):
+        images = []
+        for image_file in image_dir.glob("*.json"):
+            if bool(get_annotations(image_file.stem)) == labeled:
+                images.append(Image.from_json(image_file))
+        return images
+
+    get_images()
+    get_annotations()
+    ds.get_predictions()
+    ds.get_categories()
+    get_images(labeled=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--image_num", type=int, default=100000)
+    parser.add_argument("--category_num", type=int, default=10)
+    parser.add_argument("--unlabeled_ratio", type=float, default=0.1)
+    parser.add_argument("--storage", type=str, default="file")
+    parser.add_argument("--skip_legacy", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as root_dir:
+        start = time.perf_counter()
+        ds = create_records_only_dummy(
+            Path(root_dir), args.image_num, args.category_num, args.unlabeled_ratio, args.storage
+        )
+        print(f"created {args.image_num} image dummy dataset in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        ds.create_index(use_cache=False)
+        new_elapsed = time.perf_counter() - start
+        print(
+            f"create_index: {new_elapsed:.2f}s "
+            f"({len(ds.image_dict)} labeled, {len(ds.unlabeled_image_dict)} unlabeled images, "
+            f"{len(ds.annotation_dict)} annotations)"
+        )
+
+        start = time.perf_counter()
+        ds.create_index()
+        print(f"create_index from index cache: {time.perf_counter() - start:.2f}s")
+
+        if not args.skip_legacy and ds.storage == "FILE":
+            start = time.perf_counter()
+            legacy_index_reads(ds)
+            legacy_elapsed = time.perf_counter() - start
+            print(f"legacy reads only: {legacy_elapsed:.2f}s (x{legacy_elapsed / new_elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Micro-benchmarks of the NumPy geometry kernels against the previous per-item Python implementations.
+
+Usage:
+    python benchmarks/benchmark_geometry.py
+    python benchmarks/benchmark_geometry.py --num 100000 --points 64
+"""
+import argparse
+import random
+import timeit
+
+import cv2
+import numpy as np
+from shapely import Polygon
+
+from waffle_hub.utils.geometry import (
+    decode_rle,
+    denormalize_bboxes,
+    encode_rle,
+    mask_to_polygons,
+    normalize_bboxes,
+    normalize_polygons,
+    polygon_areas,
+)
+
+
+def legacy_polygon_area(polygon: list[float]) -> float:
+    return Polygon([(x, y) for x, y in zip(polygon[::2], polygon[1::2])]).area
+
+
+def legacy_mask_to_polygon(mask: np.ndarray) -> list[list]:
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    polygon = []
+    for contour in contours:
+        p = []
+        for point in contour.reshape(-1, 2):
+            p.extend(point.tolist())
+        polygon.append(p)
+    return polygon
+
+
+def legacy_normalize_bbox(bbox: list[float], W: int, H: int) -> tuple:
+    x1, y1, w, h = bbox
+    x1, w = x1 / W, w / W
+    y1, h = y1 / H, h / H
+    return x1 + w / 2, y1 + h / 2, w, h
+
+
+def legacy_normalize_polygon(polygon: list[float], W: int, H: int) -> list[float]:
+    polygon = list(polygon)
+    polygon[0::2] = [x / W for x in polygon[0::2]]
+    polygon[1::2] = [y / H for y in polygon[1::2]]
+    return polygon
+
+
+def legacy_parse_od_label(line: str, width: int, height: int) -> dict:
+    category_id, cx, cy, w, h = map(float, line.split())
+    return {
+        "category_id": int(category_id) + 1,
+        "bbox": [(cx - w / 2) * width, (cy - h / 2) * height, w * width, h * height],
+    }
+
+
+def report(name: str, legacy, new, number: int):
+    legacy_elapsed = min(timeit.repeat(legacy, number=number, repeat=3))
+    new_elapsed = min(timeit.repeat(new, number=number, repeat=3))
+    print(
+        f"{name:<24} legacy {legacy_elapsed * 1000:9.2f}ms  numpy {new_elapsed * 1000:9.2f}ms  "
+        f"(x{legacy_elapsed / new_elapsed:.1f})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--num", type=int, default=10000, help="number of polygons / bboxes / labels"
+    )
+    parser.add_argument("--points", type=int, default=32, help="number of points per polygon")
+    parser.add_argument("--mask_size", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    W, H = 1920, 1080
+
+    polygons = [
+        [
+            random.uniform(0, W) if i % 2 == 0 else random.uniform(0, H)
+            for i in range(args.points * 2)
+        ]
+        for _ in range(args.num)
+    ]
+    bboxes = [
+        [
+            random.uniform(0, W / 2),
+            random.uniform(0, H / 2),
+            random.uniform(1, W / 2),
+            random.uniform(1, H / 2),
+        ]
+        for _ in range(args.num)
+    ]
+    lines = [
+        f"{random.randint(0, 79)} {' '.join(str(v) for v in normalize_bboxes([b], W, H)[0])}"
+        for b in bboxes
+    ]
+
+    mask = np.zeros((args.mask_size, args.mask_size), dtype=np.uint8)
+    for _ in range(20):
+        cx, cy = random.randint(0, args.mask_size), random.randint(0, args.mask_size)
+        cv2.circle(mask, (cx, cy), random.randint(10, args.mask_size // 8), 1, -1)
+    masks = np.stack([mask] * 16)
+
+    print(f"{args.num} items, {args.points} points per polygon, {args.mask_size}px masks")
+    report(
+        "polygon area",
+        lambda: [legacy_polygon_area(polygon) for polygon in polygons],
+        lambda: polygon_areas(polygons),
+        number=1,
+    )
+    report(
+        "bbox normalize",
+        lambda: [legacy_normalize_bbox(bbox, W, H) for bbox in bboxes],
+        lambda: normalize_bboxes(bboxes, W, H).tolist(),
+        number=1,
+    )
+    report(
+        "polygon normalize",
+        lambda: [legacy_normalize_polygon(polygon, W, H) for polygon in polygons],
+        lambda: normalize_polygons(polygons, W, H),
+        number=1,
+    )
+    report(
+        "yolo od label parse",
+        lambda: [legacy_parse_od_label(line, W, H) for line in lines],
+        lambda: denormalize_bboxes(
+            np.array(" ".join(lines).split(), dtype=np.float64).reshape(-1, 5)[:, 1:], W, H
+        ).tolist(),
+        number=1,
+    )
+    report(
+        "mask to polygon",
+        lambda: legacy_mask_to_polygon(mask),
+        lambda: mask_to_polygons(mask),
+        number=20,
+    )
+    report(
+        "rle encode/decode",
+        lambda: [decode_rle(rle) for rle in encode_rle(masks)],
+        lambda: decode_rle(encode_rle(masks)),
+        number=5,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,18 @@
+import os
+import shutil
 from collections import Counter
 from pathlib import Path
 
 import pytest
+import torch
 from waffle_utils.file.io import load_json, save_json
 from waffle_utils.file.search import get_image_files
 
-from waffle_hub import TaskType
-from waffle_hub.dataset import Dataset
+from waffle_hub import LinkMode, StorageType, TaskType
+from waffle_hub.dataset import Dataset, DatasetView
+from waffle_hub.dataset.adapter.yolo import _parse_od_labels
 from waffle_hub.schema.fields import Annotation, Category, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
 from waffle_hub.utils.data import ImageDataset, LabeledDataset
 
 
@@ -295,6 +300,586 @@ def test_dummy(tmpdir):
         _total_dummy("dummy", TaskType.CLASSIFICATION, 3, 3, 0, tmpdir)
 
 
+def test_storage(tmpdir):
+    dataset = Dataset.dummy(
+        name="dummy_sqlite",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=30,
+        category_num=3,
+        unlabeled_image_num=5,
+        root_dir=tmpdir,
+        storage="sqlite",
+    )
+    assert dataset.storage == StorageType.SQLITE
+    assert (dataset.dataset_dir / "dataset.db").exists()
+    assert not dataset.image_dir.exists()
+    _index("dummy_sqlite", tmpdir)
+
+    image_num = len(dataset.get_images())
+    annotations = dataset.get_annotations()
+
+    dataset.migrate_storage(StorageType.FILE)
+    dataset = Dataset.load("dummy_sqlite", root_dir=tmpdir)
+    assert dataset.storage == StorageType.FILE
+    assert not (dataset.dataset_dir / "dataset.db").exists()
+    assert len(dataset.get_images()) == image_num
+    assert len(dataset.get_images(labeled=False)) == 5
+    assert len(dataset.get_annotations()) == len(annotations)
+
+    dataset.migrate_storage(StorageType.SQLITE)
+    assert not dataset.image_dir.exists()
+    assert sorted(ann.annotation_id for ann in dataset.get_annotations()) == sorted(
+        ann.annotation_id for ann in annotations
+    )
+
+    _clone("dummy_sqlite", tmpdir)
+    assert Dataset.load("clone_dummy_sqlite", root_dir=tmpdir).storage == StorageType.SQLITE
+    _split("dummy_sqlite", tmpdir)
+
+    # checkpointing the database (on close or clone) does not outdate an export
+    dataset = Dataset.load("dummy_sqlite", root_dir=tmpdir)
+    dataset.export("yolo")
+    dataset.close()
+    Dataset.clone("dummy_sqlite", "clone_dummy_sqlite_2", tmpdir, tmpdir)
+    dataset = Dataset.load("dummy_sqlite", root_dir=tmpdir)
+    assert not dataset.is_export_outdated("yolo")
+    dataset.add_images(Image(image_id=1000, file_name="image_1000.jpg", width=100, height=100))
+    assert dataset.is_export_outdated("yolo")
+
+    with pytest.raises(ValueError):
+        Dataset.new(
+            name="invalid_storage", task=TaskType.OBJECT_DETECTION, root_dir=tmpdir, storage="csv"
+        )
+
+
+@pytest.mark.parametrize("storage", ["file", "sqlite"])
+def test_clone_snapshot(tmpdir, storage):
+    dataset = Dataset.dummy(
+        name="dummy_cow",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=10,
+        category_num=2,
+        root_dir=tmpdir,
+        storage=storage,
+    )
+    dataset.split(0.8, 0.2)
+    annotation = dataset.get_annotations(1)[0]
+
+    clone = Dataset.clone("dummy_cow", "dummy_cow_clone", tmpdir, tmpdir)
+    raw_image = dataset.raw_image_dir / dataset.get_images([1])[0].file_name
+    assert raw_image.stat().st_nlink > 1  # shared with the clone
+    assert clone.get_split_ids() == dataset.get_split_ids()
+    assert len(clone.get_annotations()) == len(dataset.get_annotations())
+
+    # writes to the clone are not seen by the source (copy on write)
+    clone.add_annotations(
+        [Annotation.object_detection(annotation.annotation_id, 1, category_id=2, bbox=[1, 1, 1, 1])]
+    )
+    assert Dataset.load("dummy_cow", tmpdir).get_annotations(1)[0].to_dict() == annotation.to_dict()
+
+    # snapshots
+    dataset.snapshot("v1")
+    with pytest.raises(FileExistsError):
+        dataset.snapshot("v1")
+    assert dataset.get_snapshot_list() == ["v1"]
+    assert "v1" not in Dataset.get_dataset_list(tmpdir)
+
+    dataset.add_annotations(
+        [Annotation.object_detection(annotation.annotation_id, 1, category_id=2, bbox=[2, 2, 2, 2])]
+    )
+    dataset.add_categories([Category.object_detection(category_id=3, name="new")])
+    assert dataset.load_snapshot("v1").get_annotations(1)[0].to_dict() == annotation.to_dict()
+
+    dataset.restore_snapshot("v1")
+    assert dataset.get_annotations(1)[0].to_dict() == annotation.to_dict()
+    assert dataset.annotation_dict[annotation.annotation_id].to_dict() == annotation.to_dict()
+    assert len(dataset.get_categories()) == 2
+    clone = Dataset.clone("dummy_cow", "dummy_cow_v1", tmpdir, tmpdir, snapshot="v1")
+    assert clone.get_annotations(1)[0].to_dict() == annotation.to_dict()
+
+    dataset.delete_snapshot("v1")
+    assert dataset.get_snapshot_list() == []
+    assert raw_image.exists()
+
+
+def test_blob_store(tmpdir):
+    blob_store = Dataset.enable_blob_store(tmpdir)
+    dataset = Dataset.dummy(
+        name="dummy_blob",
+        task=TaskType.CLASSIFICATION,
+        image_num=10,
+        category_num=2,
+        root_dir=tmpdir,
+    )
+    assert dataset.blob_store is not None
+    assert "dummy_blob" in Dataset.get_dataset_list(tmpdir)
+
+    # dummy images are identical, so they are deduplicated to a single blob
+    (digest,) = dataset._get_blob_digests()
+    raw_image = dataset.raw_image_dir / dataset.get_images([1])[0].file_name
+    assert raw_image.samefile(blob_store.get_blob_path(digest))
+    assert blob_store.get_reference_count(digest) == 10
+
+    clone = Dataset.clone("dummy_blob", "dummy_blob_clone", tmpdir, tmpdir)
+    assert blob_store.get_reference_count(digest) == 20
+
+    dataset.delete()
+    assert blob_store.get_reference_count(digest) == 10
+    clone.delete()
+    assert not blob_store.get_blob_path(digest).exists()
+
+    # datasets created before enabling the store
+    Dataset.dummy(
+        name="dummy_no_blob", task=TaskType.CLASSIFICATION, image_num=3, root_dir=tmpdir / "old"
+    )
+    with pytest.raises(ValueError):
+        Dataset.load("dummy_no_blob", tmpdir / "old").dedup_raw_images()
+    Dataset.enable_blob_store(tmpdir / "old")
+    assert Dataset.load("dummy_no_blob", tmpdir / "old").dedup_raw_images() == 3
+
+    # a file also linked outside the store is cloned, so that the blob is never modified from outside
+    external_file = Path(tmpdir) / "external.png"
+    external_file.write_bytes(b"external image")
+    raw_file = Path(tmpdir) / "raw.png"
+    os.link(external_file, raw_file)
+    digest = blob_store.add_file(raw_file)
+    assert raw_file.samefile(blob_store.get_blob_path(digest))
+    assert not external_file.samefile(raw_file)
+    assert blob_store.get_reference_count(digest) == 1
+    external_file.write_bytes(b"edited image")
+    assert blob_store.get_blob_path(digest).read_bytes() == b"external image"
+    assert blob_store.add_file(raw_file) == digest
+    assert not list(blob_store.blob_dir.glob(".*.tmp"))
+
+
+def test_parse_yolo_od_labels():
+    annotations = _parse_od_labels(["0 0.5 0.5 0.2 0.4\n", "\n", "2 0.1 0.1 0.2 0.2\n"], 100, 50)
+    assert [annotation["category_id"] for annotation in annotations] == [1, 3]
+    assert annotations[0]["bbox"] == pytest.approx([40, 15, 20, 20])
+
+    # ragged lines are not re-chunked into other boxes
+    for lines in [["0 0.5 0.5 0.2\n", "1 0.5 0.5 0.2 0.4 0.1\n"], ["0 0.5 0.5 0.2 0.4 1\n"]]:
+        with pytest.raises(ValueError):
+            _parse_od_labels(lines, 100, 50)
+
+
+def test_index_cache(tmpdir):
+    Dataset.dummy(
+        name="dummy_index_cache",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=20,
+        category_num=3,
+        unlabeled_image_num=2,
+        root_dir=tmpdir,
+    )
+    dataset = Dataset.load("dummy_index_cache", root_dir=tmpdir)
+    assert dataset.index_cache_file.exists()
+
+    # valid cache is reused as it is
+    cache_mtime = dataset.index_cache_file.stat().st_mtime_ns
+    dataset = Dataset.load("dummy_index_cache", root_dir=tmpdir)
+    assert dataset.index_cache_file.stat().st_mtime_ns == cache_mtime
+    _index("dummy_index_cache", tmpdir)
+
+    # added records patch the index
+    unlabeled_image_id = list(dataset.unlabeled_image_dict.keys())[0]
+    dataset.add_annotations(
+        Annotation.object_detection(
+            annotation_id=10000, image_id=unlabeled_image_id, category_id=1, bbox=[1, 1, 2, 2]
+        )
+    )
+    assert unlabeled_image_id in dataset.image_dict
+    assert unlabeled_image_id not in dataset.unlabeled_image_dict
+    assert dataset.annotation_to_image[10000].image_id == unlabeled_image_id
+    _index("dummy_index_cache", tmpdir)
+
+    # changes made without the index invalidate the cache
+    Dataset("dummy_index_cache", task=TaskType.OBJECT_DETECTION, root_dir=tmpdir).add_images(
+        Image(image_id=1000, file_name="image_1000.jpg", width=100, height=100)
+    )
+    dataset = Dataset.load("dummy_index_cache", root_dir=tmpdir)
+    assert 1000 in dataset.unlabeled_image_dict
+    _index("dummy_index_cache", tmpdir)
+
+
+def _category_index(dataset):
+    return [
+        {
+            category_id: sorted(
+                record.image_id if isinstance(record, Image) else record.annotation_id
+                for record in records
+            )
+            for category_id, records in category_index.items()
+        }
+        for category_index in [
+            dataset.category_to_images,
+            dataset.category_to_unique_images,
+            dataset.category_to_annotations,
+            dataset.category_to_predictions,
+        ]
+    ]
+
+
+def test_index_cache_save(tmpdir):
+    Dataset.dummy(
+        name="dummy_index_cache_save",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=10,
+        category_num=3,
+        unlabeled_image_num=5,
+        root_dir=tmpdir,
+    )
+    dataset = Dataset.load("dummy_index_cache_save", root_dir=tmpdir)
+
+    saves = []
+    save_index_cache = dataset._save_index_cache
+    dataset._save_index_cache = lambda *args: saves.append(args) or save_index_cache(*args)
+
+    # adds outside a batch patch the index without saving its cache
+    image_ids = list(dataset.unlabeled_image_dict.keys())
+    for annotation_id, image_id in enumerate(image_ids * 2, start=10000):
+        dataset.add_annotations(
+            Annotation.object_detection(
+                annotation_id=annotation_id,
+                image_id=image_id,
+                category_id=annotation_id % 3 + 1,
+                bbox=[1, 1, 2, 2],
+            )
+        )
+    dataset.add_predictions(
+        Annotation.object_detection(
+            annotation_id=20000, image_id=image_ids[0], category_id=2, bbox=[1, 1, 2, 2], score=0.5
+        )
+    )
+    assert len(saves) == 0
+
+    # patched category indexes are the same as created ones
+    category_index = _category_index(dataset)
+    dataset._create_category_index()
+    assert _category_index(dataset) == category_index
+
+    dataset.close()
+    assert len(saves) == 1
+    dataset.close()
+    assert len(saves) == 1
+
+    with dataset.batch():
+        for image_id in range(1000, 1010):
+            dataset.add_images(
+                Image(image_id=image_id, file_name=f"image_{image_id}.jpg", width=100, height=100)
+            )
+    assert len(saves) == 2
+
+    cache_mtime = dataset.index_cache_file.stat().st_mtime_ns
+    dataset = Dataset.load("dummy_index_cache_save", root_dir=tmpdir)
+    assert dataset.index_cache_file.stat().st_mtime_ns == cache_mtime
+    assert _category_index(dataset) == category_index
+    _index("dummy_index_cache_save", tmpdir)
+
+
+def test_batch(tmpdir):
+    Dataset.dummy(
+        name="dummy_batch",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=10,
+        category_num=3,
+        root_dir=tmpdir,
+    )
+    dataset = Dataset.load("dummy_batch", root_dir=tmpdir)
+
+    image_num = 1000  # large enough to use the parallel bulk write path
+    images = [
+        Image(image_id=image_id, file_name=f"image_{image_id}.jpg", width=100, height=100)
+        for image_id in range(100, 100 + image_num)
+    ]
+    annotations = [
+        Annotation.object_detection(
+            annotation_id=image.image_id, image_id=image.image_id, category_id=4, bbox=[1, 1, 2, 2]
+        )
+        for image in images
+    ]
+    with dataset.batch():
+        dataset.add_categories(
+            Category.object_detection(category_id=4, name="category_4", supercategory="object")
+        )
+        dataset.add_images(images)
+        dataset.add_annotations(annotations)
+
+        # deferred until the block exits
+        assert len(dataset.get_dataset_info().categories) == 3
+        assert 4 not in dataset.category_dict
+        assert len(dataset.image_dict) == 10
+
+    assert len(dataset.get_dataset_info().categories) == 4
+    assert len(dataset.category_to_images[4]) == image_num
+    assert len(dataset.image_dict) == 10 + image_num
+    assert len(dataset.get_images()) == 10 + image_num
+    _index("dummy_batch", tmpdir)
+
+
+def test_category_registry(tmpdir):
+    dataset = Dataset.new(
+        name="category_registry",
+        task=TaskType.TEXT_RECOGNITION,
+        categories=["a", "b"],
+        root_dir=tmpdir,
+    )
+
+    calls = []
+    get_categories = dataset._storage.get_categories
+    dataset._storage.get_categories = lambda *args: calls.append(args) or get_categories(*args)
+
+    dataset.add_categories([Category.text_recognition(category_id=3, name="c")])
+    dataset.add_images([Image.new(image_id=1, file_name="1.jpg", width=10, height=10)])
+    for annotation_id, caption in enumerate(["ab", "ca", "abc"], start=1):
+        dataset.add_annotations(
+            [Annotation.text_recognition(annotation_id=annotation_id, image_id=1, caption=caption)]
+        )
+    with pytest.raises(ValueError):
+        dataset.add_annotations(
+            [Annotation.text_recognition(annotation_id=4, image_id=1, caption="d")]
+        )
+    with pytest.raises(ValueError):
+        dataset.add_categories([Category.text_recognition(category_id=4, name="a")])
+
+    assert dataset.get_category_names() == ["a", "b", "c"]
+    assert [category.name for category in dataset.get_categories([3, 1])] == ["a", "c"]
+    assert calls == []  # every lookup is served from the registry
+
+    # returned categories are copies, the registry is written through to the storage
+    dataset.get_categories()[0].name = "z"
+    assert dataset.get_category_names() == ["a", "b", "c"]
+    assert Dataset.load("category_registry", root_dir=tmpdir).get_category_names() == ["a", "b", "c"]
+
+
+def test_coco_streaming(tmpdir):
+    for task in [TaskType.OBJECT_DETECTION, TaskType.INSTANCE_SEGMENTATION]:
+        dataset = Dataset.dummy(
+            name=f"dummy_streaming_{task}",
+            task=task,
+            image_num=30,
+            category_num=3,
+            root_dir=tmpdir,
+        )
+        dataset.split(0.6, 0.2, 0.2)
+        export_dir = Path(dataset.export("coco"))
+        coco_files = [export_dir / f"{set_name}.json" for set_name in ["train", "val", "test"]]
+
+        def _records(ds):
+            ignore_keys = ["date_captured", "original_file_name"]
+            images = [
+                {k: v for k, v in image.to_dict().items() if k not in ignore_keys}
+                for image in ds.get_images()
+            ]
+            annotations = [annotation.to_dict() for annotation in ds.get_annotations()]
+            categories = [category.to_dict() for category in ds.get_categories()]
+            return images, annotations, categories
+
+        expected = Dataset.from_coco(
+            name=f"coco_{task}",
+            task=task,
+            coco_file=coco_files,
+            coco_root_dir=export_dir / "images",
+            root_dir=tmpdir,
+        )
+        streamed = Dataset.from_coco(
+            name=f"coco_streaming_{task}",
+            task=task,
+            coco_file=coco_files,
+            coco_root_dir=export_dir / "images",
+            root_dir=tmpdir,
+            streaming=True,
+        )
+        assert _records(streamed) == _records(expected)
+        for set_file in ["train_set_file", "val_set_file", "test_set_file"]:
+            assert load_json(getattr(streamed, set_file)) == load_json(getattr(expected, set_file))
+        assert not list(streamed.dataset_dir.glob("tmp*"))  # spill files are removed
+
+
+def test_export_link_mode(tmpdir):
+    dataset = Dataset.dummy(
+        name="dummy_link_mode",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=10,
+        category_num=3,
+        root_dir=tmpdir,
+    )
+    dataset.split(0.8)
+    raw_image_file = dataset.raw_image_dir / dataset.get_images()[0].file_name
+
+    for link_mode in LinkMode:
+        for data_type in ["coco", "yolo", "autocare_dlt"]:
+            export_dir = Path(dataset.export(data_type, link_mode=link_mode))
+            image_files = [f for f in export_dir.rglob("*.jpg")]
+            assert len(image_files) == 10
+            exported_image_file = next(
+                f for f in image_files if f.name == raw_image_file.name
+            )  # same file name in every format
+            assert exported_image_file.read_bytes() == raw_image_file.read_bytes()
+            if link_mode == LinkMode.SYMLINK:
+                assert exported_image_file.is_symlink()
+            elif link_mode == LinkMode.HARDLINK:
+                assert exported_image_file.samefile(raw_image_file)
+            else:
+                assert not exported_image_file.samefile(raw_image_file)
+
+    # re-export never writes through linked files
+    dataset.export("coco", link_mode="hardlink")
+    dataset.export("coco", link_mode="copy")
+    assert raw_image_file.stat().st_nlink == 1
+
+    # linked exports can be imported (read) as usual
+    export_dir = Path(dataset.export("coco", link_mode="symlink"))
+    Dataset.from_coco(
+        name="dummy_link_mode_import",
+        task=TaskType.OBJECT_DETECTION,
+        coco_file=[export_dir / "train.json", export_dir / "val.json"],
+        coco_root_dir=export_dir / "images",
+        root_dir=tmpdir,
+    )
+
+    with pytest.raises(ValueError):
+        dataset.export("coco", link_mode="invalid")
+
+
+def test_export_incremental(tmpdir):
+    dataset = Dataset.dummy(
+        name="dummy_incremental",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=20,
+        category_num=3,
+        root_dir=tmpdir,
+    )
+    dataset.split(0.8)
+
+    for data_type in ["yolo", "coco"]:
+        assert dataset.is_export_outdated(data_type)
+        export_dir = Path(dataset.export(data_type, link_mode="hardlink"))
+        assert not dataset.is_export_outdated(data_type)
+    yolo_export_dir = dataset.export_dir / "ULTRALYTICS"
+    mtimes = {f: f.stat().st_mtime_ns for f in yolo_export_dir.rglob("*") if f.is_file()}
+
+    # add a new image to train set
+    image = dataset.get_images()[0]
+    new_image = Image(
+        image_id=100, file_name="image_100.jpg", width=image.width, height=image.height
+    )
+    shutil.copy(dataset.raw_image_dir / image.file_name, dataset.raw_image_dir / "image_100.jpg")
+    dataset.add_images([new_image])
+    dataset.add_annotations(
+        [
+            Annotation.object_detection(
+                annotation_id=100, image_id=100, category_id=1, bbox=[1, 1, 2, 2]
+            )
+        ]
+    )
+    train_ids, val_ids, _, _ = dataset.get_split_ids()
+    save_json(train_ids + [100], dataset.train_set_file)
+    assert dataset.is_export_outdated("yolo")
+
+    dataset.export("yolo")  # same link mode (hardlink) as the existing export
+    new_files = [f for f in yolo_export_dir.rglob("*") if f.is_file() and not f.name.startswith(".")]
+    assert {f.name for f in new_files} - {f.name for f in mtimes} == {
+        "image_100.jpg",
+        "image_100.txt",
+    }
+    assert (yolo_export_dir / "train" / "images" / "image_100.jpg").samefile(
+        dataset.raw_image_dir / "image_100.jpg"
+    )
+    for f, mtime in mtimes.items():  # untouched
+        if f.name != "data.yaml" and not f.name.startswith("."):
+            assert f.stat().st_mtime_ns == mtime
+
+    # removed from the splits (orphans)
+    save_json(train_ids, dataset.train_set_file)
+    dataset.export("yolo")
+    assert not (yolo_export_dir / "train" / "images" / "image_100.jpg").exists()
+    assert not (yolo_export_dir / "train" / "labels" / "image_100.txt").exists()
+
+    # moved to another split
+    save_json(train_ids[1:], dataset.train_set_file)
+    save_json(val_ids + train_ids[:1], dataset.val_set_file)
+    coco_export_dir = Path(dataset.export("coco"))
+    assert train_ids[0] in [
+        image["id"] for image in load_json(coco_export_dir / "val.json")["images"]
+    ]
+    moved_file_name = dataset.image_dict[train_ids[0]].file_name
+    dataset.export("yolo")
+    assert (yolo_export_dir / "val" / "images" / moved_file_name).exists()
+    assert not (yolo_export_dir / "train" / "images" / moved_file_name).exists()
+
+    # full export
+    dataset.export("yolo", incremental=False)
+    assert not dataset.is_export_outdated("yolo")
+
+
+def test_export_parallel(tmpdir):
+    dataset = Dataset.dummy(
+        name="dummy_export_parallel",
+        task=TaskType.INSTANCE_SEGMENTATION,
+        image_num=50,
+        category_num=3,
+        root_dir=tmpdir,
+    )
+    dataset.split(0.6, 0.2, 0.2)
+
+    def _contents(export_dir):
+        return {
+            f.relative_to(export_dir): f.read_bytes()
+            for f in Path(export_dir).rglob("*")
+            if f.is_file() and not f.name.startswith(".")
+        }
+
+    for data_type in ["yolo", "coco", "autocare_dlt"]:
+        expected = _contents(dataset.export(data_type, incremental=False, workers=0))
+
+        callback = ThreadProgressCallback(total_steps=1)
+        export_dir = dataset.export(data_type, incremental=False, workers=4, callback=callback)
+        assert _contents(export_dir) == expected
+        assert callback.is_finished() and not callback.is_failed()
+        assert callback.get_progress() == 1.0
+        assert callback.get_throughput() > 0
+
+
+def test_export_webdataset(tmpdir):
+    dataset = Dataset.dummy(
+        name="dummy_webdataset",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=20,
+        category_num=3,
+        unlabeled_image_num=2,
+        root_dir=tmpdir,
+    )
+    dataset.split(0.8, 0.2)
+    train_ids, val_ids, _, unlabeled_ids = dataset.get_split_ids()
+
+    # a shard per few images
+    export_dir = Path(dataset.export("webdataset", shard_size=4096))
+    assert len(list((export_dir / "train").glob("*.tar"))) > 1
+    assert not dataset.is_export_outdated("webdataset")
+
+    labeled_dataset = LabeledDataset(export_dir, 32, set_name="train")
+    assert len(labeled_dataset) == len(train_ids)
+    image, image_info, annotations = labeled_dataset[3]
+    assert tuple(image.shape) == (3, 32, 32)
+    image_id = train_ids[3]
+    assert image_info.image_rel_path == dataset.image_dict[image_id].file_name
+    assert [a.to_dict() for a in annotations] == [
+        a.to_dict() for a in dataset.image_to_annotations[image_id]
+    ]
+    assert len(LabeledDataset(export_dir, 32)) == len(train_ids) + len(val_ids)
+
+    image_dataset = ImageDataset(export_dir, 32)
+    assert len(image_dataset) == len(train_ids) + len(val_ids) + len(unlabeled_ids)
+    images, image_infos = next(iter(image_dataset.get_dataloader(batch_size=4)))
+    assert tuple(images.shape) == (4, 3, 32, 32)
+
+    # streaming
+    samples = list(image_dataset.reader)
+    assert len(samples) == len(image_dataset)
+    assert samples[0][0] == image_dataset.reader.get_sample(0)[0]
+
+
 def _from_superb_ai(dataset_name, task: TaskType, superb_dir, root_dir, option='default'):
     dataset = Dataset.from_superb_ai(
         name=dataset_name,
@@ -303,6 +888,7 @@ def _from_superb_ai(dataset_name, task: TaskType, superb_dir, root_dir, option='
         superb_file_dir=superb_dir,
         root_dir = root_dir,
         option=option,
+        workers=2,
     )
     assert dataset.dataset_info_file.exists()
 
@@ -573,6 +1159,39 @@ def test_labled_dataloader(coco_path, tmpdir):
     assert hasattr(annotations[0], "bbox")
 
 
+def test_image_cache(tmpdir):
+    dataset = Dataset.dummy(
+        name="dummy_image_cache",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=10,
+        category_num=2,
+        root_dir=tmpdir,
+    )
+    dataset.split(0.8)
+
+    labeled_dataset = LabeledDataset(dataset, [48, 32], letter_box=True, set_name="train")
+    cached_dataset = LabeledDataset(dataset, [48, 32], letter_box=True, set_name="train", cache=True)
+    cache_file = cached_dataset.cache.cache_dir / "images.npy"
+    assert cache_file.exists()
+    assert len(cached_dataset) == len(labeled_dataset)
+
+    image, image_info, annotations = labeled_dataset[1]
+    cached_image, cached_image_info, cached_annotations = cached_dataset[1]
+    assert torch.equal(image, cached_image)
+    assert list(cached_image_info.pad) == list(image_info.pad)
+    assert list(cached_image_info.new_shape) == list(image_info.new_shape)
+    assert cached_image_info.image_rel_path == image_info.image_rel_path
+
+    # reused until the split changes
+    mtime = cache_file.stat().st_mtime_ns
+    LabeledDataset(dataset, [48, 32], letter_box=True, set_name="train", cache=True)
+    assert cache_file.stat().st_mtime_ns == mtime
+    dataset.split(0.5)
+    cached_dataset = LabeledDataset(dataset, [48, 32], letter_box=True, set_name="train", cache=True)
+    assert len(cached_dataset) == len(load_json(dataset.train_set_file))
+    assert cache_file.stat().st_mtime_ns != mtime
+
+
 # etc
 def test_sample(tmpdir):
     for task_type in TaskType:
@@ -650,6 +1269,72 @@ def test_merge(coco_path, tmpdir):
     assert category_counts[3] == category_1_num
 
 
+def test_merge_hash(tmpdir):
+    ds1 = Dataset.dummy(
+        name="merge_src1",
+        task=TaskType.OBJECT_DETECTION,
+        image_num=10,
+        category_num=2,
+        root_dir=tmpdir,
+    )
+    Dataset.clone("merge_src1", "merge_src2", tmpdir, tmpdir)
+    num_annotations = len(ds1.get_annotations())
+
+    # same file names and annotations are merged
+    ds = Dataset.merge(
+        name="merge_same",
+        root_dir=tmpdir,
+        src_names=["merge_src1", "merge_src2"],
+        src_root_dirs=str(tmpdir),
+        task=TaskType.OBJECT_DETECTION,
+        workers=2,
+    )
+    assert len(ds.get_images()) == 10
+    assert len(ds.get_annotations()) == num_annotations
+    assert len(ds.get_categories()) == 2
+    assert sorted(ds.category_dict) == [1, 2]
+    for image in ds.get_images():
+        assert (ds.raw_image_dir / image.file_name).exists()
+
+    # a new annotation of the same image is kept, a duplicated one in the same merge is dropped
+    ds2 = Dataset.load("merge_src2", tmpdir)
+    ds2.add_annotations(
+        [
+            Annotation.object_detection(
+                num_annotations + 1, 1, category_id=1, bbox=[1, 1, 1, 1], iscrowd=1
+            )
+        ]
+    )
+    ds = Dataset.merge(
+        name="merge_new_annotation",
+        root_dir=tmpdir,
+        src_names=["merge_src1", "merge_src2", "merge_src2"],
+        src_root_dirs=str(tmpdir),
+        task=TaskType.OBJECT_DETECTION,
+        workers=0,
+    )
+    assert len(ds.get_annotations()) == num_annotations + 1
+
+    # dummy raw images have the same content
+    ds = Dataset.merge(
+        name="merge_content",
+        root_dir=tmpdir,
+        src_names=["merge_src1"],
+        src_root_dirs=str(tmpdir),
+        task=TaskType.OBJECT_DETECTION,
+        image_key="content",
+    )
+    assert len(ds.get_images()) == 1
+
+    with pytest.raises(ValueError):
+        Dataset.merge(
+            "merge_invalid", tmpdir, ["merge_src1"], str(tmpdir), "object_detection", "size"
+        )
+    with pytest.raises(ValueError):
+        Dataset.merge("merge_invalid", tmpdir, ["merge_src1"], str(tmpdir), "classification")
+    assert not (Path(tmpdir) / "merge_invalid").exists()
+
+
 def test_extract_by_images_ids(tmpdir):
     ds = Dataset.dummy(
         name="dummy_for_extract_by_image_ids",
@@ -688,6 +1373,68 @@ def test_extract_by_categories(tmpdir):
     assert len(extracted_ds.get_categories()) == 2
 
 
+def test_dataset_view(tmpdir):
+    ds = Dataset.dummy(
+        name="dummy_for_view",
+        root_dir=tmpdir,
+        task=TaskType.OBJECT_DETECTION,
+        image_num=30,
+        category_num=3,
+        unlabeled_image_num=2,
+    )
+
+    view = ds.view(category_ids=[3, 1])
+    assert isinstance(view, DatasetView)
+    assert [category.name for category in view.get_categories()] == [
+        ds.category_dict[3].name,
+        ds.category_dict[1].name,
+    ]
+    assert {annotation.category_id for annotation in view.get_annotations()} == {1, 2}
+    assert len(view.get_annotations()) == sum(
+        ds.get_num_annotations_per_category()[category_id] for category_id in [1, 3]
+    )
+    assert len(view.get_images(labeled=False)) == 0
+    assert ds.category_dict[3].category_id == 3  # the dataset is not touched
+
+    # same selection, same view
+    assert ds.view(category_ids=[3, 1]).name == view.name
+    assert ds.view(image_ids=[1, 2, 31]).get_images(labeled=False)[0].image_id == 31
+    with pytest.raises(ValueError):
+        ds.view(image_ids=[1, 100])
+    with pytest.raises(ValueError):
+        ds.extract_by_image_ids("extract_missing", image_ids=[1, 100], root_dir=tmpdir)
+
+    view = ds.view(predicate=lambda image, annotations: image.image_id % 2 == 0)
+    assert all(image.image_id % 2 == 0 for image in view.get_images())
+
+    view.split(0.8)
+    assert not ds.train_set_file.exists()
+    assert view.dataset_dir == ds.dataset_dir / "views" / view.name
+    export_dir = Path(view.export("coco"))
+    assert export_dir.is_relative_to(view.dataset_dir)
+    assert not view.is_export_outdated("coco")
+    train = load_json(export_dir / "train.json")
+    assert {image["id"] for image in train["images"]} <= set(view.image_dict)
+
+    with pytest.raises(ValueError):
+        view.add_annotations([])
+    with pytest.raises(ValueError):
+        view.view(image_ids=[2])
+
+    # the storage belongs to the dataset, so closing the view does not touch it
+    with view.batch():
+        pass
+    view.close()
+    assert len(ds.get_images()) == 30
+
+    materialized = view.materialize("materialized_view", root_dir=tmpdir)
+    assert len(materialized.get_images()) == len(view.get_images())
+    assert len(materialized.get_annotations()) == len(view.get_annotations())
+    assert materialized.get_split_ids() == view.get_split_ids()
+    image = materialized.get_images()[0]
+    assert (materialized.raw_image_dir / image.file_name).stat().st_nlink > 1
+
+
 @pytest.mark.parametrize(
     "task",
     [
@@ -2,6 +2,7 @@ import json
 import tempfile
 import time
 from pathlib import Path
+from unittest import mock
 
 import pytest
 import torch
@@ -97,6 +98,32 @@ def _inference(hub, source: str, hold: bool = True):
     return result
 
 
+def _inference_show(hub, source: str):
+    # inference() turns draw on with show, so switch it off in the hook to show frames without saving them
+    def before_inference(cfg):
+        cfg.draw = False
+
+    with mock.patch.object(hub, "before_inference", before_inference), mock.patch(
+        "waffle_hub.hub.hub.cv2.imshow"
+    ) as imshow, mock.patch("waffle_hub.hub.hub.cv2.waitKey"), mock.patch(
+        "waffle_hub.hub.hub.cv2.destroyAllWindows"
+    ):
+        result: InferenceResult = hub.inference(
+            source=source,
+            draw=False,
+            show=True,
+            device="cpu",
+            workers=0,
+        )
+
+    assert len(result.predictions) >= 1
+    assert imshow.call_count == len(result.predictions)
+    assert all(call.args[1] is not None for call in imshow.call_args_list)
+    assert result.draw_dir is None
+
+    return result
+
+
 def _export_onnx(hub, half: bool = False, hold: bool = True):
     result: ExportOnnxResult = hub.export_onnx(
         hold=hold,
@@ -116,6 +143,36 @@ def _export_onnx(hub, half: bool = False, hold: bool = True):
     return result
 
 
+def _onnxruntime(hub, dataset: Dataset, image_size: int):
+    torch_result = hub.evaluate(dataset=dataset, device="cpu", workers=0)
+    onnx_result = hub.evaluate(dataset=dataset, device="cpu", workers=0, engine="onnxruntime")
+    assert len(onnx_result.eval_metrics) == len(torch_result.eval_metrics)
+
+    result: InferenceResult = hub.inference(
+        source=dataset.raw_image_dir,
+        device="cpu",
+        workers=0,
+        engine="onnxruntime",
+        output_format="jsonl",
+        resume=True,
+    )
+    assert len(result.predictions) >= 1
+    assert hub.get_inference_file().name == "inferences.jsonl"
+    assert len(list(hub.iter_inference_result())) == len(result.predictions)
+    assert hub.inference_progress_file.exists()
+
+    benchmark = hub.benchmark(device="cpu", image_size=image_size, engine="onnxruntime", trial=2)
+    assert benchmark["engine"] == "onnxruntime"
+
+    # the precision of onnxruntime is set by the onnx export
+    with pytest.raises(ValueError):
+        hub.evaluate(dataset=dataset, device="cpu", workers=0, engine="onnxruntime", half=True)
+    with pytest.raises(ValueError):
+        hub.inference(
+            source=dataset.raw_image_dir, device="cpu", workers=0, engine="onnxruntime", half=True
+        )
+
+
 def _export_waffle(hub):
     result: ExportWaffleResult = hub.export_waffle()
 
@@ -175,9 +232,11 @@ def _total(
     _train(hub, dataset, image_size, advance_params=advance_params, hold=hold)
     _evaluate(hub, dataset, hold=hold)
     _inference(hub, dataset.raw_image_dir, hold=hold)
+    _inference_show(hub, dataset.raw_image_dir)
     _export_onnx(
         hub, half=False, hold=hold
     )  # _export_onnx(hub, half=True, hold=hold)  # cpu cannot be half
+    _onnxruntime(hub, dataset, image_size)
     result = _export_waffle(hub)
     _from_waffle_file(result.waffle_file, dataset.raw_image_dir, tmpdir, hold=hold)
     _feature_extraction(hub, image_size)
@@ -1,20 +1,54 @@
+import importlib.util
+import json
+import time
 from itertools import permutations
+from pathlib import Path
 
 import numpy as np
 import pytest
+import torch
 
+from waffle_hub.hub.model.runtime import TorchRuntimeModel, get_max_abs_diff
+from waffle_hub.hub.model.wrapper import (
+    ClassificationResultParser,
+    InstanceSegmentationResultParser,
+    ModelWrapper,
+    ObjectDetectionResultParser,
+)
+from waffle_hub.schema.data import ImageInfo, ParsedResult
 from waffle_hub.schema.evaluate import (
     ClassificationMetric,
     InstanceSegmentationMetric,
     ObjectDetectionMetric,
 )
-from waffle_hub.schema.fields import Annotation
+from waffle_hub.schema.fields import Annotation, Image
 from waffle_hub.utils.data import resize_image
+from waffle_hub.utils.draw import draw_results
 from waffle_hub.utils.evaluate import (
     evaluate_classification,
     evaluate_object_detection,
     evaluate_segmentation,
 )
+from waffle_hub.utils.file import link_or_copy_file
+from waffle_hub.utils.geometry import (
+    decode_rle,
+    denormalize_bboxes,
+    encode_rle,
+    encode_rle_crop,
+    mask_to_polygons,
+    normalize_bboxes,
+    polygon_areas,
+    segmentation_bbox,
+)
+from waffle_hub.utils.image import get_image_size
+from waffle_hub.utils.journal import ProgressJournal
+from waffle_hub.utils.pipeline import Pipeline
+from waffle_hub.utils.prediction import (
+    PredictionReader,
+    get_prediction_files,
+    get_prediction_writer,
+)
+from waffle_hub.utils.stream import iter_json_array, iter_json_object
 
 
 def test_evaluate_classification():
@@ -165,3 +199,346 @@ def test_resize_function():
                     assert (
                         info["input_shape"] == info["new_shape"]
                     ), f"Difference from info[input_shape] to info[new_shape] (letter_box: {lb})"
+
+
+def test_iter_json_object(tmpdir):
+    obj = {
+        "info": {"description": "test", "version": 1.0},
+        "images": [{"id": i, "file_name": f"{i}.jpg", "width": 12345} for i in range(20)],
+        "annotations": [{"id": i, "bbox": [0.5, 1e-3, -2, 100]} for i in range(30)],
+        "empty": [],
+        "categories": [{"id": 1, "name": "\uc0ac\ub78c"}],
+    }
+    json_file = tmpdir / "test.json"
+    for indent in [None, 4]:
+        with open(json_file, "w") as f:
+            json.dump(obj, f, indent=indent, ensure_ascii=False)
+
+        for chunk_size in [1, 7, 1 << 20]:  # values cut at every chunk boundary
+            items = list(iter_json_object(json_file, ["images", "annotations", "empty"], chunk_size))
+            assert [v for k, v in items if k == "images"] == obj["images"]
+            assert [v for k, v in items if k == "annotations"] == obj["annotations"]
+            assert [v for k, v in items if k == "empty"] == []
+            assert dict(items)["info"] == obj["info"]
+            assert dict(items)["categories"] == obj["categories"]
+
+    # numbers cut right after "." or "e" are not decoded partially
+    obj = {"a": [1.5, 2.25e3, 3], "b": 12.75}
+    with open(json_file, "w") as f:
+        json.dump(obj, f)
+    for chunk_size in range(1, 40):
+        items = list(iter_json_object(json_file, ["a"], chunk_size))
+        assert items == [("a", 1.5), ("a", 2250.0), ("a", 3), ("b", 12.75)], chunk_size
+
+    with open(json_file, "w") as f:
+        json.dump([1, 2], f)
+    with pytest.raises(ValueError):
+        list(iter_json_object(json_file))
+
+
+def test_get_image_size(tmpdir):
+    from PIL import Image as PILImage
+    from waffle_utils.image.io import load_image
+
+    for suffix in [".jpg", ".png", ".bmp"]:
+        image_path = str(tmpdir / f"image{suffix}")
+        PILImage.new("RGB", (40, 30)).save(image_path)
+        assert get_image_size(image_path) == (40, 30)
+
+    # exif orientation (rotated 90 degrees) is applied like decoding
+    image_path = str(tmpdir / "rotated.jpg")
+    exif = PILImage.Exif()
+    exif[0x0112] = 6
+    PILImage.new("RGB", (40, 30)).save(image_path, exif=exif)
+    height, width = load_image(image_path).shape[:2]
+    assert get_image_size(image_path) == (width, height) == (30, 40)
+
+    with pytest.raises(ValueError):
+        not_image_path = tmpdir / "not_image.jpg"
+        not_image_path.write("not an image")
+        get_image_size(not_image_path)
+
+
+def test_link_or_copy_file(tmpdir):
+    src = tmpdir / "src.txt"
+    src.write("waffle")
+
+    dst = tmpdir / "sub" / "dst.txt"
+    method = link_or_copy_file(src, dst, create_directory=True)
+    assert method in ["reflink", "hardlink", "copy"]
+    assert dst.read() == "waffle"
+
+    # overwriting an existing destination never writes through to a linked file
+    src2 = tmpdir / "src2.txt"
+    src2.write("hub")
+    link_or_copy_file(src2, dst)
+    assert dst.read() == "hub"
+    assert src.read() == "waffle"
+
+
+def test_trusted_fields():
+    import pickle
+
+    annotations = [
+        ("classification", Annotation.classification(1, 1, category_id=1, score=0.5)),
+        ("object_detection", Annotation.object_detection(2, 1, category_id=2, bbox=[1, 2, 3, 4])),
+        (
+            "instance_segmentation",
+            Annotation.instance_segmentation(
+                3, 1, category_id=1, segmentation=[[0, 0, 10, 0, 10, 10, 0, 10]]
+            ),
+        ),
+        ("text_recognition", Annotation.text_recognition(4, 1, caption="waffle")),
+        ("regression", Annotation.regression(5, 1, value=1.5)),
+        (None, Annotation.new(6, 1, category_id=1, bbox=[1, 2, 3, 4])),
+    ]
+    for task, annotation in annotations:
+        d = annotation.to_dict()
+        trusted = Annotation.from_trusted_dict(d, task)
+        assert trusted.to_dict() == Annotation.from_dict(d, task).to_dict() == d
+        assert trusted.task == annotation.task
+        assert not hasattr(trusted, "__dict__")
+        assert pickle.loads(pickle.dumps(trusted)).to_dict() == d
+
+    # dictionaries that need a conversion fall back to the validated factories
+    d = {"annotation_id": 1, "image_id": 1, "category_id": 1, "bbox": [1, 2, 3, 4]}
+    assert Annotation.from_trusted_dict(d, "object_detection").area == 12
+    with pytest.raises(ValueError):
+        Annotation.from_trusted_dict(d, "unknown")
+
+    image = Image.new(1, "a.jpg", 100, 50, original_file_name="b.jpg", date_captured="2023-01-01")
+    d = image.to_dict()
+    assert d["original_file_name"] == "b.jpg" and d["date_captured"] == "2023-01-01"
+    assert Image.from_trusted_dict(d).to_dict() == Image.from_dict(d).to_dict() == d
+    assert not hasattr(Image.from_trusted_dict(d), "__dict__")
+
+
+def test_geometry():
+    # square, triangle, degenerate and empty polygons
+    polygons = [[0, 0, 10, 0, 10, 10, 0, 10], [0, 0, 4, 0, 0, 3], [1, 1, 2, 2], []]
+    assert polygon_areas(polygons).tolist() == [100.0, 6.0, 0.0, 0.0]
+    assert segmentation_bbox(polygons[:2]) == [0.0, 0.0, 10.0, 10.0]
+
+    bboxes = [[10, 20, 30, 40], [0, 0, 100, 50]]
+    yolo_bboxes = normalize_bboxes(bboxes, 100, 200)
+    assert np.allclose(yolo_bboxes[0], [0.25, 0.2, 0.3, 0.2])
+    assert np.allclose(denormalize_bboxes(yolo_bboxes, 100, 200), bboxes)
+
+    masks = np.zeros((2, 20, 30), dtype=np.uint8)
+    masks[0, 5:10, 5:15] = 1
+    masks[1, 0:20, 20:30] = 1
+    rles = encode_rle(masks)
+    assert isinstance(rles[0]["counts"], str)
+    assert np.array_equal(decode_rle(rles), masks)
+    assert np.array_equal(decode_rle(rles[1]), masks[1])
+    assert polygon_areas(mask_to_polygons(masks[0])).tolist() == [(14 - 5) * (9 - 5)]
+
+    # a crop placed in the image gives the same RLE as the full size mask
+    assert encode_rle_crop(masks[0, 5:10, 5:15], (5, 5), 30, 20) == rles[0]
+    assert mask_to_polygons(masks[0, 5:10, 5:15], (5, 5)) == mask_to_polygons(masks[0])
+
+
+def test_result_parser():
+    image_infos = [
+        ImageInfo(ori_shape=[200, 100], new_shape=[100, 50], input_shape=[100, 100], pad=[0, 25]),
+        ImageInfo(ori_shape=[100, 100], new_shape=[100, 100], input_shape=[100, 100], pad=[0, 0]),
+    ]
+    bboxes = torch.tensor(
+        [
+            [[0.1, 0.25, 0.5, 0.75], [0.1, 0.25, 0.5, 0.74], [0.6, 0.0, 1.0, 0.5]],
+            [[0.0, 0.0, 0.2, 0.2], [0.5, 0.5, 0.6, 0.6], [0.1, 0.1, 0.3, 0.3]],
+        ]
+    )
+    confs = torch.tensor([[0.9, 0.8, 0.7], [0.3, 0.1, 0.6]])
+    class_ids = torch.tensor([[0, 0, 1], [2, 2, 2]])
+
+    results = ObjectDetectionResultParser(confidence_threshold=0.25, iou_threshold=0.5)(
+        [bboxes, confs, class_ids], image_infos
+    )
+    assert [len(result) for result in results] == [2, 2]
+    assert isinstance(results[0], ParsedResult)
+    # nms removes the overlapping box, the letterbox padding is removed and boxes are clipped to the image
+    assert results[0].category_ids.tolist() == [1, 2]
+    assert np.allclose(results[0].bboxes, [[20, 0, 80, 100], [120, 0, 80, 50]])
+    assert results[1].scores.tolist() == pytest.approx([0.6, 0.3])
+
+    # annotations are built on access, and match the columns
+    assert results[0]._annotations is None
+    annotation = results[0][0]
+    assert isinstance(annotation, Annotation)
+    assert annotation.to_dict() == results[0].to_dicts()[0]
+    assert annotation.area == pytest.approx(8000)
+
+    results = ObjectDetectionResultParser(top_k=1)([bboxes, confs, class_ids], image_infos)
+    assert [len(result) for result in results] == [1, 1]
+
+    # images with a different number of detections
+    results = ObjectDetectionResultParser()(
+        [[bboxes[0], bboxes[1, :0]], [confs[0], confs[1, :0]], [class_ids[0], class_ids[1, :0]]],
+        image_infos,
+    )
+    assert [len(result) for result in results] == [2, 0]
+    assert results[1].to_dicts() == []
+
+    logits = torch.tensor([[0.1, 0.7, 0.2], [0.5, 0.2, 0.3]])
+    results = ClassificationResultParser(top_k=2)([logits])
+    assert results[0].category_ids.tolist() == [2, 3]
+    assert [annotation.category_id for annotation in results[1]] == [1, 3]
+
+    metric = evaluate_classification(
+        results,
+        [[Annotation.classification(category_id=2)], [Annotation.classification(category_id=3)]],
+        3,
+    )
+    assert metric.accuracy == pytest.approx(0.5)
+
+
+def test_instance_segmentation_result_parser():
+    # 200x100 image letterboxed to a 64x64 input (top padding 16), with 16x16 masks
+    image_infos = [
+        ImageInfo(ori_shape=[200, 100], new_shape=[64, 32], input_shape=[64, 64], pad=[0, 16])
+    ]
+    bboxes = torch.tensor([[[16 / 64, 24 / 64, 48 / 64, 40 / 64]]])
+    masks = torch.zeros(1, 1, 16, 16)
+    masks[0, 0, 6:10, 4:12] = 1.0
+
+    result = InstanceSegmentationResultParser()(
+        [bboxes, torch.tensor([[0.9]]), torch.tensor([[0]]), masks], image_infos
+    )[0]
+    assert np.allclose(result.bboxes, [[50, 25, 100, 50]])
+    assert segmentation_bbox(result.segmentations[0]) == [50.0, 25.0, 99.0, 49.0]
+
+    result = InstanceSegmentationResultParser(mask_format="rle")(
+        [bboxes, torch.tensor([[0.9]]), torch.tensor([[0]]), masks], image_infos
+    )[0]
+    mask = decode_rle(result.segmentations[0])
+    assert mask.shape == (100, 200)
+    assert mask[25:75, 50:150].mean() > 0.95 and mask.sum() == mask[25:75, 50:150].sum()
+
+    # rle segmentations are drawn as the polygons of their masks
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    drawn = draw_results(image, result.to_annotations(), names=["object"])
+    assert drawn.shape == image.shape
+    assert drawn[50, 100].any() and not drawn[90, 10].any()
+
+    with pytest.raises(ValueError):
+        InstanceSegmentationResultParser(mask_format="bitmap")
+
+
+def test_torch_runtime_model():
+    model = ModelWrapper(
+        model=torch.nn.Sequential(
+            torch.nn.Conv2d(3, 8, 3), torch.nn.AdaptiveAvgPool2d(1), torch.nn.Flatten()
+        ),
+        preprocess=lambda x: x * 2 - 1,
+        postprocess=lambda x, *args, **kwargs: [x.softmax(dim=-1)],
+    )
+    x = torch.rand(2, 3, 16, 16)
+
+    reference = TorchRuntimeModel(model)(x)
+    assert not reference[0].requires_grad
+
+    outputs = TorchRuntimeModel(model, precision="bf16", channels_last=True)(x)
+    assert outputs[0].dtype == torch.bfloat16
+    assert get_max_abs_diff(outputs, reference) < 1e-2
+    assert len(ClassificationResultParser(top_k=1)(outputs)[0]) == 1
+
+    with pytest.raises(RuntimeError):
+        TorchRuntimeModel(model, device="cpu", precision="fp16")
+    with pytest.raises(ValueError):
+        TorchRuntimeModel(model, precision="int8")
+
+
+def test_pipeline():
+    def _slow_square(x):
+        time.sleep(0.001 * (x % 3))  # out of order completion
+        return x * x
+
+    pipeline = Pipeline(range(50), [("square", _slow_square, 4), ("negate", lambda x: -x, 2)])
+    assert list(pipeline) == [-(x * x) for x in range(50)]
+
+    stats = pipeline.get_stats()
+    assert [s["name"] for s in stats] == ["load", "square", "negate"]
+    assert all(s["items"] == 50 for s in stats)
+    assert all(s["max_queue_depth"] <= 2 * s["workers"] for s in stats[1:])
+    assert pipeline.get_bottleneck() in ["load", "square", "negate"]
+
+    def _fail(x):
+        if x == 5:
+            raise ValueError("fail")
+        return x
+
+    with pytest.raises(ValueError):
+        list(Pipeline(range(100), [("fail", _fail, 2)]))
+
+    # stops early without waiting for the whole source
+    for i, x in enumerate(Pipeline(iter(range(10**9)), [("identity", lambda x: x, 2)])):
+        if i == 10:
+            break
+    assert x == 10
+
+
+def test_prediction_writer(tmpdir):
+    predictions = [
+        {f"images/{i}.jpg": [{"category_id": 1, "bbox": [0, 0, i, i], "score": 0.5}] * (i % 3)}
+        for i in range(10)
+    ]
+    with open(tmpdir / "array.json", "w") as f:
+        json.dump(predictions, f)
+    assert list(iter_json_array(tmpdir / "array.json", chunk_size=7)) == predictions
+
+    output_formats = ["json", "jsonl", "coco"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        output_formats.append("parquet")
+    for output_format in output_formats:
+        output_dir = tmpdir / output_format
+        with get_prediction_writer(output_format, output_dir) as writer:
+            for i in range(0, len(predictions), 4):
+                writer.write(predictions[i : i + 4])
+            if output_format == "jsonl":  # flushed batch by batch
+                assert len(PredictionReader(writer.file)) == len(predictions)
+
+        assert get_prediction_files(output_dir) == [writer.file]
+        reader = PredictionReader(writer.file)
+        if output_format == "coco":  # images without prediction are not in coco results
+            expected = [p for p in predictions if list(p.values())[0]]
+        else:
+            expected = predictions
+        assert list(reader) == expected
+        assert len(reader) == len(expected)
+        assert reader[1] == expected[1]
+
+    with pytest.raises(ValueError):
+        get_prediction_writer("csv", tmpdir)
+
+
+def test_progress_journal(tmpdir):
+    predictions = [{f"{i}.jpg": [{"category_id": 1, "score": 0.5}] * (i % 2)} for i in range(10)]
+    config = {"batch_size": 4, "source": Path(tmpdir)}
+
+    for output_format in ["json", "jsonl", "coco"]:
+        output_dir = tmpdir / output_format
+        journal = ProgressJournal(output_dir / "progress.jsonl", config, total=len(predictions))
+        assert journal.load() is None
+        journal.open()
+        writer = get_prediction_writer(output_format, output_dir)
+        for i in range(0, 8, 4):
+            writer.write(predictions[i : i + 4])
+            journal.checkpoint(i + 4, writer=writer.get_state())
+        writer.write(predictions[8:])  # crash before the checkpoint, with a cut journal line
+        journal._f.write('{"done": 1')
+        journal.close()
+
+        assert ProgressJournal(output_dir / "progress.jsonl", {}, len(predictions)).load() is None
+        journal = ProgressJournal(output_dir / "progress.jsonl", config, total=len(predictions))
+        checkpoint = journal.load()
+        assert checkpoint["done"] == 8
+        journal.open(resume=True)
+        with get_prediction_writer(output_format, output_dir, checkpoint["writer"]) as writer:
+            writer.write(predictions[checkpoint["done"] :])
+            journal.checkpoint(len(predictions), writer=writer.get_state())
+        journal.close()
+        assert journal.load()["done"] == len(predictions)
+
+        expected = [p for p in predictions if list(p.values())[0] or output_format != "coco"]
+        assert list(PredictionReader(writer.file)) == expected
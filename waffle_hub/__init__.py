@@ -64,6 +64,8 @@ class DataType(BaseEnum):
 
     TRANSFORMERS = enum.auto()
 
+    WEBDATASET = enum.auto()
+
 
 class TaskType(BaseEnum):
     CLASSIFICATION = enum.auto()
@@ -80,6 +82,41 @@ class SplitMethod(BaseEnum):
     STRATIFIED = enum.auto()
 
 
+class StorageType(BaseEnum):
+    FILE = enum.auto()
+    SQLITE = enum.auto()
+
+
+class LinkMode(BaseEnum):
+    COPY = enum.auto()
+    HARDLINK = enum.auto()
+    SYMLINK = enum.auto()
+    REFLINK = enum.auto()
+
+
+class MaskFormat(BaseEnum):
+    POLYGON = enum.auto()
+    RLE = enum.auto()
+
+
+class InferenceEngine(BaseEnum):
+    TORCH = enum.auto()
+    ONNXRUNTIME = enum.auto()
+
+
+class Precision(BaseEnum):
+    FP32 = enum.auto()
+    FP16 = enum.auto()
+    BF16 = enum.auto()
+
+
+class PredictionFormat(BaseEnum):
+    JSON = enum.auto()
+    JSONL = enum.auto()
+    COCO = enum.auto()
+    PARQUET = enum.auto()
+
+
 EXPORT_MAP = OrderedDict(
     {
         DataType.YOLO: "ULTRALYTICS",
@@ -87,6 +124,7 @@ EXPORT_MAP = OrderedDict(
         DataType.COCO: "COCO",
         DataType.AUTOCARE_DLT: "AUTOCARE_DLT",
         DataType.TRANSFORMERS: "TRANSFORMERS",
+        DataType.WEBDATASET: "WEBDATASET",
     }
 )
 
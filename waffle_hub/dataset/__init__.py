@@ -1,4 +1,5 @@
 from .dataset import Dataset
+from .view import DatasetView
 
 
-__all__ = ["Dataset"]
+__all__ = ["Dataset", "DatasetView"]
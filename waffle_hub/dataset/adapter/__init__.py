@@ -2,6 +2,7 @@ from .autocare_dlt import export_autocare_dlt, import_autocare_dlt
 from .coco import export_coco, import_coco
 from .label_studio import import_label_studio
 from .transformers import export_transformers, import_transformers
+from .webdataset import export_webdataset
 from .yolo import export_yolo, import_yolo
 from .superb_ai import import_superb_ai
 
@@ -10,6 +11,7 @@ __all__ = [
     "export_coco",
     "export_transformers",
     "export_autocare_dlt",
+    "export_webdataset",
     "import_autocare_dlt",
     "import_coco",
     "import_transformers",
@@ -7,79 +7,104 @@ import tqdm
 from pycocotools.coco import COCO
 from waffle_utils.file import io
 
-from waffle_hub import TaskType
+from waffle_hub import LinkMode, TaskType
 from waffle_hub.schema.fields import Annotation, Category, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
 from waffle_hub.utils.conversion import convert_rle_to_polygon
+from waffle_hub.utils.file import link_file
 
+from .common import ExportManifest, export_images, link_image_files
 
-def _export_autocare_dlt(
+
+def _export_autocare_dlt_image(
     self,
     export_dir: Path,
-    train_ids: list,
-    val_ids: list,
-    test_ids: list,
-    unlabeled_ids: list,
-):
-    """Export dataset to Autocare DLT format
+    split: str,
+    image: Image,
+    annotations: list[Annotation],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+) -> list[str]:
+    """Put an image to the images directory of Autocare DLT format export
+
+    Args:
+        export_dir (Path): Path to export directory
+        split (str): Split name of the image
+        image (Image): Image to export
+        annotations (list[Annotation]): Annotations of the image
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
+
+    Returns:
+        list[str]: Exported files (relative to export directory)
+    """
+    image_dst_path = Path("images") / image.file_name
+    link_file(
+        self.raw_image_dir / image.file_name,
+        export_dir / image_dst_path,
+        link_mode,
+        create_directory=True,
+    )
+    return [image_dst_path.as_posix()]
+
+
+def _export_autocare_dlt_split(self, export_dir: Path, split: str, images: list[Image]) -> list[str]:
+    """Write Autocare DLT format json file of a split
 
     Args:
         export_dir (Path): Path to export directory
-        train_ids (list): List of train ids
-        val_ids (list): List of validation ids
-        test_ids (list): List of test ids
-        unlabeled_ids (list): List of unlabeled ids
+        split (str): Split name
+        images (list[Image]): Images of the split
+
+    Returns:
+        list[str]: Exported files (relative to export directory)
     """
-    io.make_directory(export_dir)
-
-    image_dir = export_dir / "images"
-
-    for split, image_ids in zip(
-        ["train", "val", "test", "unlabeled"],
-        [train_ids, val_ids, test_ids, unlabeled_ids],
-    ):
-        if len(image_ids) == 0:
-            continue
-
-        coco = {
-            "categories": [
-                {
-                    "id": category.category_id,
-                    "name": category.name,
-                    "supercategory": category.supercategory,
-                }
-                for category in self.get_categories()
-            ],
-            "images": [],
-            "annotations": [],
-        }
-
-        for image in self.get_images(image_ids):
-            image_path = self.raw_image_dir / image.file_name
-            image_dst_path = image_dir / image.file_name
-            io.copy_file(image_path, image_dst_path, create_directory=True)
-
-            d = image.to_dict()
-            image_id = d.pop("image_id")
-            coco["images"].append({"id": image_id, **d})
-
-            for annotation in self.get_annotations(image_id):
-                d = annotation.to_dict()
-                if d.get("segmentation", None):
-                    if isinstance(d["segmentation"], dict):
-                        d["segmentation"] = convert_rle_to_polygon(d["segmentation"])
-                if d.get("caption", None) and (not d.get("category_id", None)):
-                    d["category_id"] = 1  # dummy for ocr
-                annotation_id = d.pop("annotation_id")
-                coco["annotations"].append({"id": annotation_id, **d})
-
-        io.save_json(coco, export_dir / f"{split}.json", create_directory=True)
-
-
-def export_autocare_dlt(self, export_dir: Union[str, Path]) -> str:
+    coco = {
+        "categories": [
+            {
+                "id": category.category_id,
+                "name": category.name,
+                "supercategory": category.supercategory,
+            }
+            for category in self.get_categories()
+        ],
+        "images": [],
+        "annotations": [],
+    }
+
+    for image in images:
+        d = image.to_dict()
+        image_id = d.pop("image_id")
+        coco["images"].append({"id": image_id, **d})
+
+        for annotation in self.image_to_annotations.get(image_id, []):
+            d = annotation.to_dict()
+            if d.get("segmentation", None):
+                if isinstance(d["segmentation"], dict):
+                    d["segmentation"] = convert_rle_to_polygon(d["segmentation"])
+            if d.get("caption", None) and (not d.get("category_id", None)):
+                d["category_id"] = 1  # dummy for ocr
+            annotation_id = d.pop("annotation_id")
+            coco["annotations"].append({"id": annotation_id, **d})
+
+    io.save_json(coco, export_dir / f"{split}.json", create_directory=True)
+    return [f"{split}.json"]
+
+
+def export_autocare_dlt(
+    self,
+    export_dir: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+    manifest: ExportManifest = None,
+    workers: int = None,
+    callback: ThreadProgressCallback = None,
+) -> str:
     """Export dataset to Autocare DLT format
 
     Args:
         export_dir (Union[str, Path]): Path to export directory
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
+        manifest (ExportManifest, optional): Manifest of the export. Unchanged images and splits of the previous export are skipped. Defaults to None.
+        workers (int, optional): Number of worker threads exporting images. Defaults to None (auto).
+        callback (ThreadProgressCallback, optional): Progress callback (steps are images). Defaults to None.
 
     Returns:
         str: Path to export directory
@@ -88,27 +113,36 @@ def export_autocare_dlt(self, export_dir: Union[str, Path]) -> str:
 
     train_ids, val_ids, test_ids, unlabeled_ids = self.get_split_ids()
 
-    if self.task == TaskType.CLASSIFICATION:
-        _export_autocare_dlt(self, export_dir, train_ids, val_ids, test_ids, [])
-    elif self.task == TaskType.OBJECT_DETECTION:
-        _export_autocare_dlt(self, export_dir, train_ids, val_ids, test_ids, [])
-    elif self.task == TaskType.INSTANCE_SEGMENTATION:
-        _export_autocare_dlt(self, export_dir, train_ids, val_ids, test_ids, [])
-    elif self.task == TaskType.TEXT_RECOGNITION:
-        _export_autocare_dlt(self, export_dir, train_ids, val_ids, test_ids, [])
-    else:
+    if self.task not in [
+        TaskType.CLASSIFICATION,
+        TaskType.OBJECT_DETECTION,
+        TaskType.INSTANCE_SEGMENTATION,
+        TaskType.TEXT_RECOGNITION,
+    ]:
         raise ValueError(f"Unsupported task type: {self.task}")
 
+    export_images(
+        self,
+        export_dir,
+        {"train": train_ids, "val": val_ids, "test": test_ids},
+        lambda *args: _export_autocare_dlt_image(self, *args, link_mode=link_mode),
+        lambda *args: _export_autocare_dlt_split(self, *args),
+        manifest=manifest,
+        workers=workers,
+        callback=callback,
+    )
+
     return str(export_dir)
 
 
-def import_autocare_dlt(self, coco_files: list[str], coco_root_dirs: list[str]):
+def import_autocare_dlt(self, coco_files: list[str], coco_root_dirs: list[str], workers: int = None):
     """
     Import dataset from Autocare DLT format
 
     Args:
         coco_files (list[str]): List of coco files
         coco_root_dirs (list[str]): List of coco root directories
+        workers (int, optional): Number of workers copying images. Defaults to None (auto).
     """
     if len(coco_files) == 1:
         set_names = [None]
@@ -154,6 +188,9 @@ def import_autocare_dlt(self, coco_files: list[str], coco_root_dirs: list[str]):
     for coco, coco_root_dir, set_name in tqdm.tqdm(zip(cocos, coco_root_dirs, set_names)):
 
         image_ids = []
+        images = []
+        image_files = []
+        annotations = []
         for coco_image_id, annotation_dicts in coco.imgToAnns.items():
             if len(annotation_dicts) == 0:
                 warnings.warn(f"image_id {coco_image_id} has no annotations.")
@@ -170,27 +207,25 @@ def import_autocare_dlt(self, coco_files: list[str], coco_root_dirs: list[str]):
             if set_name:
                 file_name = f"{set_name}/{file_name}"
 
-            self.add_images(
-                [Image.from_dict({**image_dict, "image_id": image_id, "file_name": file_name})]
+            images.append(
+                Image.from_dict({**image_dict, "image_id": image_id, "file_name": file_name})
             )
-            io.copy_file(image_path, self.raw_image_dir / file_name, create_directory=True)
+            image_files.append((image_path, self.raw_image_dir / file_name))
 
             for annotation_dict in annotation_dicts:
                 annotation_dict.pop("id")
-                self.add_annotations(
-                    [
-                        Annotation.from_dict(
-                            {
-                                **annotation_dict,
-                                "image_id": image_id,
-                                "annotation_id": annotation_id,
-                                "category_id": coco_cat_id_to_waffle_cat_id[
-                                    annotation_dict["category_id"]
-                                ],
-                            },
-                            task=self.task,
-                        )
-                    ]
+                annotations.append(
+                    Annotation.from_dict(
+                        {
+                            **annotation_dict,
+                            "image_id": image_id,
+                            "annotation_id": annotation_id,
+                            "category_id": coco_cat_id_to_waffle_cat_id[
+                                annotation_dict["category_id"]
+                            ],
+                        },
+                        task=self.task,
+                    )
                 )
                 annotation_id += 1
 
@@ -198,6 +233,10 @@ def import_autocare_dlt(self, coco_files: list[str], coco_root_dirs: list[str]):
             image_id += 1
             pgbar.update(1)
 
+        link_image_files(image_files, workers=workers)
+        self.add_images(images)
+        self.add_annotations(annotations)
+
         if set_name:
             io.save_json(image_ids, self.set_dir / f"{set_name}.json", create_directory=True)
 
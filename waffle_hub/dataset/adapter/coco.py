@@ -1,5 +1,9 @@
+import json
 import logging
+import sqlite3
+import tempfile
 import warnings
+from itertools import groupby
 from pathlib import Path
 from typing import Union
 
@@ -7,78 +11,107 @@ import tqdm
 from pycocotools.coco import COCO
 from waffle_utils.file import io
 
-from waffle_hub import TaskType
+from waffle_hub import LinkMode, TaskType
 from waffle_hub.schema.fields import Annotation, Category, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
 from waffle_hub.utils.conversion import convert_rle_to_polygon
+from waffle_hub.utils.file import link_file
+from waffle_hub.utils.stream import iter_json_object
 
+from .common import ExportManifest, export_images, link_image_files
 
-def _export_coco(
+# streaming import: rows inserted to the spill database at once / images added to the dataset at once
+COCO_SPILL_BATCH_SIZE = 10000
+COCO_STREAM_FLUSH_SIZE = 1000
+
+
+def _export_coco_image(
     self,
     export_dir: Path,
-    train_ids: list,
-    val_ids: list,
-    test_ids: list,
-    unlabeled_ids: list,
-):
-    """Export dataset to COCO format
+    split: str,
+    image: Image,
+    annotations: list[Annotation],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+) -> list[str]:
+    """Put an image to the images directory of COCO format export
+
+    Args:
+        export_dir (Path): Path to export directory
+        split (str): Split name of the image
+        image (Image): Image to export
+        annotations (list[Annotation]): Annotations of the image
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
+
+    Returns:
+        list[str]: Exported files (relative to export directory)
+    """
+    image_dst_path = Path("images") / image.file_name
+    link_file(
+        self.raw_image_dir / image.file_name,
+        export_dir / image_dst_path,
+        link_mode,
+        create_directory=True,
+    )
+    return [image_dst_path.as_posix()]
+
+
+def _export_coco_split(self, export_dir: Path, split: str, images: list[Image]) -> list[str]:
+    """Write COCO format json file of a split
 
     Args:
         export_dir (Path): Path to export directory
-        train_ids (list): List of train ids
-        val_ids (list): List of validation ids
-        test_ids (list): List of test ids
-        unlabeled_ids (list): List of unlabeled ids
+        split (str): Split name
+        images (list[Image]): Images of the split
+
+    Returns:
+        list[str]: Exported files (relative to export directory)
     """
-    io.make_directory(export_dir)
-
-    image_dir = export_dir / "images"
-
-    for split, image_ids in zip(
-        ["train", "val", "test", "unlabeled"],
-        [train_ids, val_ids, test_ids, unlabeled_ids],
-    ):
-        if len(image_ids) == 0:
-            continue
-
-        coco = {
-            "categories": [
-                {
-                    "id": category.category_id,
-                    "name": category.name,
-                    "supercategory": category.supercategory,
-                }
-                for category in self.get_categories()
-            ],
-            "images": [],
-            "annotations": [],
-        }
-
-        for image in self.get_images(image_ids):
-            image_path = self.raw_image_dir / image.file_name
-            image_dst_path = image_dir / image.file_name
-            io.copy_file(image_path, image_dst_path, create_directory=True)
-
-            d = image.to_dict()
-            image_id = d.pop("image_id")
-            coco["images"].append({"id": image_id, **d})
-
-            annotations = self.get_annotations(image_id)
-            for annotation in annotations:
-                d = annotation.to_dict()
-                if d.get("segmentation", None):
-                    if isinstance(d["segmentation"], dict):
-                        d["segmentation"] = convert_rle_to_polygon(d["segmentation"])
-                annotation_id = d.pop("annotation_id")
-                coco["annotations"].append({"id": annotation_id, **d})
-
-        io.save_json(coco, export_dir / f"{split}.json", create_directory=True)
-
-
-def export_coco(self, export_dir: Union[str, Path]) -> str:
+    coco = {
+        "categories": [
+            {
+                "id": category.category_id,
+                "name": category.name,
+                "supercategory": category.supercategory,
+            }
+            for category in self.get_categories()
+        ],
+        "images": [],
+        "annotations": [],
+    }
+
+    for image in images:
+        d = image.to_dict()
+        image_id = d.pop("image_id")
+        coco["images"].append({"id": image_id, **d})
+
+        for annotation in self.image_to_annotations.get(image_id, []):
+            d = annotation.to_dict()
+            if d.get("segmentation", None):
+                if isinstance(d["segmentation"], dict):
+                    d["segmentation"] = convert_rle_to_polygon(d["segmentation"])
+            annotation_id = d.pop("annotation_id")
+            coco["annotations"].append({"id": annotation_id, **d})
+
+    io.save_json(coco, export_dir / f"{split}.json", create_directory=True)
+    return [f"{split}.json"]
+
+
+def export_coco(
+    self,
+    export_dir: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+    manifest: ExportManifest = None,
+    workers: int = None,
+    callback: ThreadProgressCallback = None,
+) -> str:
     """Export dataset to COCO format
 
     Args:
         export_dir (str): Path to export directory
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
+        manifest (ExportManifest, optional): Manifest of the export. Unchanged images and splits of the previous export are skipped. Defaults to None.
+        workers (int, optional): Number of worker threads exporting images. Defaults to None (auto).
+        callback (ThreadProgressCallback, optional): Progress callback (steps are images). Defaults to None.
 
     Returns:
         str: Path to export directory
@@ -87,35 +120,93 @@ def export_coco(self, export_dir: Union[str, Path]) -> str:
 
     train_ids, val_ids, test_ids, _ = self.get_split_ids()
 
-    if self.task == TaskType.CLASSIFICATION:
-        _export_coco(self, export_dir, train_ids, val_ids, test_ids, [])
-    elif self.task == TaskType.OBJECT_DETECTION:
-        _export_coco(self, export_dir, train_ids, val_ids, test_ids, [])
-    elif self.task == TaskType.INSTANCE_SEGMENTATION:
-        _export_coco(self, export_dir, train_ids, val_ids, test_ids, [])
-    else:
+    if self.task not in [
+        TaskType.CLASSIFICATION,
+        TaskType.OBJECT_DETECTION,
+        TaskType.INSTANCE_SEGMENTATION,
+    ]:
         raise ValueError(f"Unsupported task type: {self.task}")
 
+    export_images(
+        self,
+        export_dir,
+        {"train": train_ids, "val": val_ids, "test": test_ids},
+        lambda *args: _export_coco_image(self, *args, link_mode=link_mode),
+        lambda *args: _export_coco_split(self, *args),
+        manifest=manifest,
+        workers=workers,
+        callback=callback,
+    )
+
     return str(export_dir)
 
 
-def import_coco(self, coco_files: list[str], coco_root_dirs: list[str]):
-    """
-    Import coco dataset
+def _import_coco_image(
+    self, image_dict: dict, image_id: int, coco_root_dir: str, set_name: str = None
+) -> tuple[Image, tuple[Path, Path]]:
+    """Convert a coco image to waffle "Image".
+    The image file is not copied here, (source, destination) path is returned to be imported in bulk."""
+    image_dict = dict(image_dict)
+    image_dict.pop("id")
 
-    Args:
-        coco_files (list[str]): List of coco annotation files
-        coco_root_dirs (list[str]): List of coco root directories
-    """
+    file_name = image_dict.pop("file_name")
+    image_path = Path(coco_root_dir) / file_name
+    if not image_path.exists():
+        raise FileNotFoundError(f"{image_path} does not exist.")
+
+    if set_name:
+        file_name = f"{set_name}/{file_name}"
+
+    image = Image.from_dict({**image_dict, "image_id": image_id, "file_name": file_name})
+    return image, (image_path, self.raw_image_dir / file_name)
+
+
+def _import_coco_annotation(
+    self,
+    annotation_dict: dict,
+    image_id: int,
+    annotation_id: int,
+    coco_cat_id_to_waffle_cat_id: dict,
+) -> Annotation:
+    """Convert a coco annotation to waffle "Annotation"."""
+    annotation_dict = dict(annotation_dict)
+    annotation_dict.pop("id")
+    return Annotation.from_dict(
+        {
+            **annotation_dict,
+            "image_id": image_id,
+            "annotation_id": annotation_id,
+            "category_id": coco_cat_id_to_waffle_cat_id[annotation_dict["category_id"]],
+        },
+        task=self.task,
+    )
+
+
+def _add_coco_categories(self, categories: list[dict]) -> dict:
+    """Add coco categories to dataset and return coco category id to waffle category id map."""
+    coco_cat_id_to_waffle_cat_id = {}
+    for i, category in enumerate(categories, start=1):
+        category = dict(category)
+        coco_category_id = category.pop("id")
+        coco_cat_id_to_waffle_cat_id[coco_category_id] = i
+        self.add_categories([Category.from_dict({**category, "category_id": i}, task=self.task)])
+    return coco_cat_id_to_waffle_cat_id
+
+
+def _get_set_names(coco_files: list[str]) -> list[str]:
     if len(coco_files) == 1:
-        set_names = [None]
+        return [None]
     elif len(coco_files) == 2:
-        set_names = ["train", "val"]
+        return ["train", "val"]
     elif len(coco_files) == 3:
-        set_names = ["train", "val", "test"]
+        return ["train", "val", "test"]
     else:
         raise ValueError("coco_file should have 1, 2, or 3 files.")
 
+
+def _import_coco(self, coco_files: list[str], coco_root_dirs: list[str], workers: int = None):
+    set_names = _get_set_names(coco_files)
+
     cocos = [COCO(coco_file) for coco_file in coco_files]
 
     # categories should be same between coco files
@@ -124,11 +215,7 @@ def import_coco(self, coco_files: list[str], coco_root_dirs: list[str]):
         if categories != coco.loadCats(coco.getCatIds()):
             raise ValueError("categories should be same between coco files.")
 
-    coco_cat_id_to_waffle_cat_id = {}
-    for i, category in enumerate(categories, start=1):
-        coco_category_id = category.pop("id")
-        coco_cat_id_to_waffle_cat_id[coco_category_id] = i
-        self.add_categories([Category.from_dict({**category, "category_id": i}, task=self.task)])
+    coco_cat_id_to_waffle_cat_id = _add_coco_categories(self, categories)
 
     # import coco dataset
     total_length = sum([len(coco.getImgIds()) for coco in cocos])
@@ -142,43 +229,26 @@ def import_coco(self, coco_files: list[str], coco_root_dirs: list[str]):
     for coco, coco_root_dir, set_name in tqdm.tqdm(zip(cocos, coco_root_dirs, set_names)):
 
         image_ids = []
+        images = []
+        image_files = []
+        annotations = []
         for coco_image_id, annotation_dicts in coco.imgToAnns.items():
             if len(annotation_dicts) == 0:
                 warnings.warn(f"image_id {coco_image_id} has no annotations.")
                 continue
 
             image_dict = coco.loadImgs(coco_image_id)[0]
-            image_dict.pop("id")
-
-            file_name = image_dict.pop("file_name")
-            image_path = Path(coco_root_dir) / file_name
-            if not image_path.exists():
-                raise FileNotFoundError(f"{image_path} does not exist.")
-
-            if set_name:
-                file_name = f"{set_name}/{file_name}"
-
-            self.add_images(
-                [Image.from_dict({**image_dict, "image_id": image_id, "file_name": file_name})]
+            image, image_file = _import_coco_image(
+                self, image_dict, image_id, coco_root_dir, set_name
             )
-            io.copy_file(image_path, self.raw_image_dir / file_name, create_directory=True)
+            images.append(image)
+            image_files.append(image_file)
 
             for annotation_dict in annotation_dicts:
-                annotation_dict.pop("id")
-                self.add_annotations(
-                    [
-                        Annotation.from_dict(
-                            {
-                                **annotation_dict,
-                                "image_id": image_id,
-                                "annotation_id": annotation_id,
-                                "category_id": coco_cat_id_to_waffle_cat_id[
-                                    annotation_dict["category_id"]
-                                ],
-                            },
-                            task=self.task,
-                        )
-                    ]
+                annotations.append(
+                    _import_coco_annotation(
+                        self, annotation_dict, image_id, annotation_id, coco_cat_id_to_waffle_cat_id
+                    )
                 )
                 annotation_id += 1
 
@@ -186,7 +256,173 @@ def import_coco(self, coco_files: list[str], coco_root_dirs: list[str]):
             image_id += 1
             pgbar.update(1)
 
+        link_image_files(image_files, workers=workers)
+        self.add_images(images)
+        self.add_annotations(annotations)
+
         if set_name:
             io.save_json(image_ids, self.set_dir / f"{set_name}.json", create_directory=True)
 
     pgbar.close()
+
+
+def _spill_coco_file(coco_file: str, conn: sqlite3.Connection) -> tuple[list[dict], int]:
+    """Stream a coco json file into spill tables, without loading the whole file.
+
+    Args:
+        coco_file (str): coco json file path.
+        conn (sqlite3.Connection): spill database connection.
+
+    Returns:
+        tuple[list[dict], int]: categories (in the same form as pycocotools loadCats) and the number of images.
+    """
+    # columns without type affinity keep the original coco id types
+    conn.execute("CREATE TABLE images (id PRIMARY KEY, data TEXT)")
+    conn.execute("CREATE TABLE annotations (seq INTEGER PRIMARY KEY, image_id, data TEXT)")
+
+    categories = {}
+    image_rows, annotation_rows = [], []
+
+    def _flush():
+        conn.executemany("INSERT OR REPLACE INTO images (id, data) VALUES (?, ?)", image_rows)
+        conn.executemany(
+            "INSERT INTO annotations (seq, image_id, data) VALUES (?, ?, ?)", annotation_rows
+        )
+        image_rows.clear()
+        annotation_rows.clear()
+
+    annotation_seq = 0
+    for key, value in iter_json_object(coco_file, stream_keys=["images", "annotations"]):
+        if key == "images":
+            image_rows.append((value["id"], json.dumps(value)))
+        elif key == "annotations":
+            annotation_rows.append((annotation_seq, value["image_id"], json.dumps(value)))
+            annotation_seq += 1
+        elif key == "categories":
+            for category in value:
+                categories[category["id"]] = category  # same as pycocotools
+
+        if len(image_rows) + len(annotation_rows) >= COCO_SPILL_BATCH_SIZE:
+            _flush()
+    _flush()
+    conn.commit()
+
+    image_num = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+    return list(categories.values()), image_num
+
+
+def _iter_spilled_coco(conn: sqlite3.Connection):
+    """Iterate (image_dict, annotation_dicts) from spill tables.
+    Images are ordered by their first annotation and annotations keep the file order,
+    which is the order of pycocotools imgToAnns. The sort is done by sqlite, on disk if needed.
+    """
+    rows = conn.execute(
+        "SELECT a.image_id, a.data FROM annotations a "
+        "JOIN (SELECT image_id, MIN(seq) AS first_seq FROM annotations GROUP BY image_id) f "
+        "ON a.image_id = f.image_id "
+        "ORDER BY f.first_seq, a.seq"
+    )
+    for coco_image_id, group in groupby(rows, key=lambda row: row[0]):
+        image_row = conn.execute("SELECT data FROM images WHERE id = ?", (coco_image_id,)).fetchone()
+        if image_row is None:
+            raise ValueError(f"image_id {coco_image_id} of annotations does not exist in images.")
+        yield json.loads(image_row[0]), [json.loads(data) for _, data in group]
+
+
+def _import_coco_streaming(
+    self, coco_files: list[str], coco_root_dirs: list[str], workers: int = None
+):
+    set_names = _get_set_names(coco_files)
+
+    first_categories = None
+    coco_cat_id_to_waffle_cat_id = None
+
+    image_id = 1
+    annotation_id = 1
+
+    with tempfile.TemporaryDirectory(dir=self.dataset_dir) as spill_dir:
+        for i, (coco_file, coco_root_dir, set_name) in enumerate(
+            zip(coco_files, coco_root_dirs, set_names)
+        ):
+            conn = sqlite3.connect(Path(spill_dir) / f"spill_{i}.db")
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("PRAGMA temp_store=FILE")
+            try:
+                logging.info(f"Streaming coco file {coco_file}")
+                categories, image_num = _spill_coco_file(coco_file, conn)
+
+                # categories should be same between coco files
+                if first_categories is None:
+                    first_categories = categories
+                    coco_cat_id_to_waffle_cat_id = _add_coco_categories(self, categories)
+                elif categories != first_categories:
+                    raise ValueError("categories should be same between coco files.")
+
+                image_ids = []
+                images = []
+                image_files = []
+                annotations = []
+                for image_dict, annotation_dicts in tqdm.tqdm(
+                    _iter_spilled_coco(conn), total=image_num, desc="Importing coco dataset"
+                ):
+                    image, image_file = _import_coco_image(
+                        self, image_dict, image_id, coco_root_dir, set_name
+                    )
+                    images.append(image)
+                    image_files.append(image_file)
+                    for annotation_dict in annotation_dicts:
+                        annotations.append(
+                            _import_coco_annotation(
+                                self,
+                                annotation_dict,
+                                image_id,
+                                annotation_id,
+                                coco_cat_id_to_waffle_cat_id,
+                            )
+                        )
+                        annotation_id += 1
+
+                    image_ids.append(image_id)
+                    image_id += 1
+
+                    # keep memory bounded
+                    if len(images) >= COCO_STREAM_FLUSH_SIZE:
+                        link_image_files(image_files, workers=workers, desc=None)
+                        self.add_images(images)
+                        self.add_annotations(annotations)
+                        images, image_files, annotations = [], [], []
+
+                link_image_files(image_files, workers=workers, desc=None)
+                self.add_images(images)
+                self.add_annotations(annotations)
+
+                if set_name:
+                    io.save_json(image_ids, self.set_dir / f"{set_name}.json", create_directory=True)
+            finally:
+                conn.close()
+
+
+def import_coco(
+    self,
+    coco_files: list[str],
+    coco_root_dirs: list[str],
+    streaming: bool = False,
+    workers: int = None,
+):
+    """
+    Import coco dataset
+
+    Args:
+        coco_files (list[str]): List of coco annotation files
+        coco_root_dirs (list[str]): List of coco root directories
+        streaming (bool, optional):
+            Parse coco files incrementally and group annotations by image in a temporary spill database,
+            instead of building the pycocotools index in memory. Memory stays bounded regardless of the file size,
+            and the resulting dataset is the same. Defaults to False.
+        workers (int, optional): Number of workers copying images. Defaults to None (auto).
+    """
+    if streaming:
+        _import_coco_streaming(self, coco_files, coco_root_dirs, workers=workers)
+    else:
+        _import_coco(self, coco_files, coco_root_dirs, workers=workers)
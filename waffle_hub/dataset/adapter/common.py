@@ -0,0 +1,302 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Union
+
+from tqdm import tqdm
+from waffle_utils.file import io
+
+from waffle_hub.schema.fields import Annotation, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
+from waffle_hub.utils.file import link_or_copy_file
+from waffle_hub.utils.image import get_image_size
+
+logger = logging.getLogger(__name__)
+
+# importers and exporters are bound by file io (header reads, copies, links), so threads are enough
+DEFAULT_IMPORT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+DEFAULT_EXPORT_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+
+
+def _link_image_file(src_dst: tuple[Union[str, Path], Union[str, Path]]):
+    src, dst = src_dst
+    link_or_copy_file(src, dst, create_directory=True)
+
+
+def _import_image_file(src_dst: tuple[Union[str, Path], Union[str, Path]]) -> tuple[int, int]:
+    width, height = get_image_size(src_dst[0])
+    _link_image_file(src_dst)
+    return width, height
+
+
+def _run_stage(func: Callable, image_files: list, workers: int = None, desc: str = None) -> list:
+    for src, _ in image_files:
+        if not os.path.exists(src):
+            raise FileNotFoundError(f"{src} does not exist.")
+
+    workers = DEFAULT_IMPORT_WORKERS if workers is None else workers
+    if workers <= 0 or len(image_files) <= 1:
+        return [func(src_dst) for src_dst in tqdm(image_files, desc=desc)]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(image_files))) as executor:
+        return list(tqdm(executor.map(func, image_files), total=len(image_files), desc=desc))
+
+
+def import_image_files(
+    image_files: list[tuple[Union[str, Path], Union[str, Path]]],
+    workers: int = None,
+    desc: str = "Importing images",
+) -> list[tuple[int, int]]:
+    """Importer stage shared by dataset adapters.
+    Put every source image to its destination (reflink or hardlink on the same filesystem, copy otherwise)
+    and read its size from the image header, without decoding pixels.
+
+    Args:
+        image_files (list[tuple[Union[str, Path], Union[str, Path]]]): (source image path, destination image path) list.
+        workers (int, optional): number of worker threads. 0 runs in the calling thread. Defaults to None (DEFAULT_IMPORT_WORKERS).
+        desc (str, optional): progress bar description. Defaults to "Importing images".
+
+    Raises:
+        FileNotFoundError: if a source image does not exist.
+
+    Returns:
+        list[tuple[int, int]]: (width, height) of each image, in the same order as image_files.
+    """
+    return _run_stage(_import_image_file, image_files, workers, desc)
+
+
+def link_image_files(
+    image_files: list[tuple[Union[str, Path], Union[str, Path]]],
+    workers: int = None,
+    desc: str = "Importing images",
+):
+    """Same as import_image_files, but without reading image sizes (for formats that already have them)."""
+    _run_stage(_link_image_file, image_files, workers, desc)
+
+
+# export
+class ExportManifest:
+    """Manifest of an export directory, used to re-export incrementally.
+
+    It records the export configuration (meta) and, for every exported image, its split,
+    a hash of its content (image record, annotations and raw image file stat) and the files written for it.
+    Files of split level (e.g. coco json) are recorded per split with a hash of the split content.
+    When the meta of a previous export is the same, only images and splits whose hash changed are exported again,
+    and files which are not produced anymore (orphans) are removed.
+
+    Args:
+        meta (dict): export configuration (data type, link mode, task, categories). A different meta means a full export.
+        old (dict, optional): previous manifest with the same meta. Defaults to None.
+    """
+
+    VERSION = 1
+    # hidden and not "*.json", so that it is never taken as an annotation file of the export
+    FILE_NAME = ".export_manifest"
+
+    def __init__(self, meta: dict, old: dict = None):
+        self.meta = meta
+        self.source = None
+        self.old_images: dict = old["images"] if old else {}
+        self.old_splits: dict = old["splits"] if old else {}
+        self.images: dict = {}
+        self.splits: dict = {}
+
+    @classmethod
+    def read(cls, export_dir: Union[str, Path]) -> dict:
+        """Read the manifest of an export directory. None if there is no valid manifest."""
+        manifest_file = Path(export_dir) / cls.FILE_NAME
+        if not manifest_file.exists():
+            return None
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(manifest, dict) or manifest.get("version") != cls.VERSION:
+            return None
+        return manifest
+
+    @classmethod
+    def load(cls, export_dir: Union[str, Path], meta: dict) -> "ExportManifest":
+        """Load the previous manifest if it has the same meta, otherwise start a new one."""
+        old = cls.read(export_dir)
+        return cls(meta, old if old and old.get("meta") == meta else None)
+
+    @property
+    def incremental(self) -> bool:
+        return bool(self.old_images or self.old_splits)
+
+    def save(self, export_dir: Union[str, Path]):
+        manifest_file = Path(export_dir) / ExportManifest.FILE_NAME
+        temp_file = manifest_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_file, "w") as f:
+            json.dump(
+                {
+                    "version": ExportManifest.VERSION,
+                    "meta": self.meta,
+                    "source": self.source,
+                    "images": self.images,
+                    "splits": self.splits,
+                },
+                f,
+                separators=(",", ":"),
+            )
+        os.replace(temp_file, manifest_file)
+
+    def is_clean(self, export_dir: Path, old_entry: dict, split: str, content_hash: str) -> bool:
+        return (
+            old_entry is not None
+            and old_entry["split"] == split
+            and old_entry["hash"] == content_hash
+            and all(os.path.lexists(export_dir / file) for file in old_entry["files"])
+        )
+
+    def remove_orphans(self, export_dir: Union[str, Path]) -> int:
+        """Remove files of the previous export which are not produced anymore.
+
+        Returns:
+            int: number of removed files.
+        """
+        export_dir = Path(export_dir)
+
+        def _files(images: dict, splits: dict) -> set:
+            return {f for entry in [*images.values(), *splits.values()] for f in entry["files"]}
+
+        orphans = _files(self.old_images, self.old_splits) - _files(self.images, self.splits)
+        for orphan in orphans:
+            orphan_path = export_dir / orphan
+            if os.path.lexists(orphan_path):
+                os.unlink(orphan_path)
+            # remove emptied directories
+            parent = orphan_path.parent
+            while parent != export_dir and parent.exists() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return len(orphans)
+
+
+def get_image_export_hash(self, image: Image, annotations: list[Annotation]) -> str:
+    """Hash of everything an exported image depends on.
+    The raw image file is represented by its size and modification time, not by its bytes.
+    """
+    content = hashlib.sha1()
+    content.update(json.dumps(image.to_dict(), sort_keys=True, default=str).encode())
+    for annotation in annotations:
+        content.update(json.dumps(annotation.to_dict(), sort_keys=True, default=str).encode())
+    try:
+        stat = os.stat(self.raw_image_dir / image.file_name)
+        content.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    except OSError:
+        pass
+    return content.hexdigest()
+
+
+def export_images(
+    self,
+    export_dir: Path,
+    split_ids: dict[str, list[int]],
+    export_image: Callable[[Path, str, Image, list[Annotation]], list[str]],
+    export_split: Callable[[Path, str, list[Image]], list[str]] = None,
+    manifest: ExportManifest = None,
+    workers: int = None,
+    callback: ThreadProgressCallback = None,
+) -> ExportManifest:
+    """Exporter stage shared by dataset adapters.
+    Export every image of every split with export_image, and split level files with export_split.
+    Images of all splits are exported by a pool of worker threads, with annotations from the in-memory index.
+    With a manifest of a previous export, images and splits which did not change are skipped.
+
+    Args:
+        export_dir (Path): export directory.
+        split_ids (dict[str, list[int]]): image ids of each split (e.g. {"train": [1, 2], "val": [3]}).
+        export_image (Callable[[Path, str, Image, list[Annotation]], list[str]]):
+            function(export_dir, split, image, annotations) writing files of an image. returns the written files (relative to export_dir).
+            It is called from worker threads.
+        export_split (Callable[[Path, str, list[Image]], list[str]], optional):
+            function(export_dir, split, images) writing files of a split. returns the written files (relative to export_dir). Defaults to None.
+        manifest (ExportManifest, optional): manifest to fill (and compare with the previous export). Defaults to None.
+        workers (int, optional): number of worker threads. 0 runs in the calling thread. Defaults to None (DEFAULT_EXPORT_WORKERS).
+        callback (ThreadProgressCallback, optional): progress callback. Its steps are images. Defaults to None.
+
+    Returns:
+        ExportManifest: manifest of the export.
+    """
+    manifest = manifest or ExportManifest(meta={})
+    export_dir = Path(export_dir)
+    io.make_directory(export_dir)
+
+    image_dict = self.image_dict
+    image_to_annotations = self.image_to_annotations
+
+    # find images to export
+    split_images = {}
+    split_hashes = {}
+    tasks = []  # (split, image, annotations, content hash)
+    for split, image_ids in split_ids.items():
+        images = [image_dict[image_id] for image_id in image_ids if image_id in image_dict]
+        if len(images) == 0:
+            continue
+        split_images[split] = images
+
+        split_hash = hashlib.sha1(split.encode())
+        for image in images:
+            annotations = image_to_annotations.get(image.image_id, [])
+            content_hash = get_image_export_hash(self, image, annotations)
+            split_hash.update(f"{image.image_id}:{content_hash};".encode())
+
+            key = str(image.image_id)
+            old_entry = manifest.old_images.get(key)
+            if manifest.is_clean(export_dir, old_entry, split, content_hash):
+                manifest.images[key] = old_entry
+            else:
+                tasks.append((split, image, annotations, content_hash))
+        split_hashes[split] = split_hash.hexdigest()
+
+    total = sum(map(len, split_images.values()))
+    done = total - len(tasks)
+    if callback is not None and total > 0:
+        callback.set_total_steps(total)
+        callback.update(done)
+
+    # export images
+    def _export(task) -> list[str]:
+        split, image, annotations, _ = task
+        return export_image(export_dir, split, image, annotations)
+
+    workers = DEFAULT_EXPORT_WORKERS if workers is None else workers
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as executor:
+        results = (
+            executor.map(_export, tasks) if workers > 0 and len(tasks) > 1 else map(_export, tasks)
+        )
+        for (split, image, _, content_hash), files in zip(tasks, results):
+            manifest.images[str(image.image_id)] = {
+                "split": split,
+                "hash": content_hash,
+                "files": files,
+            }
+            done += 1
+            if callback is not None:
+                callback.update(done)
+
+    elapsed = time.time() - start_time
+    logger.info(
+        f"Exported {len(tasks)} images ({total - len(tasks)} unchanged) in {elapsed:.2f}s"
+        + (f" ({len(tasks) / elapsed:.1f} images/s)" if elapsed > 0 else "")
+    )
+
+    # export split files
+    if export_split is not None:
+        for split, images in split_images.items():
+            old_entry = manifest.old_splits.get(split)
+            if manifest.is_clean(export_dir, old_entry, split, split_hashes[split]):
+                manifest.splits[split] = old_entry
+                continue
+            files = export_split(export_dir, split, images)
+            manifest.splits[split] = {"split": split, "hash": split_hashes[split], "files": files}
+
+    return manifest
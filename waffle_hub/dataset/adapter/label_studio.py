@@ -2,13 +2,30 @@ from pathlib import Path
 
 from tqdm import tqdm
 from waffle_utils.file import io
-from waffle_utils.image.io import load_image
 
 from waffle_hub import TaskType
 from waffle_hub.schema.fields import Annotation, Category, Image
 
+from .common import import_image_files
 
-def import_object_detection(self, json_file, image_dir=None):
+
+def _import_label_studio_images(
+    self, datas: list[dict], image_dir: str = None, workers: int = None
+) -> list[tuple[int, int]]:
+    """Copy the images of label studio tasks to the raw image directory and get their (width, height)."""
+    return import_image_files(
+        [
+            (
+                Path(image_dir) / data["file_upload"] if image_dir else data["data"]["image"],
+                self.raw_image_dir / data["file_upload"],
+            )
+            for data in datas
+        ],
+        workers=workers,
+    )
+
+
+def import_object_detection(self, json_file, image_dir=None, workers: int = None):
     """
     Label studio object detection format
 
@@ -53,15 +70,13 @@ def import_object_detection(self, json_file, image_dir=None):
     category_to_id = {}
 
     datas = io.load_json(json_file)
+    image_sizes = _import_label_studio_images(self, datas, image_dir, workers)
 
-    for image_id, data in tqdm(enumerate(datas, start=1), total=len(datas)):
+    for image_id, (data, (W, H)) in tqdm(
+        enumerate(zip(datas, image_sizes), start=1), total=len(datas)
+    ):
 
         image_file_name = data["file_upload"]
-        src_image_path = Path(image_dir) / image_file_name if image_dir else data["data"]["image"]
-        io.copy_file(src_image_path, self.raw_image_dir / image_file_name, create_directory=True)
-
-        H, W = load_image(src_image_path).shape[:2]
-
         image = Image.new(
             image_id=image_id,
             file_name=str(image_file_name),
@@ -107,7 +122,7 @@ def import_object_detection(self, json_file, image_dir=None):
     self.add_annotations(annotations)
 
 
-def import_classification(self, json_file, image_dir):
+def import_classification(self, json_file, image_dir, workers: int = None):
     """
     Label studio classification format
 
@@ -148,15 +163,13 @@ def import_classification(self, json_file, image_dir):
     category_to_id = {}
 
     datas = io.load_json(json_file)
+    image_sizes = _import_label_studio_images(self, datas, image_dir, workers)
 
-    for image_id, data in tqdm(enumerate(datas, start=1), total=len(datas)):
+    for image_id, (data, (W, H)) in tqdm(
+        enumerate(zip(datas, image_sizes), start=1), total=len(datas)
+    ):
 
         image_file_name = data["file_upload"]
-        src_image_path = Path(image_dir) / image_file_name if image_dir else data["data"]["image"]
-        io.copy_file(src_image_path, self.raw_image_dir / image_file_name, create_directory=True)
-
-        H, W = load_image(src_image_path).shape[:2]
-
         image = Image.new(
             image_id=image_id,
             file_name=str(image_file_name),
@@ -194,7 +207,7 @@ def import_classification(self, json_file, image_dir):
     self.add_annotations(annotations)
 
 
-def import_label_studio(self, json_file, task, image_dir=None):
+def import_label_studio(self, json_file, task, image_dir=None, workers: int = None):
 
     if task == TaskType.OBJECT_DETECTION:
         _import = import_object_detection
@@ -203,7 +216,7 @@ def import_label_studio(self, json_file, task, image_dir=None):
     else:
         raise NotImplementedError(f"Task type {task} not implemented")
 
-    _import(self, json_file, image_dir)
+    _import(self, json_file, image_dir, workers=workers)
 
     # TODO: add unlabeled set
     io.save_json([], self.unlabeled_set_file, create_directory=True)
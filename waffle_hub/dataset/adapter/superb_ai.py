@@ -11,8 +11,10 @@ from waffle_utils.file import io
 from waffle_hub import TaskType
 from waffle_hub.schema.fields import Annotation, Category, Image
 
+from .common import link_image_files
 
-def import_superb_ai(self, superb_project_json, superb_meta, superb_root_dir, cls_type):
+
+def import_superb_ai(self, superb_project_json, superb_meta, superb_root_dir, cls_type, workers: int = None):
     """
     Import coco dataset
 
@@ -20,6 +22,7 @@ def import_superb_ai(self, superb_project_json, superb_meta, superb_root_dir, cl
         superb_project_json (list[str]): List of Project json file
         superb_meta (list[str]): List of superb ai meta files root directories
         superb_root_dir (list[str]): List of superb ai meta files root directories
+        workers (int, optional): Number of workers copying images. Defaults to None (auto).
     """
 
     # cocos = [COCO(coco_file) for coco_file in coco_files]
@@ -63,8 +66,10 @@ def import_superb_ai(self, superb_project_json, superb_meta, superb_root_dir, cl
     image_id = 1
     annotation_id = 1
 
+    images = []
+    image_files = []
+    annotations = []
     for i, meta_path in enumerate(metas):
-        image_ids = []
         meta = io.load_json(meta_path)
         file_name = meta['data_key']
         image_path = Path(superb_root_dir) / file_name[1:]
@@ -72,15 +77,14 @@ def import_superb_ai(self, superb_project_json, superb_meta, superb_root_dir, cl
         if not image_path.exists():
             raise FileNotFoundError(f"{image_path} does not exist.")
 
-
-        self.add_images(
-            [Image.from_dict({"width": meta['image_info']['width'],
-                              "height": meta['image_info']['height'],
-                              "image_id": image_id,
-                              "file_name": Path(file_name).name
-                              })]
+        images.append(
+            Image.from_dict({"width": meta['image_info']['width'],
+                             "height": meta['image_info']['height'],
+                             "image_id": image_id,
+                             "file_name": Path(file_name).name
+                             })
         )
-        io.copy_file(image_path, self.raw_image_dir / Path(file_name).name, create_directory=True)
+        image_files.append((image_path, self.raw_image_dir / Path(file_name).name))
 
         anns_file = meta['label_path'][0]
 
@@ -103,19 +107,20 @@ def import_superb_ai(self, superb_project_json, superb_meta, superb_root_dir, cl
                 'iscrowd': 0,
                 "category_id": superb_cat_id_to_waffle_cat_id[label_cls]
             }
-            self.add_annotations(
-                [
-                    Annotation.from_dict(
-                        {
-                            **annotation_dict
-                        },
-                        task=self.task,
-                    )
-                ]
+            annotations.append(
+                Annotation.from_dict(
+                    {
+                        **annotation_dict
+                    },
+                    task=self.task,
+                )
             )
             annotation_id += 1
-        image_ids.append(image_id)
         image_id += 1
         pgbar.update(1)
     
-    pgbar.close()
\ No newline at end of file
+    pgbar.close()
+
+    link_image_files(image_files, workers=workers)
+    self.add_images(images)
+    self.add_annotations(annotations)
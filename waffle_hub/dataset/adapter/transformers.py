@@ -16,7 +16,7 @@ from datasets import (
     Value,
     load_from_disk,
 )
-from waffle_hub import TaskType
+from waffle_hub import LinkMode, TaskType
 from waffle_hub.schema.fields import Annotation, Category, Image
 
 
@@ -147,11 +147,22 @@ def _export_transformers_detection(
     dataset.save_to_disk(export_dir)
 
 
-def export_transformers(self, export_dir: Union[str, Path]) -> str:
+def export_transformers(
+    self,
+    export_dir: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+    manifest=None,
+    workers: int = None,
+    callback=None,
+) -> str:
     """Export dataset to Transformers format
 
     Args:
         export_dir (str): Path to export directory
+        link_mode (Union[str, LinkMode], optional): Not used. Images are encoded into the arrow files of huggingface datasets.
+        manifest (ExportManifest, optional): Not used. Transformers format is always exported fully.
+        workers (int, optional): Not used.
+        callback (ThreadProgressCallback, optional): Not used.
 
     Returns:
         str: Path to export directory
@@ -0,0 +1,286 @@
+import io
+import json
+import os
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Union
+
+from waffle_hub import LinkMode
+from waffle_hub.schema.fields import Annotation, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
+
+from .common import DEFAULT_EXPORT_WORKERS, ExportManifest
+
+# shards of about 1GB are read at full bandwidth from network filesystems and object stores
+DEFAULT_SHARD_SIZE = 1 << 30
+
+WEBDATASET_INDEX_FILE_NAME = "index.json"
+WEBDATASET_INDEX_VERSION = 1
+
+# sample columns of the index
+_KEY, _SHARD, _IMAGE_OFFSET, _IMAGE_SIZE, _JSON_OFFSET, _JSON_SIZE = range(6)
+
+
+def _get_sample_key(image: Image) -> str:
+    return f"{image.image_id:09d}"
+
+
+def _get_image_extension(image: Image) -> str:
+    # webdataset groups the files of a sample by key, so the extension must not contain dots
+    return Path(image.file_name).suffix.lstrip(".").lower() or "jpg"
+
+
+def _get_sample_json(image: Image, annotations: list[Annotation]) -> bytes:
+    return json.dumps(
+        {
+            "image": image.to_dict(),
+            "annotations": [annotation.to_dict() for annotation in annotations],
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+def _plan_shards(self, images: list[Image], shard_size: int) -> list[list[Image]]:
+    """Group images in order into shards of at most shard_size bytes (a larger image gets its own shard)."""
+    shards = [[]]
+    size = 0
+    for image in images:
+        # tar headers and padding are about 2KB per sample
+        image_size = os.path.getsize(self.raw_image_dir / image.file_name) + 2048
+        if shards[-1] and size + image_size > shard_size:
+            shards.append([])
+            size = 0
+        shards[-1].append(image)
+        size += image_size
+    return shards if shards[-1] else []
+
+
+def _write_shard(self, shard_path: Path, images: list[Image]) -> list[list]:
+    """Write a tar shard and return its index rows (without the shard column)."""
+    shard_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = shard_path.with_suffix(f".{threading.get_ident()}.tmp")
+
+    members = []
+    with tarfile.open(temp_path, "w", format=tarfile.USTAR_FORMAT) as tar:
+        for image in images:
+            key = _get_sample_key(image)
+            annotations = self.image_to_annotations.get(image.image_id, [])
+
+            image_info = tarfile.TarInfo(f"{key}.{_get_image_extension(image)}")
+            image_path = self.raw_image_dir / image.file_name
+            image_info.size = os.path.getsize(image_path)
+            image_offset = tar.offset + len(image_info.tobuf(tar.format, tar.encoding, tar.errors))
+            with open(image_path, "rb") as f:
+                tar.addfile(image_info, f)
+
+            sample_json = _get_sample_json(image, annotations)
+            json_info = tarfile.TarInfo(f"{key}.json")
+            json_info.size = len(sample_json)
+            json_offset = tar.offset + len(json_info.tobuf(tar.format, tar.encoding, tar.errors))
+            tar.addfile(json_info, io.BytesIO(sample_json))
+
+            members.append([key, image_offset, image_info.size, json_offset, json_info.size])
+    os.replace(temp_path, shard_path)
+    return members
+
+
+def export_webdataset(
+    self,
+    export_dir: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+    manifest: ExportManifest = None,
+    workers: int = None,
+    callback: ThreadProgressCallback = None,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> str:
+    """Export dataset to WebDataset format (tar shards)
+
+    {export_dir}/
+        {split}/
+            000000.tar  # {key}.{image extension} (raw image bytes) and {key}.json ({"image": ..., "annotations": [...]})
+            000001.tar
+            index.json  # task, categories, shards and the offsets of every sample for random access
+
+    Args:
+        export_dir (Union[str, Path]): Path to export directory
+        link_mode (Union[str, LinkMode], optional): Not used. Raw image bytes are written in the shards.
+        manifest (ExportManifest, optional): Manifest of the export, filled with the written files. Shards are always exported fully.
+        workers (int, optional): Number of worker threads writing shards. Defaults to None (auto).
+        callback (ThreadProgressCallback, optional): Progress callback (steps are images). Defaults to None.
+        shard_size (int, optional): Maximum size of a shard in bytes. Defaults to DEFAULT_SHARD_SIZE (1GB).
+
+    Returns:
+        str: Path to export directory
+    """
+    export_dir = Path(export_dir)
+    export_dir.mkdir(parents=True, exist_ok=True)
+
+    train_ids, val_ids, test_ids, unlabeled_ids = self.get_split_ids()
+    split_images = {}
+    for split, image_ids in zip(
+        ["train", "val", "test", "unlabeled"], [train_ids, val_ids, test_ids, unlabeled_ids]
+    ):
+        images = [
+            self.image_dict.get(image_id) or self.unlabeled_image_dict.get(image_id)
+            for image_id in image_ids
+        ]
+        images = [image for image in images if image is not None]
+        if images:
+            split_images[split] = images
+
+    tasks = []  # (split, shard index, images)
+    for split, images in split_images.items():
+        for i, shard_images in enumerate(_plan_shards(self, images, shard_size)):
+            tasks.append((split, i, shard_images))
+
+    total = sum(map(len, split_images.values()))
+    if callback is not None and total > 0:
+        callback.set_total_steps(total)
+
+    def _export(task) -> list[list]:
+        split, i, images = task
+        return _write_shard(self, export_dir / split / f"{i:06d}.tar", images)
+
+    workers = DEFAULT_EXPORT_WORKERS if workers is None else workers
+    split_samples = {split: [] for split in split_images}
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tasks)))) as executor:
+        results = (
+            executor.map(_export, tasks) if workers > 0 and len(tasks) > 1 else map(_export, tasks)
+        )
+        for (split, i, images), members in zip(tasks, results):
+            split_samples[split].extend([[key, i, *offsets] for key, *offsets in members])
+            done += len(images)
+            if callback is not None:
+                callback.update(done)
+
+    categories = [category.to_dict() for category in self.get_categories()]
+    for split, samples in split_samples.items():
+        num_shards = samples[-1][_SHARD] + 1
+        index = {
+            "version": WEBDATASET_INDEX_VERSION,
+            "task": str(self.task).upper(),
+            "categories": categories,
+            "shards": [f"{i:06d}.tar" for i in range(num_shards)],
+            "samples": samples,
+        }
+        with open(export_dir / split / WEBDATASET_INDEX_FILE_NAME, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+
+        if manifest is not None:
+            manifest.splits[split] = {
+                "split": split,
+                "hash": None,
+                "files": [
+                    f"{split}/{file}" for file in [*index["shards"], WEBDATASET_INDEX_FILE_NAME]
+                ],
+            }
+
+    return str(export_dir)
+
+
+class WebDatasetReader:
+    """Reader of a WebDataset format export (see export_webdataset).
+
+    Samples are read by index with one seek and one read from an open shard, so reading them in order
+    (e.g. a DataLoader without shuffle) is sequential I/O over a few large files.
+    Iterating the reader streams the shards from start to end without seeking.
+
+    Args:
+        export_dir (Union[str, Path]): WebDataset export directory.
+        splits (list[str], optional): splits to read, in order. Defaults to None (every exported split).
+
+    Raises:
+        FileNotFoundError: if the export directory (or a split) has no WebDataset index.
+    """
+
+    def __init__(self, export_dir: Union[str, Path], splits: list[str] = None):
+        self.export_dir = Path(export_dir)
+        if splits is None:
+            splits = WebDatasetReader.get_split_list(self.export_dir)
+        if not splits:
+            raise FileNotFoundError(f"{self.export_dir} has no WebDataset split to read.")
+
+        self.task = None
+        self.categories = []
+        self.shard_paths: list[Path] = []
+        self.samples: list[list] = []  # rows of the index, with the shard column over all splits
+        for split in splits:
+            index_file = self.export_dir / split / WEBDATASET_INDEX_FILE_NAME
+            if not index_file.exists():
+                raise FileNotFoundError(f"{index_file} does not exist.")
+            with open(index_file) as f:
+                index = json.load(f)
+
+            self.task = index["task"]
+            self.categories = index["categories"]
+            shard_offset = len(self.shard_paths)
+            self.shard_paths.extend(self.export_dir / split / shard for shard in index["shards"])
+            for sample in index["samples"]:
+                sample[_SHARD] += shard_offset
+                self.samples.append(sample)
+
+        self._files = {}
+        self._pid = None
+
+    @classmethod
+    def get_split_list(cls, export_dir: Union[str, Path]) -> list[str]:
+        """Get the exported splits of a WebDataset export directory."""
+        return [
+            split
+            for split in ["train", "val", "test", "unlabeled"]
+            if (Path(export_dir) / split / WEBDATASET_INDEX_FILE_NAME).exists()
+        ]
+
+    @classmethod
+    def is_webdataset(cls, export_dir: Union[str, Path]) -> bool:
+        """Check if a directory is a WebDataset export."""
+        return len(WebDatasetReader.get_split_list(export_dir)) > 0
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getstate__(self):
+        # open files are not shared with DataLoader worker processes
+        state = self.__dict__.copy()
+        state["_files"] = {}
+        state["_pid"] = None
+        return state
+
+    def _read(self, shard: int, offset: int, size: int) -> bytes:
+        if self._pid != os.getpid():
+            self._files = {}
+            self._pid = os.getpid()
+        f = self._files.get(shard)
+        if f is None:
+            f = self._files[shard] = open(self.shard_paths[shard], "rb")
+        f.seek(offset)
+        return f.read(size)
+
+    def get_sample(self, idx: int) -> tuple[bytes, dict]:
+        """Get the raw image bytes and the sample json ({"image": ..., "annotations": [...]}) of a sample."""
+        sample = self.samples[idx]
+        image_bytes = self._read(sample[_SHARD], sample[_IMAGE_OFFSET], sample[_IMAGE_SIZE])
+        sample_json = json.loads(
+            self._read(sample[_SHARD], sample[_JSON_OFFSET], sample[_JSON_SIZE])
+        )
+        return image_bytes, sample_json
+
+    def __iter__(self) -> Iterator[tuple[bytes, dict]]:
+        """Stream (raw image bytes, sample json) of every sample, shard by shard."""
+        for shard_path in self.shard_paths:
+            image_bytes = None
+            with tarfile.open(shard_path, "r|") as tar:
+                for member in tar:
+                    data = tar.extractfile(member).read()
+                    if member.name.endswith(".json"):
+                        yield image_bytes, json.loads(data)
+                    else:
+                        image_bytes = data
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
@@ -2,22 +2,32 @@ import warnings
 from collections import defaultdict
 from itertools import groupby
 from pathlib import Path
-from typing import Union
+from typing import Iterable, Union
 
+import numpy as np
 from waffle_utils.file import io, search
-from waffle_utils.image.io import load_image
 
-from waffle_hub import TaskType
+from waffle_hub import LinkMode, TaskType
 from waffle_hub.schema.fields import Annotation, Category, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
 from waffle_hub.utils.conversion import merge_multi_segment
+from waffle_hub.utils.file import link_file
+from waffle_hub.utils.geometry import (
+    denormalize_bboxes,
+    denormalize_polygon,
+    normalize_bboxes,
+    normalize_polygons,
+)
 
+from .common import ExportManifest, export_images, import_image_files
 
-def _check_valid_file_paths(images: list[Image]) -> bool:
+
+def _check_valid_file_paths(images: Iterable[Image]) -> bool:
     """Check file paths are valid
     If the file name includes the words "images" or "labels," an error occurs during training
 
     Args:
-        images (list[Image]): List of Image
+        images (Iterable[Image]): Images
 
     Returns:
         bool: True if valid
@@ -39,181 +49,161 @@ def _check_valid_file_paths(images: list[Image]) -> bool:
 def _export_yolo_classification(
     self,
     export_dir: Path,
-    train_ids: list,
-    val_ids: list,
-    test_ids: list,
-    unlabeled_ids: list,
-):
-    """Export dataset to YOLO format for classification task
+    split: str,
+    image: Image,
+    annotations: list[Annotation],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+) -> list[str]:
+    """Export an image to YOLO format for classification task
 
     Args:
         export_dir (Path): Path to export directory
-        train_ids (list): List of train ids
-        val_ids (list): List of validation ids
-        test_ids (list): List of test ids
-        unlabeled_ids (list): List of unlabeled ids
+        split (str): Split name of the image
+        image (Image): Image to export
+        annotations (list[Annotation]): Annotations of the image
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
+
+    Returns:
+        list[str]: Exported files (relative to export directory)
     """
-    io.make_directory(export_dir)
+    image_path = self.raw_image_dir / image.file_name
+
+    if len(annotations) > 1:
+        warnings.warn(f"Multi label does not support yet. Skipping {image_path}.")
+        return []
+    category_name = self.category_dict[annotations[0].category_id].name
+
+    image_dst_path = Path(split) / category_name / image.file_name
+    link_file(image_path, export_dir / image_dst_path, link_mode, create_directory=True)
+    return [image_dst_path.as_posix()]
 
-    for split, image_ids in zip(
-        ["train", "val", "test", "unlabeled"],
-        [train_ids, val_ids, test_ids, unlabeled_ids],
-    ):
-        if len(image_ids) == 0:
-            continue
 
-        split_dir = export_dir / split
-        io.make_directory(split_dir)
+def _export_yolo_image_label(
+    self,
+    export_dir: Path,
+    split: str,
+    image: Image,
+    label_txts: list[str],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+) -> list[str]:
+    """Put an image to {split}/images and write its label file to {split}/labels"""
+    image_path = self.raw_image_dir / image.file_name
+    image_dst_path = Path(split) / "images" / image.file_name
+    label_dst_path = (Path(split) / "labels" / image.file_name).with_suffix(".txt")
 
-        category_names = {c.category_id: c.name for c in self.get_categories()}
-        for image in self.get_images(image_ids):
-            image_path = self.raw_image_dir / image.file_name
+    link_file(image_path, export_dir / image_dst_path, link_mode, create_directory=True)
 
-            annotations = self.get_annotations(image.image_id)
-            if len(annotations) > 1:
-                warnings.warn(f"Multi label does not support yet. Skipping {image_path}.")
-                continue
-            category_id = annotations[0].category_id
+    io.make_directory((export_dir / label_dst_path).parent)
+    with open(export_dir / label_dst_path, "w") as f:
+        f.write("\n".join(label_txts))
 
-            image_dst_path = split_dir / category_names[category_id] / image.file_name
-            io.copy_file(image_path, image_dst_path, create_directory=True)
+    return [image_dst_path.as_posix(), label_dst_path.as_posix()]
 
 
 def _export_yolo_detection(
     self,
     export_dir: Path,
-    train_ids: list,
-    val_ids: list,
-    test_ids: list,
-    unlabeled_ids: list,
-):
-    """Export dataset to YOLO format for detection task
+    split: str,
+    image: Image,
+    annotations: list[Annotation],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+) -> list[str]:
+    """Export an image to YOLO format for detection task
 
     Args:
         export_dir (Path): Path to export directory
-        train_ids (list): List of train ids
-        val_ids (list): List of validation ids
-        test_ids (list): List of test ids
-        unlabeled_ids (list): List of unlabeled ids
-    """
-    io.make_directory(export_dir)
-
-    for split, image_ids in zip(
-        ["train", "val", "test", "unlabeled"],
-        [train_ids, val_ids, test_ids, unlabeled_ids],
-    ):
-        if len(image_ids) == 0:
-            continue
-
-        image_dir = export_dir / split / "images"
-        label_dir = export_dir / split / "labels"
+        split (str): Split name of the image
+        image (Image): Image to export
+        annotations (list[Annotation]): Annotations of the image
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
 
-        io.make_directory(image_dir)
-        io.make_directory(label_dir)
-
-        for image in self.get_images(image_ids):
-            image_path = self.raw_image_dir / image.file_name
-            image_dst_path = image_dir / image.file_name
-            label_dst_path = (label_dir / image.file_name).with_suffix(".txt")
-            io.copy_file(image_path, image_dst_path, create_directory=True)
-
-            W = image.width
-            H = image.height
-
-            annotations = self.get_annotations(image.image_id)
-            label_txts = []
-            for annotation in annotations:
-                x1, y1, w, h = annotation.bbox
-                x1, w = x1 / W, w / W
-                y1, h = y1 / H, h / H
-                cx, cy = x1 + w / 2, y1 + h / 2
+    Returns:
+        list[str]: Exported files (relative to export directory)
+    """
+    bboxes = normalize_bboxes(
+        [annotation.bbox for annotation in annotations], image.width, image.height
+    ).tolist()
 
-                category_id = annotation.category_id - 1
+    label_txts = []
+    for annotation, (cx, cy, w, h) in zip(annotations, bboxes):
+        category_id = annotation.category_id - 1
 
-                label_txts.append(f"{category_id} {cx} {cy} {w} {h}")
+        label_txts.append(f"{category_id} {cx} {cy} {w} {h}")
 
-            io.make_directory(label_dst_path.parent)
-            with open(label_dst_path, "w") as f:
-                f.write("\n".join(label_txts))
+    return _export_yolo_image_label(self, export_dir, split, image, label_txts, link_mode)
 
 
 def _export_yolo_segmentation(
     self,
     export_dir: Path,
-    train_ids: list,
-    val_ids: list,
-    test_ids: list,
-    unlabeled_ids: list,
-):
-    io.make_directory(export_dir)
-
-    for split, image_ids in zip(
-        ["train", "val", "test", "unlabeled"],
-        [train_ids, val_ids, test_ids, unlabeled_ids],
-    ):
-        if len(image_ids) == 0:
-            continue
-
-        image_dir = export_dir / split / "images"
-        label_dir = export_dir / split / "labels"
-
-        io.make_directory(image_dir)
-        io.make_directory(label_dir)
-
-        for image in self.get_images(image_ids):
-            image_path = self.raw_image_dir / image.file_name
-            image_dst_path = image_dir / image.file_name
-            label_dst_path = (label_dir / image.file_name).with_suffix(".txt")
-            io.copy_file(image_path, image_dst_path, create_directory=True)
-
-            W = image.width
-            H = image.height
-
-            annotations = self.get_annotations(image.image_id)
-            label_txts = []
-            for annotation in annotations:
-                x1, y1, w, h = annotation.bbox
-                x1, w = x1 / W, w / W
-                y1, h = y1 / H, h / H
-
-                category_id = annotation.category_id - 1
+    split: str,
+    image: Image,
+    annotations: list[Annotation],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+) -> list[str]:
+    W = image.width
+    H = image.height
+
+    # new lists, annotations are shared with the dataset index
+    segments = normalize_polygons(
+        [merge_multi_segment(annotation.segmentation, (W, H)) for annotation in annotations], W, H
+    )
 
-                segment = merge_multi_segment(annotation.segmentation, (W, H))
-                segment[0::2] = [x / W for x in segment[0::2]]
-                segment[1::2] = [y / H for y in segment[1::2]]
-                segment = " ".join(map(str, segment))
+    label_txts = []
+    for annotation, segment in zip(annotations, segments):
+        category_id = annotation.category_id - 1
+        segment = " ".join(map(str, segment))
 
-                label_txts.append(f"{category_id} {segment}")
+        label_txts.append(f"{category_id} {segment}")
 
-            io.make_directory(label_dst_path.parent)
-            with open(label_dst_path, "w") as f:
-                f.write("\n".join(label_txts))
+    return _export_yolo_image_label(self, export_dir, split, image, label_txts, link_mode)
 
 
-def export_yolo(self, export_dir: Union[str, Path]) -> str:
+def export_yolo(
+    self,
+    export_dir: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+    manifest: ExportManifest = None,
+    workers: int = None,
+    callback: ThreadProgressCallback = None,
+) -> str:
     """Export dataset to YOLO format
 
     Args:
         export_dir (Union[str, Path]): Path to export directory
+        link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory. Defaults to LinkMode.COPY.
+        manifest (ExportManifest, optional): Manifest of the export. Unchanged images of the previous export are skipped. Defaults to None.
+        workers (int, optional): Number of worker threads exporting images. Defaults to None (auto).
+        callback (ThreadProgressCallback, optional): Progress callback (steps are images). Defaults to None.
 
     Returns:
         str: Path to export directory
     """
-    _check_valid_file_paths(self.get_images())
+    _check_valid_file_paths(self.image_dict.values())
 
     export_dir = Path(export_dir)
 
     train_ids, val_ids, test_ids, _ = self.get_split_ids()
 
     if self.task == TaskType.CLASSIFICATION:
-        _export_yolo_classification(self, export_dir, train_ids, val_ids, test_ids, [])
+        _export_image = _export_yolo_classification
     elif self.task == TaskType.OBJECT_DETECTION:
-        _export_yolo_detection(self, export_dir, train_ids, val_ids, test_ids, [])
+        _export_image = _export_yolo_detection
     elif self.task == TaskType.INSTANCE_SEGMENTATION:
-        _export_yolo_segmentation(self, export_dir, train_ids, val_ids, test_ids, [])
+        _export_image = _export_yolo_segmentation
     else:
         raise ValueError(f"Unsupported task type: {self.task}")
 
+    export_images(
+        self,
+        export_dir,
+        {"train": train_ids, "val": val_ids, "test": test_ids},
+        lambda *args: _export_image(self, *args, link_mode=link_mode),
+        manifest=manifest,
+        workers=workers,
+        callback=callback,
+    )
+
     io.save_yaml(
         {
             "path": str(export_dir.absolute()),
@@ -241,7 +231,7 @@ def _get_yolo_image_rel_paths(yolo_root_dir: Path, set_paths: list = ["train", "
     return set_image_rel_path
 
 
-def _import_yolo_classification(self, yolo_root_dir: Path, *args):
+def _import_yolo_classification(self, yolo_root_dir: Path, *args, workers: int = None):
     # get image relative paths
     set_image_rel_path = _get_yolo_image_rel_paths(yolo_root_dir, ["train", "val", "test"])
 
@@ -265,74 +255,97 @@ def _import_yolo_classification(self, yolo_root_dir: Path, *args):
     annotation_id = 1
     for set_name, image_rel_paths in set_image_rel_path.items():
         set_image_ids = []
-        for image_rel_path in image_rel_paths:
-            image_path = yolo_root_dir / image_rel_path
-            file_name = f"{image_id}{image_path.suffix}"
-
-            height, width = load_image(image_path).shape[:2]
-            self.add_images(
-                [
-                    Image.new(
-                        image_id=image_id,
-                        file_name=file_name,
-                        width=width,
-                        height=height,
-                        original_file_name=image_rel_path,
-                    )
-                ]
+        images = []
+        annotations = []
+        image_sizes = import_image_files(
+            [
+                (
+                    yolo_root_dir / image_rel_path,
+                    self.raw_image_dir / f"{i}{image_rel_path.suffix}",
+                )
+                for i, image_rel_path in enumerate(image_rel_paths, start=image_id)
+            ],
+            workers=workers,
+            desc=f"Importing {set_name} images",
+        )
+        for image_rel_path, (width, height) in zip(image_rel_paths, image_sizes):
+            file_name = f"{image_id}{image_rel_path.suffix}"
+            images.append(
+                Image.new(
+                    image_id=image_id,
+                    file_name=file_name,
+                    width=width,
+                    height=height,
+                    original_file_name=image_rel_path,
+                )
             )
             set_image_ids.append(image_id)
-            io.copy_file(image_path, self.raw_image_dir / file_name, create_directory=True)
 
             category_name = image_rel_path.parts[
                 1
             ]  # image rel path: {set_name}/{category_name}/{file_name}
-            self.add_annotations(
-                [
-                    Annotation.classification(
-                        annotation_id=annotation_id,
-                        image_id=image_id,
-                        category_id=category_name2id[category_name],
-                    )
-                ]
+            annotations.append(
+                Annotation.classification(
+                    annotation_id=annotation_id,
+                    image_id=image_id,
+                    category_id=category_name2id[category_name],
+                )
             )
 
             image_id += 1
             annotation_id += 1
 
+        self.add_images(images)
+        self.add_annotations(annotations)
         io.save_json(set_image_ids, self.set_dir / f"{set_name}.json", True)
 
     return True
 
 
-def _parse_od_label(line: str, width: int, height: int):
-    """parse label file for od"""
-    category_id, cx, cy, w, h = map(float, line.split())
-    x1 = cx - w / 2
-    y1 = cy - h / 2
-    return {
-        "category_id": int(category_id) + 1,
-        "bbox": [x1 * width, y1 * height, w * width, h * height],
-    }
-
-
-def _parse_seg_label(line: str, width: int, height: int):
+def _parse_od_labels(lines: list[str], width: int, height: int) -> list[dict]:
+    """parse label file for od (all lines at once)"""
+    lines = [line for line in lines if line.strip()]
+    if not lines:
+        return []
+    try:
+        labels = np.array([line.split() for line in lines], dtype=np.float64)
+    except ValueError as e:  # ragged lines
+        raise ValueError(
+            f"Invalid yolo label, every line should be 'class cx cy w h': {lines}"
+        ) from e
+    if labels.shape[1] != 5:
+        raise ValueError(f"Invalid yolo label, every line should be 'class cx cy w h': {lines}")
+    bboxes = denormalize_bboxes(labels[:, 1:], width, height).tolist()
+    return [
+        {"category_id": int(category_id) + 1, "bbox": bbox}
+        for category_id, bbox in zip(labels[:, 0].tolist(), bboxes)
+    ]
+
+
+def _parse_seg_labels(lines: list[str], width: int, height: int) -> list[dict]:
     """parse label file for seg"""
-    category_id, *segment = map(float, line.split())
-    segment[::2] = [int(x * width) for x in segment[::2]]
-    segment[1::2] = [y * height for y in segment[1::2]]
-    return {
-        "category_id": int(category_id) + 1,
-        "segmentation": [segment],
-    }
+    annotations = []
+    for line in lines:
+        if not line.strip():
+            continue
+        label = np.array(line.split(), dtype=np.float64)
+        annotations.append(
+            {
+                "category_id": int(label[0]) + 1,
+                "segmentation": [denormalize_polygon(label[1:], width, height).tolist()],
+            }
+        )
+    return annotations
 
 
-def _import_yolo_images_labels(self, yolo_root_dir: Path, yaml_path: str, task: TaskType):
+def _import_yolo_images_labels(
+    self, yolo_root_dir: Path, yaml_path: str, task: TaskType, workers: int = None
+):
     """import function for od, seg, keypoint"""
 
     parse_func = {
-        TaskType.OBJECT_DETECTION: _parse_od_label,
-        TaskType.INSTANCE_SEGMENTATION: _parse_seg_label,
+        TaskType.OBJECT_DETECTION: _parse_od_labels,
+        TaskType.INSTANCE_SEGMENTATION: _parse_seg_labels,
     }[task]
 
     info = io.load_yaml(yaml_path)
@@ -371,26 +384,32 @@ def _import_yolo_images_labels(self, yolo_root_dir: Path, yaml_path: str, task:
     annotation_id = 1
     for set_name, image_rel_paths in set_image_rel_path.items():
         set_image_ids = []
-        for image_rel_path in image_rel_paths:
-            image_path = (
-                yolo_root_dir / image_rel_path
-            )  # image rel path: {set_name}/images/{file_name(.EXT)}
-            file_name = f"{image_id}{image_path.suffix}"
-
-            height, width = load_image(image_path).shape[:2]
-            self.add_images(
-                [
-                    Image.new(
-                        image_id=image_id,
-                        file_name=file_name,
-                        width=width,
-                        height=height,
-                        original_file_name=image_rel_path,
-                    )
-                ]
+        images = []
+        annotations = []
+        image_sizes = import_image_files(
+            [
+                (
+                    yolo_root_dir
+                    / image_rel_path,  # image rel path: {set_name}/images/{file_name(.EXT)}
+                    self.raw_image_dir / f"{i}{image_rel_path.suffix}",
+                )
+                for i, image_rel_path in enumerate(image_rel_paths, start=image_id)
+            ],
+            workers=workers,
+            desc=f"Importing {set_name} images",
+        )
+        for image_rel_path, (width, height) in zip(image_rel_paths, image_sizes):
+            file_name = f"{image_id}{image_rel_path.suffix}"
+            images.append(
+                Image.new(
+                    image_id=image_id,
+                    file_name=file_name,
+                    width=width,
+                    height=height,
+                    original_file_name=image_rel_path,
+                )
             )
             set_image_ids.append(image_id)
-            io.copy_file(image_path, self.raw_image_dir / file_name, create_directory=True)
 
             label_path = image_rel_path.with_suffix(
                 ".txt"
@@ -401,30 +420,30 @@ def _import_yolo_images_labels(self, yolo_root_dir: Path, yaml_path: str, task:
             with label_path.open("r") as f:
                 lines = f.readlines()
 
-            for line in lines:
-                annotation = parse_func(line, width, height)
-                self.add_annotations(
-                    [
-                        Annotation.new(
-                            annotation_id=annotation_id,
-                            image_id=image_id,
-                            task=task,
-                            **annotation,
-                        )
-                    ]
+            for annotation in parse_func(lines, width, height):
+                annotations.append(
+                    Annotation.new(
+                        annotation_id=annotation_id,
+                        image_id=image_id,
+                        task=task,
+                        **annotation,
+                    )
                 )
                 annotation_id += 1
             image_id += 1
 
+        self.add_images(images)
+        self.add_annotations(annotations)
         io.save_json(set_image_ids, self.set_dir / f"{set_name}.json", True)
 
 
-def import_yolo(self, yolo_root_dir: str, yaml_path: str):
+def import_yolo(self, yolo_root_dir: str, yaml_path: str, workers: int = None):
     """
     Import YOLO dataset.
 
     Args:
         yaml_path (str): Path to the yaml file.
+        workers (int, optional): Number of workers copying images and reading their sizes. Defaults to None (auto).
     """
     if self.task == TaskType.OBJECT_DETECTION:
         _import = _import_yolo_images_labels
@@ -435,7 +454,7 @@ def import_yolo(self, yolo_root_dir: str, yaml_path: str):
     else:
         raise ValueError(f"Unsupported task: {self.task}")
 
-    _import(self, Path(yolo_root_dir), yaml_path, self.task)
+    _import(self, Path(yolo_root_dir), yaml_path, self.task, workers=workers)
 
     # TODO: add unlabeled set
     io.save_json([], self.unlabeled_set_file, create_directory=True)
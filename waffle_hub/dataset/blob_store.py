@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Union
+
+from waffle_hub.dataset.adapter.common import DEFAULT_IMPORT_WORKERS
+from waffle_hub.utils.file import clone_file
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def _hash_file(file_path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """Content-addressed store of raw images shared by the datasets of a root directory.
+
+    {root_dir}/.blobs/
+        {sha256[:2]}/{sha256}
+
+    Raw images of the datasets are hardlinks to the blobs, so an image imported to many datasets is stored once.
+    The link count of a blob is its reference count: a blob linked by no raw image (link count 1) is garbage.
+    A blob is never linked to a file outside the store and the datasets: a raw image which is also linked elsewhere
+    (e.g. hardlinked from the source images by an importer) is cloned into the store instead.
+    Like every raw image, blobs are only ever replaced, never modified in place.
+
+    Args:
+        root_dir (Union[str, Path]): dataset root directory.
+    """
+
+    BLOB_STORE_DIR = Path(".blobs")
+
+    def __init__(self, root_dir: Union[str, Path]):
+        self.root_dir = Path(root_dir)
+        self.blob_dir = self.root_dir / BlobStore.BLOB_STORE_DIR
+
+    def __repr__(self):
+        return f"BlobStore(blob_dir={self.blob_dir})"
+
+    @classmethod
+    def exists(cls, root_dir: Union[str, Path]) -> bool:
+        """Check if the blob store of a root directory is enabled."""
+        return (Path(root_dir) / BlobStore.BLOB_STORE_DIR).is_dir()
+
+    def initialize(self):
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / digest
+
+    def get_reference_count(self, digest: str) -> int:
+        """Get the number of links to a blob, except the blob itself. 0 if the blob does not exist."""
+        try:
+            return os.stat(self.get_blob_path(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def add_file(self, file_path: Union[str, Path]) -> str:
+        """Add a file to the store and replace it with a link to its blob.
+        A new content becomes a blob as is (no copy) if the file has no other link,
+        otherwise it is cloned (reflink or copy) so that the blob cannot be modified from outside.
+        A known content is deduplicated.
+
+        Args:
+            file_path (Union[str, Path]): file path (e.g. a raw image of a dataset).
+
+        Returns:
+            str: digest of the blob. None if the file cannot be linked to the store (e.g. another filesystem).
+        """
+        if os.stat(file_path).st_nlink == 1:
+            digest = _hash_file(file_path)
+            blob_path = self.get_blob_path(digest)
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(file_path, blob_path)
+                return digest
+            except FileExistsError:
+                pass
+            except OSError:
+                return None
+        else:
+            # already a link to its blob (e.g. a raw image of a cloned dataset)
+            digest = _hash_file(file_path)
+            blob_path = self.get_blob_path(digest)
+            if blob_path.exists() and os.path.samefile(file_path, blob_path):
+                return digest
+
+            # hash the clone, not the shared file, so that the blob matches its digest
+            # (kept out of the prefix directories, so that garbage collection never sees it)
+            temp_blob_path = self.blob_dir / f".{uuid.uuid4().hex}.tmp"
+            try:
+                clone_file(file_path, temp_blob_path)
+                digest = _hash_file(temp_blob_path)
+                blob_path = self.get_blob_path(digest)
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                if blob_path.exists() and os.path.samefile(file_path, blob_path):
+                    return digest
+                try:
+                    os.link(temp_blob_path, blob_path)
+                except FileExistsError:
+                    pass
+            except OSError:
+                return None
+            finally:
+                if temp_blob_path.exists():
+                    os.unlink(temp_blob_path)
+
+        if os.path.samefile(file_path, blob_path):
+            return digest
+
+        # link next to the file, then swap, so the file is never missing
+        temp_path = f"{file_path}.{uuid.uuid4().hex}.blob"
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:  # another filesystem, or the blob has just been collected
+            return None
+        os.replace(temp_path, file_path)
+        return digest
+
+    def add_files(self, file_paths: list[Union[str, Path]], workers: int = None) -> list[str]:
+        """Add files to the store in parallel. See add_file.
+
+        Args:
+            file_paths (list[Union[str, Path]]): file paths.
+            workers (int, optional): number of worker threads hashing and linking files. Defaults to None (DEFAULT_IMPORT_WORKERS).
+
+        Returns:
+            list[str]: digest (or None) of each file, in the same order as file_paths.
+        """
+        workers = DEFAULT_IMPORT_WORKERS if workers is None else workers
+        if workers <= 0 or len(file_paths) <= 1:
+            return [self.add_file(file_path) for file_path in file_paths]
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(file_paths))) as executor:
+            return list(executor.map(self.add_file, file_paths))
+
+    def release(self, digests: list[str]) -> int:
+        """Remove the blobs that are no longer referenced, among the given ones.
+        Call it after removing raw images linked to the blobs (e.g. deleting a dataset).
+
+        Args:
+            digests (list[str]): digests of the blobs.
+
+        Returns:
+            int: the number of removed blobs.
+        """
+        num_removed = 0
+        for digest in set(digests):
+            if digest and self._remove_if_unreferenced(self.get_blob_path(digest)):
+                num_removed += 1
+        return num_removed
+
+    def collect_garbage(self) -> int:
+        """Remove every blob that is no longer referenced (e.g. left by raw images removed by hand).
+
+        Returns:
+            int: the number of removed blobs.
+        """
+        num_removed = 0
+        if not self.blob_dir.exists():
+            return num_removed
+        for prefix_dir in self.blob_dir.iterdir():
+            if not prefix_dir.is_dir():
+                continue
+            for blob_path in prefix_dir.iterdir():
+                if self._remove_if_unreferenced(blob_path):
+                    num_removed += 1
+        return num_removed
+
+    @staticmethod
+    def _remove_if_unreferenced(blob_path: Path) -> bool:
+        try:
+            if os.stat(blob_path).st_nlink > 1:
+                return False
+            os.unlink(blob_path)
+        except FileNotFoundError:
+            return False
+        logger.debug(f"Removed unreferenced blob {blob_path}")
+        return True
@@ -1,15 +1,19 @@
 import copy
+import hashlib
 import logging
 import os
+import pickle
 import random
 import shutil
 import time
 import warnings
 from collections import Counter, OrderedDict, defaultdict
-from functools import cached_property
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import cached_property, partial
 from pathlib import Path
 from tempfile import mkdtemp
-from typing import Union
+from typing import Callable, Union
 
 import PIL.Image
 import tqdm
@@ -18,11 +22,19 @@ from waffle_utils.image.io import load_image, save_image
 from waffle_utils.log import datetime_now
 from waffle_utils.utils import type_validator
 
-from waffle_hub import EXPORT_MAP, DataType, SplitMethod, TaskType
+from waffle_hub import (
+    EXPORT_MAP,
+    DataType,
+    LinkMode,
+    SplitMethod,
+    StorageType,
+    TaskType,
+)
 from waffle_hub.dataset.adapter import (
     export_autocare_dlt,
     export_coco,
     export_transformers,
+    export_webdataset,
     export_yolo,
     import_autocare_dlt,
     import_coco,
@@ -31,8 +43,17 @@ from waffle_hub.dataset.adapter import (
     import_yolo,
     import_superb_ai,
 )
+from waffle_hub.dataset.adapter.common import (
+    DEFAULT_IMPORT_WORKERS,
+    ExportManifest,
+    link_image_files,
+)
+from waffle_hub.dataset.blob_store import BlobStore
+from waffle_hub.dataset.storage import BaseStorage, get_storage
 from waffle_hub.schema import Annotation, Category, DatasetInfo, Image
+from waffle_hub.utils.callback import ThreadProgressCallback
 from waffle_hub.utils.draw import draw_results
+from waffle_hub.utils.file import link_directory, link_file
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +61,8 @@ logger = logging.getLogger(__name__)
 class Dataset:
     DEFAULT_DATASET_ROOT_DIR = Path("./datasets")
     DATASET_INFO_FILE_NAME = Path("info.yaml")
+    INDEX_CACHE_FILE_NAME = Path("index.pkl")
+    BLOB_MANIFEST_FILE_NAME = Path("blobs.txt")
 
     RAW_IMAGE_DIR = Path("raw")
     IMAGE_DIR = Path("images")
@@ -49,6 +72,10 @@ class Dataset:
     EXPORT_DIR = Path("exports")
     SET_DIR = Path("sets")
     DRAW_DIR = Path("draws")
+    SNAPSHOT_DIR = Path("snapshots")
+    CACHE_DIR = Path("caches")
+
+    MERGE_IMAGE_KEYS = ["file_name", "content"]
 
     TRAIN_SET_FILE_NAME = Path("train.json")
     VAL_SET_FILE_NAME = Path("val.json")
@@ -57,6 +84,25 @@ class Dataset:
 
     MINIMUM_TRAINABLE_IMAGE_NUM_PER_CATEGORY = 3
 
+    # bump when the layout of the index or of the pickled fields changes
+    INDEX_CACHE_VERSION = 2
+    INDEX_ATTRIBUTES = [
+        "_image_dict",
+        "_unlabeled_image_dict",
+        "_annotation_dict",
+        "_prediction_dict",
+        "_category_dict",
+        "_image_to_annotations",
+        "_image_to_predictions",
+        "_annotation_to_image",
+        "_prediction_to_image",
+        "_category_to_images",
+        "_category_to_unique_images",
+        "_category_name_to_category",
+        "_category_to_annotations",
+        "_category_to_predictions",
+    ]
+
     def __init__(
         self,
         name: str,
@@ -64,13 +110,22 @@ class Dataset:
         categories: list[Union[str, int, float, dict, Category]] = None,
         created: str = None,
         root_dir: str = None,
+        storage: Union[str, StorageType] = None,
     ):
         self.name = name
         self.task = task
         self.created = created
+        self.storage = storage
 
         self.root_dir = root_dir
 
+        self._batch_depth = 0
+        self._dataset_info_outdated = False
+        self._index_cache_outdated = False
+        self._pending_index_records = defaultdict(list)
+
+        self._storage: BaseStorage = get_storage(self.storage, self.dataset_dir, self.task)
+
         if not self.initialized():
             self._initialize()
             self._set_categories(categories)
@@ -102,6 +157,19 @@ class Dataset:
             raise ValueError(f"Invalid task type: {v}" f"Available task types: {list(TaskType)}")
         self.__task = v
 
+    @property
+    def storage(self):
+        return self.__storage
+
+    @storage.setter
+    def storage(self, v):
+        v = str(v or StorageType.FILE).upper()
+        if v not in StorageType:
+            raise ValueError(
+                f"Invalid storage type: {v}" f"Available storage types: {list(StorageType)}"
+            )
+        self.__storage = v
+
     @property
     def categories(self) -> list[Category]:
         return self.get_categories()
@@ -133,11 +201,49 @@ class Dataset:
 
         self.add_categories(v)
 
+    def view(
+        self,
+        image_ids: list[int] = None,
+        category_ids: list[int] = None,
+        predicate: Callable[[Image, list[Annotation]], bool] = None,
+        name: str = None,
+    ) -> "DatasetView":
+        """
+        Get a read only, zero-copy view of the dataset filtered from the in-memory index.
+        The view can be split, exported and given to Hub.train and Hub.evaluate like a Dataset,
+        and written to disk as a new dataset with materialize().
+
+        Args:
+            image_ids (list[int], optional): image ids to keep. Defaults to None (all images).
+            category_ids (list[int], optional): category ids to keep (renumbered from 1 in the given order).
+                Images without annotations of the categories are dropped. Defaults to None (all categories).
+            predicate (Callable[[Image, list[Annotation]], bool], optional): keep images for which it returns True. Defaults to None.
+            name (str, optional): view name. Defaults to None (derived from the selection).
+
+        Examples:
+            >>> view = dataset.view(category_ids=[1, 3])
+            >>> view = dataset.view(predicate=lambda image, annotations: image.width >= 640)
+            >>> view.split(0.8)
+            >>> view.export("YOLO")
+            >>> hub.train(dataset=view, ...)
+            >>> view.materialize("my_dataset_cat_1_3")
+
+        Returns:
+            DatasetView: view of the dataset
+        """
+        from waffle_hub.dataset.view import DatasetView
+
+        return DatasetView(
+            self, image_ids=image_ids, category_ids=category_ids, predicate=predicate, name=name
+        )
+
     def extract_by_image_ids(
         self, new_name: str, image_ids: list[int], root_dir: str = None
     ) -> "Dataset":
         """
         Extract a new dataset by image ids
+        Raw images are hardlinked (copied across filesystems) to the new dataset.
+        Unlabeled images among the image ids and the predictions of the extracted images are kept.
 
         Args:
             new_name (str): Name of the new dataset
@@ -148,35 +254,14 @@ class Dataset:
             Dataset: Extracted dataset
 
         """
-        ds = Dataset.new(
-            name=new_name,
-            task=self.task,
-            root_dir=root_dir,
-        )
-
-        try:
-            ds.add_categories(self.get_categories())
-            for image in self.get_images(image_ids):
-                annotations = self.get_annotations(image.image_id)
-                io.copy_file(
-                    self.raw_image_dir / image.file_name,
-                    ds.raw_image_dir / image.file_name,
-                    create_directory=True,
-                )
-                ds.add_images([image])
-                ds.add_annotations(annotations)
-
-        except Exception as e:
-            ds.delete()
-            raise e
-
-        return ds
+        return self.view(image_ids=image_ids).materialize(new_name, root_dir)
 
     def extract_by_categories(
         self, new_name: str, category_ids: list[int], root_dir: str = None
     ) -> "Dataset":
         """
         Extract a new dataset by categories
+        Raw images are hardlinked (copied across filesystems) to the new dataset.
 
         Args:
             new_name (str): Name of the new dataset
@@ -185,44 +270,7 @@ class Dataset:
 
         Returns (Dataset): New dataset
         """
-        ds = Dataset.new(
-            name=new_name,
-            task=self.task,
-            root_dir=root_dir,
-        )
-        try:
-            category_old2new = {}
-            for new_category_id, category_id in enumerate(category_ids, start=1):
-                category_old2new[category_id] = new_category_id
-                categories = self.get_categories([category_id])
-                for category in categories:
-                    category.category_id = new_category_id
-                ds.add_categories(categories)
-
-            for image in self.get_images():
-                annotations = list(
-                    filter(
-                        lambda ann: ann.category_id in category_ids,
-                        self.get_annotations(image.image_id),
-                    )
-                )
-                for annotation in annotations:
-                    annotation.category_id = category_old2new[annotation.category_id]
-
-                if annotations:
-                    io.copy_file(
-                        self.raw_image_dir / image.file_name,
-                        ds.raw_image_dir / image.file_name,
-                        create_directory=True,
-                    )
-                    ds.add_images([image])
-                    ds.add_annotations(annotations)
-
-        except Exception as e:
-            ds.delete()
-            raise e
-
-        return ds
+        return self.view(category_ids=category_ids).materialize(new_name, root_dir)
 
     @property
     def created(self):
@@ -260,6 +308,14 @@ class Dataset:
     def dataset_info_file(self) -> Path:
         return self.dataset_dir / Dataset.DATASET_INFO_FILE_NAME
 
+    @cached_property
+    def index_cache_file(self) -> Path:
+        return self.dataset_dir / Dataset.INDEX_CACHE_FILE_NAME
+
+    @cached_property
+    def blob_manifest_file(self) -> Path:
+        return self.dataset_dir / Dataset.BLOB_MANIFEST_FILE_NAME
+
     @cached_property
     def raw_image_dir(self) -> Path:
         return self.dataset_dir / Dataset.RAW_IMAGE_DIR
@@ -292,6 +348,14 @@ class Dataset:
     def draw_dir(self) -> Path:
         return self.dataset_dir / Dataset.DRAW_DIR
 
+    @cached_property
+    def snapshot_dir(self) -> Path:
+        return self.dataset_dir / Dataset.SNAPSHOT_DIR
+
+    @cached_property
+    def cache_dir(self) -> Path:
+        return self.dataset_dir / Dataset.CACHE_DIR
+
     @cached_property
     def train_set_file(self) -> Path:
         return self.set_dir / Dataset.TRAIN_SET_FILE_NAME
@@ -394,7 +458,43 @@ class Dataset:
         return self._category_to_predictions
 
     def get_category_names(self) -> list[str]:
-        return [category.name for category in self.categories]
+        return [category.name for category in self._get_sorted_categories()]
+
+    # category registry
+    def _get_category_registry(self) -> dict[int, Category]:
+        """In-memory write-through registry of the categories (category_id: category).
+        It is read from the storage once, and updated together with the storage by add_categories,
+        so category lookups (e.g. add_* validation, save_dataset_info) never touch the storage.
+        """
+        if not hasattr(self, "_category_registry"):
+            self._set_category_registry(self._storage.get_categories())
+        return self._category_registry
+
+    def _get_category_name_registry(self) -> dict[str, Category]:
+        """Name index of the category registry (category_name: category)."""
+        self._get_category_registry()
+        return self._category_name_registry
+
+    def _set_category_registry(self, categories: list[Category]):
+        self._category_registry = {}
+        self._category_name_registry = {}  # category_name: category
+        self._register_categories(categories)
+
+    def _register_categories(self, categories: list[Category]):
+        for category in categories:
+            old_category = self._category_registry.get(category.category_id)
+            if old_category is not None:  # overwritten in the storage
+                self._category_name_registry.pop(old_category.name, None)
+            self._category_registry[category.category_id] = category
+            self._category_name_registry[category.name] = category
+
+    def _get_sorted_categories(self, category_ids: list[int] = None) -> list[Category]:
+        registry = self._get_category_registry()
+        if category_ids:
+            categories = [registry[category_id] for category_id in category_ids]
+        else:
+            categories = registry.values()
+        return sorted(categories, key=lambda x: x.category_id)
 
     # factories
     @classmethod
@@ -404,6 +504,7 @@ class Dataset:
         task: str,
         categories: list[Union[str, int, float, dict, Category]] = None,
         root_dir: str = None,
+        storage: Union[str, StorageType] = StorageType.FILE,
     ) -> "Dataset":
         """
         Create New Dataset.
@@ -415,6 +516,9 @@ class Dataset:
             task (str): Dataset task
             categories (list[Union[str, int, float, dict, Category]]): Dataset categories
             root_dir (str, optional): Dataset root directory. Defaults to None.
+            storage (Union[str, StorageType], optional):
+                Storage engine of images, annotations, predictions and categories. Defaults to StorageType.FILE.
+                FILE stores one json file per record, SQLITE stores every record in a single database file.
 
         Raises:
             FileExistsError: if dataset name already exists
@@ -425,6 +529,9 @@ class Dataset:
             'my_dataset'  # dataset name
             >>> ds.task  # dataset task
             'CLASSIFICATION'
+            >>> ds = Dataset.new("my_sqlite_dataset", "CLASSIFICATION", storage="sqlite")
+            >>> ds.storage
+            'SQLITE'
 
         Returns:
             Dataset: Dataset Class
@@ -435,7 +542,9 @@ class Dataset:
             raise FileExistsError(f"Dataset {name} already exists.")
 
         try:
-            return cls(name=name, task=task, categories=categories, root_dir=root_dir)
+            return cls(
+                name=name, task=task, categories=categories, root_dir=root_dir, storage=storage
+            )
         except Exception as e:
             if (root_dir / name).exists():
                 io.remove_directory(root_dir / name)
@@ -448,10 +557,14 @@ class Dataset:
         name: str,
         src_root_dir: str = None,
         root_dir: str = None,
+        snapshot: str = None,
     ) -> "Dataset":
         """
         Clone Existing Dataset.
-        This method clones an existing dataset.
+        This method clones an existing dataset (or one of its snapshots).
+        Raw images and records are shared with the source dataset through hardlinks and copied on write,
+        so cloning is near-instant and the clone takes disk space only for what is changed afterwards.
+        Exports and drawings are not cloned, they are created again by export() and draw_annotations().
 
         Args:
             src_name (str):
@@ -460,9 +573,10 @@ class Dataset:
             name (str): New Dataset name
             src_root_dir (str, optional): Source Dataset root directory. Defaults to None.
             root_dir (str, optional): New Dataset root directory. Defaults to None.
+            snapshot (str, optional): Snapshot name of the source dataset to clone. Defaults to None (current state).
 
         Raises:
-            FileNotFoundError: if source dataset does not exist.
+            FileNotFoundError: if source dataset (or snapshot) does not exist.
             FileExistsError: if new dataset name already exist.
 
         Examples:
@@ -471,6 +585,7 @@ class Dataset:
             'my_dataset_clone'  # cloned dataset name
             >>> ds.task
             'CLASSIFICATION'   # original dataset task
+            >>> ds = Dataset.clone("my_dataset", "my_dataset_v1", snapshot="v1")
 
         Returns:
             Dataset: Dataset Class
@@ -479,9 +594,11 @@ class Dataset:
 
         try:
             src_ds = Dataset.load(src_name, src_root_dir)
+            if snapshot is not None:
+                src_ds = src_ds.load_snapshot(snapshot)
 
-            ds = Dataset.new(name=name, task=src_ds.task, root_dir=root_dir)
-            io.copy_files_to_directory(src_ds.dataset_dir, ds.dataset_dir, create_directory=True)
+            ds = Dataset.new(name=name, task=src_ds.task, root_dir=root_dir, storage=src_ds.storage)
+            src_ds._share_files(ds)
             ds.save_dataset_info()
 
             ds.create_index()
@@ -491,6 +608,223 @@ class Dataset:
                 io.remove_directory(root_dir / name)
             raise e
 
+    def _share_files(self, ds: "Dataset"):
+        """Put the raw images, records, sets and index cache of this dataset to another dataset, replacing its own.
+        Files that are replaced but never modified in place (raw images, file storage records, index cache)
+        are hardlinked, so they are shared until either dataset writes them (copy-on-write).
+        Sets are small and written in place, so they are copied.
+
+        Args:
+            ds (Dataset): initialized dataset to put the files to.
+        """
+        released_digests = ds._get_blob_digests()
+        if ds.raw_image_dir.exists():
+            io.remove_directory(ds.raw_image_dir)
+        link_directory(self.raw_image_dir, ds.raw_image_dir, LinkMode.HARDLINK)
+        if self.blob_manifest_file.exists():  # appended in place, so copied
+            io.copy_file(self.blob_manifest_file, ds.blob_manifest_file)
+        elif ds.blob_manifest_file.exists():
+            ds.blob_manifest_file.unlink()
+        ds._release_blobs(released_digests)
+
+        ds._storage.close()
+        ds._storage = self._storage.clone(ds.dataset_dir)
+
+        if ds.set_dir.exists():
+            io.remove_directory(ds.set_dir)
+        if self.set_dir.exists():
+            io.copy_files_to_directory(self.set_dir, ds.set_dir, create_directory=True)
+
+        if self.index_cache_file.exists():  # valid as long as the shared records are unchanged
+            link_file(self.index_cache_file, ds.index_cache_file, LinkMode.HARDLINK)
+        elif ds.index_cache_file.exists():
+            ds.index_cache_file.unlink()
+
+        ds._drop_index()
+        if hasattr(ds, "_category_registry"):
+            del ds._category_registry
+
+    # snapshots
+    def get_snapshot_list(self) -> list[str]:
+        """Get snapshot name list of the dataset.
+
+        Returns:
+            list[str]: snapshot name list.
+        """
+        return sorted(Dataset.get_dataset_list(self.snapshot_dir))
+
+    def snapshot(self, snapshot_name: str) -> "Dataset":
+        """Take a named snapshot of the current state (raw images, records and sets) of the dataset.
+        Like clone, the snapshot shares unchanged files with the dataset, so it is near-instant and cheap.
+
+        Args:
+            snapshot_name (str): snapshot name.
+
+        Raises:
+            FileExistsError: if the snapshot already exists.
+
+        Examples:
+            >>> ds = Dataset.load("my_dataset")
+            >>> ds.snapshot("v1")
+            >>> ds.add_annotations(...)  # relabel
+            >>> ds.restore_snapshot("v1")  # back to v1
+
+        Returns:
+            Dataset: snapshot dataset (read only by convention)
+        """
+        if (self.snapshot_dir / snapshot_name).exists():
+            raise FileExistsError(f"Snapshot {snapshot_name} of {self.name} already exists.")
+
+        try:
+            snapshot = Dataset.new(
+                name=snapshot_name, task=self.task, root_dir=self.snapshot_dir, storage=self.storage
+            )
+            self._share_files(snapshot)
+            snapshot.save_dataset_info()
+            return snapshot
+        except Exception as e:
+            if (self.snapshot_dir / snapshot_name).exists():
+                io.remove_directory(self.snapshot_dir / snapshot_name)
+            raise e
+
+    def load_snapshot(self, snapshot_name: str) -> "Dataset":
+        """Load a snapshot of the dataset.
+
+        Args:
+            snapshot_name (str): snapshot name.
+
+        Raises:
+            FileNotFoundError: if the snapshot does not exist.
+
+        Returns:
+            Dataset: snapshot dataset (read only by convention)
+        """
+        return Dataset.load(snapshot_name, self.snapshot_dir)
+
+    def restore_snapshot(self, snapshot_name: str):
+        """Restore raw images, records and sets of the dataset to a snapshot.
+        The snapshot is kept, and exports are re-created by export() as they are outdated.
+
+        Args:
+            snapshot_name (str): snapshot name.
+
+        Raises:
+            FileNotFoundError: if the snapshot does not exist.
+        """
+        snapshot = self.load_snapshot(snapshot_name)
+        if snapshot.task != self.task:
+            raise ValueError(
+                f"Task of snapshot {snapshot_name} is {snapshot.task}. It should be {self.task}."
+            )
+        if snapshot.storage != self.storage:
+            self._storage.delete()
+            self.storage = snapshot.storage
+        snapshot._share_files(self)
+        self.save_dataset_info()
+        self.create_index()
+
+    def delete_snapshot(self, snapshot_name: str):
+        """Delete a snapshot of the dataset. Files shared with the dataset are kept.
+
+        Args:
+            snapshot_name (str): snapshot name.
+
+        Raises:
+            FileNotFoundError: if the snapshot does not exist.
+        """
+        snapshot = self.load_snapshot(snapshot_name)
+        digests = snapshot._get_blob_digests()
+        snapshot.delete()
+        self._release_blobs(digests)
+
+    # blob store
+    @classmethod
+    def enable_blob_store(cls, root_dir: str = None) -> BlobStore:
+        """
+        Enable the content-addressed blob store of a dataset root directory ({root_dir}/.blobs).
+        Once enabled, raw images added to the datasets of the root directory are moved to the store and
+        replaced by hardlinks, so the same image is stored once however many datasets (or clones, merges,
+        extracts) use it. Deleting a dataset removes the blobs no other dataset links to.
+        Raw images of existing datasets are moved with dedup_raw_images().
+
+        Args:
+            root_dir (str, optional): Dataset root directory. Defaults to None.
+
+        Examples:
+            >>> Dataset.enable_blob_store()
+            >>> ds = Dataset.from_coco(...)  # raw images are deduplicated on import
+            >>> for name in Dataset.get_dataset_list():
+            >>>     Dataset.load(name).dedup_raw_images()
+
+        Returns:
+            BlobStore: blob store of the root directory
+        """
+        blob_store = BlobStore(Dataset.parse_root_dir(root_dir))
+        blob_store.initialize()
+        return blob_store
+
+    @property
+    def blob_store(self) -> BlobStore:
+        """Blob store of the dataset root directory. None if it is not enabled."""
+        if BlobStore.exists(self.root_dir):
+            return BlobStore(self.root_dir)
+        return None
+
+    def dedup_raw_images(self, workers: int = None) -> int:
+        """Move every raw image of the dataset to the blob store of the root directory.
+
+        Args:
+            workers (int, optional): Number of worker threads hashing raw images. Defaults to None (auto).
+
+        Raises:
+            ValueError: if the blob store is not enabled.
+
+        Returns:
+            int: the number of raw images linked to the blob store.
+        """
+        if self.blob_store is None:
+            raise ValueError(
+                f"Blob store of {self.root_dir} is not enabled. Call Dataset.enable_blob_store first."
+            )
+
+        released_digests = self._get_blob_digests()
+        if self.blob_manifest_file.exists():
+            self.blob_manifest_file.unlink()
+        file_paths = [path for path in self.raw_image_dir.rglob("*") if path.is_file()]
+        num_files = self._add_raw_images_to_blob_store(file_paths, workers=workers)
+        self._release_blobs(released_digests)
+        return num_files
+
+    def _add_raw_images_to_blob_store(self, file_paths: list[Path], workers: int = None) -> int:
+        """Link raw images to the blob store (if enabled) and record their digests in the blob manifest."""
+        blob_store = self.blob_store
+        if blob_store is None:
+            return 0
+
+        file_paths = [file_path for file_path in file_paths if file_path.is_file()]
+        digests = [digest for digest in blob_store.add_files(file_paths, workers) if digest]
+        if digests:
+            with open(self.blob_manifest_file, "a") as f:
+                f.writelines(f"{digest}\n" for digest in digests)
+        return len(digests)
+
+    def _get_blob_digests(self) -> set[str]:
+        """Digests of the blobs referenced by the raw images of the dataset and of its snapshots."""
+        digests = set()
+        manifest_files = [self.blob_manifest_file]
+        if self.snapshot_dir.exists():
+            manifest_files.extend(self.snapshot_dir.glob(f"*/{Dataset.BLOB_MANIFEST_FILE_NAME}"))
+        for manifest_file in manifest_files:
+            if manifest_file.exists():
+                digests.update(manifest_file.read_text().split())
+        return digests
+
+    def _release_blobs(self, digests: set[str]):
+        """Remove the blobs no longer referenced after raw images have been removed."""
+        blob_store = self.blob_store
+        if blob_store is not None and digests:
+            blob_store.release(digests)
+
     @classmethod
     def dummy(
         cls,
@@ -500,6 +834,7 @@ class Dataset:
         category_num: int = 10,
         unlabeled_image_num: int = 0,
         root_dir: str = None,
+        storage: Union[str, StorageType] = StorageType.FILE,
     ) -> "Dataset":
         """
         Create Dummy Dataset (for debugging).
@@ -511,6 +846,7 @@ class Dataset:
             category_num (int, optional): Number of categories. Defaults to 10.
             unlabeld_image_num (int, optional): Number of unlabeled images. Defaults to 0.
             root_dir (str, optional): Dataset root directory. Defaults to None.
+            storage (Union[str, StorageType], optional): Storage engine. Defaults to StorageType.FILE.
 
         Raises:
             FileExistsError: if dataset name already exists
@@ -522,101 +858,104 @@ class Dataset:
             >>> len(ds.get_categories())
             10
         """
-        ds = Dataset.new(name=name, task=task, root_dir=root_dir)
+        ds = Dataset.new(name=name, task=task, root_dir=root_dir, storage=storage)
 
         try:
-            for category_id in range(1, category_num + 1):
-
-                if task == TaskType.CLASSIFICATION:
-                    category = Category.classification(
-                        category_id=category_id,
-                        name=f"category_{category_id}",
-                        supercategory="object",
-                    )
-                elif task == TaskType.OBJECT_DETECTION:
-                    category = Category.object_detection(
-                        category_id=category_id,
-                        name=f"category_{category_id}",
-                        supercategory="object",
-                    )
-                elif task == TaskType.INSTANCE_SEGMENTATION:
-                    category = Category.instance_segmentation(
-                        category_id=category_id,
-                        name=f"category_{category_id}",
-                        supercategory="object",
-                    )
-                elif task == TaskType.TEXT_RECOGNITION:
-                    category = Category.text_recognition(
-                        category_id=category_id,
-                        name=chr(64 + category_id),
-                        supercategory="object",
-                    )
-
-                ds.add_categories([category])
-
-            annotation_id = 1
-            for image_id in range(1, image_num + 1):
-                file_name = f"image_{image_id}.jpg"
-                ds.add_images([Image(image_id=image_id, file_name=file_name, width=100, height=100)])
-                PIL.Image.new("RGB", (100, 100)).save(ds.raw_image_dir / file_name)
-
-                if task == TaskType.CLASSIFICATION:
-                    annotations = [
-                        Annotation.classification(
-                            annotation_id=annotation_id,
-                            image_id=image_id,
-                            category_id=random.randint(1, category_num),
+            with ds.batch():
+                for category_id in range(1, category_num + 1):
+
+                    if task == TaskType.CLASSIFICATION:
+                        category = Category.classification(
+                            category_id=category_id,
+                            name=f"category_{category_id}",
+                            supercategory="object",
                         )
-                    ]
-                elif task == TaskType.OBJECT_DETECTION:
-                    annotations = [
-                        Annotation.object_detection(
-                            annotation_id=annotation_id + i,
-                            image_id=image_id,
-                            category_id=random.randint(1, category_num),
-                            bbox=[
-                                random.randint(0, 100),
-                                random.randint(0, 100),
-                                random.randint(0, 100),
-                                random.randint(0, 100),
-                            ],
+                    elif task == TaskType.OBJECT_DETECTION:
+                        category = Category.object_detection(
+                            category_id=category_id,
+                            name=f"category_{category_id}",
+                            supercategory="object",
                         )
-                        for i in range(random.randint(1, 5))
-                    ]
-                elif task == TaskType.INSTANCE_SEGMENTATION:
-                    annotations = [
-                        Annotation.instance_segmentation(
-                            annotation_id=annotation_id + i,
-                            image_id=image_id,
-                            category_id=random.randint(1, category_num),
-                            bbox=[
-                                random.randint(0, 100),
-                                random.randint(0, 100),
-                                random.randint(0, 100),
-                                random.randint(0, 100),
-                            ],
-                            segmentation=[[random.randint(0, 100) for _ in range(10)]],
+                    elif task == TaskType.INSTANCE_SEGMENTATION:
+                        category = Category.instance_segmentation(
+                            category_id=category_id,
+                            name=f"category_{category_id}",
+                            supercategory="object",
                         )
-                        for i in range(random.randint(1, 5))
-                    ]
-                elif task == TaskType.TEXT_RECOGNITION:
-                    annotations = [
-                        Annotation.text_recognition(
-                            annotation_id=annotation_id,
-                            image_id=image_id,
-                            caption=chr(64 + random.randint(1, category_num)),
+                    elif task == TaskType.TEXT_RECOGNITION:
+                        category = Category.text_recognition(
+                            category_id=category_id,
+                            name=chr(64 + category_id),
+                            supercategory="object",
                         )
-                    ]
-                ds.add_annotations(annotations)
-                annotation_id += len(annotations)
 
-            if unlabeled_image_num > 0:
-                for image_id in range(image_num + 1, image_num + unlabeled_image_num + 1):
+                    ds.add_categories([category])
+
+                annotation_id = 1
+                for image_id in range(1, image_num + 1):
                     file_name = f"image_{image_id}.jpg"
+                    PIL.Image.new("RGB", (100, 100)).save(ds.raw_image_dir / file_name)
                     ds.add_images(
                         [Image(image_id=image_id, file_name=file_name, width=100, height=100)]
                     )
-                    PIL.Image.new("RGB", (100, 100)).save(ds.raw_image_dir / file_name)
+
+                    if task == TaskType.CLASSIFICATION:
+                        annotations = [
+                            Annotation.classification(
+                                annotation_id=annotation_id,
+                                image_id=image_id,
+                                category_id=random.randint(1, category_num),
+                            )
+                        ]
+                    elif task == TaskType.OBJECT_DETECTION:
+                        annotations = [
+                            Annotation.object_detection(
+                                annotation_id=annotation_id + i,
+                                image_id=image_id,
+                                category_id=random.randint(1, category_num),
+                                bbox=[
+                                    random.randint(0, 100),
+                                    random.randint(0, 100),
+                                    random.randint(0, 100),
+                                    random.randint(0, 100),
+                                ],
+                            )
+                            for i in range(random.randint(1, 5))
+                        ]
+                    elif task == TaskType.INSTANCE_SEGMENTATION:
+                        annotations = [
+                            Annotation.instance_segmentation(
+                                annotation_id=annotation_id + i,
+                                image_id=image_id,
+                                category_id=random.randint(1, category_num),
+                                bbox=[
+                                    random.randint(0, 100),
+                                    random.randint(0, 100),
+                                    random.randint(0, 100),
+                                    random.randint(0, 100),
+                                ],
+                                segmentation=[[random.randint(0, 100) for _ in range(10)]],
+                            )
+                            for i in range(random.randint(1, 5))
+                        ]
+                    elif task == TaskType.TEXT_RECOGNITION:
+                        annotations = [
+                            Annotation.text_recognition(
+                                annotation_id=annotation_id,
+                                image_id=image_id,
+                                caption=chr(64 + random.randint(1, category_num)),
+                            )
+                        ]
+                    ds.add_annotations(annotations)
+                    annotation_id += len(annotations)
+
+                if unlabeled_image_num > 0:
+                    for image_id in range(image_num + 1, image_num + unlabeled_image_num + 1):
+                        file_name = f"image_{image_id}.jpg"
+                        PIL.Image.new("RGB", (100, 100)).save(ds.raw_image_dir / file_name)
+                        ds.add_images(
+                            [Image(image_id=image_id, file_name=file_name, width=100, height=100)]
+                        )
 
         except Exception as e:
             ds.delete()
@@ -664,10 +1003,17 @@ class Dataset:
         src_names: list[str],
         src_root_dirs: Union[str, list[str]],
         task: str,
+        image_key: str = "file_name",
+        workers: int = None,
     ) -> "Dataset":
         """
         Merge Datasets.
         This method merges multiple datasets into one dataset.
+        Source datasets are loaded (and hashed) in parallel, then merged in the given order with hash keys.
+        Images with the same key are merged into one image, and categories are merged by name.
+        An annotation is dropped if an annotation with the same category, geometry and iscrowd has already been
+        merged to the image from another source image.
+        Records are written in bulk, and raw images are linked (reflink or hardlink, copy across filesystems).
 
         Args:
             name (str): New Dataset name
@@ -675,6 +1021,11 @@ class Dataset:
             src_names (list[str]): Source Dataset names
             src_root_dirs (Union[str, list[str]]): Source Dataset root directories
             task (str): Dataset task
+            image_key (str, optional): How to find the same images. "file_name" or "content" (hash of the raw image file). Defaults to "file_name".
+            workers (int, optional): Number of worker threads loading datasets and linking raw images. Defaults to None (auto).
+
+        Raises:
+            ValueError: if the task of a source dataset is different, or image_key is invalid.
 
         Returns:
             Dataset: Dataset Class
@@ -688,6 +1039,23 @@ class Dataset:
             task = task.upper()
         if task not in [k for k in TaskType]:
             raise ValueError(f"task should be one of {[k for k in TaskType]}")
+        if image_key not in Dataset.MERGE_IMAGE_KEYS:
+            raise ValueError(f"image_key should be one of {Dataset.MERGE_IMAGE_KEYS}")
+
+        workers = DEFAULT_IMPORT_WORKERS if workers is None else workers
+        if workers <= 0 or len(src_names) <= 1:
+            sources = [
+                Dataset._load_merge_source(src_name, src_root_dir, task, image_key)
+                for src_name, src_root_dir in zip(src_names, src_root_dirs)
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers, len(src_names))) as executor:
+                sources = list(
+                    executor.map(
+                        lambda args: Dataset._load_merge_source(*args, task, image_key),
+                        zip(src_names, src_root_dirs),
+                    )
+                )
 
         merged_ds = Dataset.new(
             name=name,
@@ -696,70 +1064,72 @@ class Dataset:
         )
 
         categoryname2id = {}
-        filename2id = {}
-        new_annotation_id = 1
+        key2image_id = {}
+        image_to_annotation_keys = {}  # merged image_id: keys of merged annotations
+        file_names = set()
+        categories, images, annotations, image_files = [], [], [], []
 
         try:
-            for src_name, src_root_dir in zip(src_names, src_root_dirs):
-                src_ds = Dataset.load(src_name, src_root_dir)
-                src_categories = src_ds.get_categories()
-
-                if src_ds.task != task:
-                    raise ValueError(f"Task of {src_ds.name} is {src_ds.task}. It should be {task}.")
-
-                # merge - raw images
-                io.copy_files_to_directory(
-                    src_ds.raw_image_dir, merged_ds.raw_image_dir, create_directory=True
-                )
-
+            for src_ds, image_keys in sources:
                 # merge - categories
+                category_old2new = {}
                 for category in src_ds.get_categories():
                     if category.name not in categoryname2id:
-                        new_category_id = len(categoryname2id) + 1
-                        categoryname2id[category.name] = new_category_id
-
-                        new_category = copy.deepcopy(category)
-                        new_category.category_id = new_category_id
-                        merged_ds.add_categories([new_category])
-
-                for image_id, annotations in src_ds.image_to_annotations.items():
-                    image = src_ds.get_images([image_id])[0]
+                        categoryname2id[category.name] = len(categoryname2id) + 1
+                        new_category = copy.copy(category)
+                        new_category.category_id = categoryname2id[category.name]
+                        categories.append(new_category)
+                    category_old2new[category.category_id] = categoryname2id[category.name]
 
+                for image_id, src_annotations in src_ds.image_to_annotations.items():
                     # merge - images
-                    is_new_image = False
-                    if image.file_name not in filename2id:
-                        is_new_image = True
-
-                        new_image_id = len(filename2id) + 1
-                        filename2id[image.file_name] = new_image_id
-
-                        new_image = copy.deepcopy(image)
+                    key = image_keys[image_id]
+                    if key not in key2image_id:
+                        new_image_id = len(key2image_id) + 1
+                        key2image_id[key] = new_image_id
+                        image_to_annotation_keys[new_image_id] = set()
+
+                        image = src_ds.image_dict[image_id]
+                        new_image = copy.copy(image)
                         new_image.image_id = new_image_id
-                        merged_ds.add_images([new_image])
-
-                    new_image_id = filename2id[image.file_name]
+                        if new_image.file_name in file_names:  # same name, different content
+                            file_name = Path(new_image.file_name)
+                            new_image.file_name = str(
+                                file_name.with_stem(f"{file_name.stem}_{new_image_id}")
+                            )
+                        file_names.add(new_image.file_name)
+                        images.append(new_image)
+                        image_files.append(
+                            (
+                                src_ds.raw_image_dir / image.file_name,
+                                merged_ds.raw_image_dir / new_image.file_name,
+                            )
+                        )
+                    new_image_id = key2image_id[key]
 
                     # merge - annotations
-                    for annotation in annotations:
-                        new_annotation = copy.deepcopy(annotation)
-                        new_annotation.category_id = categoryname2id[
-                            src_categories[annotation.category_id - 1].name
-                        ]
-
-                        # check if new annotation
-                        is_new_annotation = True
-                        if not is_new_image:
-                            for merged_ann in merged_ds.get_annotations(new_image_id):
-                                if new_annotation == merged_ann:
-                                    is_new_annotation = False
-                                    break
-
-                        # merge
-                        if is_new_annotation:
-                            new_annotation.image_id = filename2id[image.file_name]
-                            new_annotation.annotation_id = new_annotation_id
-                            new_annotation_id += 1
-                            merged_ds.add_annotations([new_annotation])
+                    merged_annotation_keys = image_to_annotation_keys[new_image_id]
+                    new_annotation_keys = set()
+                    for annotation in src_annotations:
+                        new_annotation = copy.copy(annotation)
+                        if annotation.category_id is not None:
+                            new_annotation.category_id = category_old2new[annotation.category_id]
+
+                        annotation_key = Dataset._get_annotation_merge_key(new_annotation)
+                        if annotation_key in merged_annotation_keys:
+                            continue
+                        new_annotation_keys.add(annotation_key)
+
+                        new_annotation.image_id = new_image_id
+                        new_annotation.annotation_id = len(annotations) + 1
+                        annotations.append(new_annotation)
+                    merged_annotation_keys.update(new_annotation_keys)
+
+            link_image_files(image_files, workers=workers, desc="Merging images")
+            with merged_ds.batch():
+                merged_ds.add_categories(categories)
+                merged_ds.add_images(images)
+                merged_ds.add_annotations(annotations)
 
         except Exception as e:
             if merged_ds.dataset_dir.exists():
@@ -770,6 +1140,49 @@ class Dataset:
         ds.create_index()
         return ds
 
+    @staticmethod
+    def _load_merge_source(
+        name: str, root_dir: str, task: str, image_key: str
+    ) -> tuple["Dataset", dict[int, str]]:
+        """Load a source dataset of merge and get the merge key of its labeled images.
+
+        Returns:
+            tuple[Dataset, dict[int, str]]: source dataset, image_id: image key
+        """
+        src_ds = Dataset.load(name, root_dir)
+        if src_ds.task != task:
+            raise ValueError(f"Task of {src_ds.name} is {src_ds.task}. It should be {task}.")
+
+        image_keys = {}
+        for image_id, image in src_ds.image_dict.items():
+            if image_key == "content":
+                with open(src_ds.raw_image_dir / image.file_name, "rb") as f:
+                    image_keys[image_id] = hashlib.sha1(f.read()).hexdigest()
+            else:
+                image_keys[image_id] = image.file_name
+        return src_ds, image_keys
+
+    @staticmethod
+    def _get_annotation_merge_key(annotation: Annotation) -> tuple:
+        """Get a hashable key of an annotation. Annotations of an image with the same key are duplicates."""
+
+        def _freeze(v):
+            if isinstance(v, (list, tuple)):
+                return tuple(map(_freeze, v))
+            if isinstance(v, dict):
+                return tuple(sorted((k, _freeze(x)) for k, x in v.items()))
+            return v
+
+        return (
+            annotation.category_id,
+            _freeze(annotation.bbox),
+            _freeze(annotation.segmentation),
+            _freeze(annotation.keypoints),
+            annotation.caption,
+            annotation.value,
+            annotation.iscrowd,
+        )
+
     @classmethod
     def from_coco(
         cls,
@@ -778,6 +1191,8 @@ class Dataset:
         coco_file: Union[str, list[str]],
         coco_root_dir: Union[str, list[str]],
         root_dir: str = None,
+        streaming: bool = False,
+        workers: int = None,
     ) -> "Dataset":
         """
         Import Dataset from coco format.
@@ -789,6 +1204,9 @@ class Dataset:
             coco_file (Union[str, list[str]]): Coco json file path. If given list, it will be regarded as [train, val, test] json file.
             coco_root_dir (Union[str, list[str]]): Coco image root directory. If given list, it will be regarded as [train, val, test] coco root file.
             root_dir (str, optional): Dataset root directory. Defaults to None.
+            streaming (bool, optional): Parse coco json files incrementally so that memory stays bounded regardless of the file size.
+                Annotations are grouped by image in a temporary spill file. The resulting dataset is the same. Defaults to False.
+            workers (int, optional): Number of workers importing images. Images are hardlinked (or reflinked) instead of copied on the same filesystem. Defaults to None (auto).
 
         Raises:
             FileExistsError: if new dataset name already exist.
@@ -810,6 +1228,9 @@ class Dataset:
             # Given coco files are regarded as [train, [val, [test]]] json files.
             >>> ds = Dataset.from_coco("my_dataset", "object_detection", ["coco_train.json", "coco_val.json"], ["coco_train_root", "coco_val_root"])
 
+            # Import a huge coco json file with bounded memory.
+            >>> ds = Dataset.from_coco("my_dataset", "object_detection", "path/to/coco.json", "path/to/coco_root", streaming=True)
+
         Returns:
             Dataset: Dataset Class
         """
@@ -831,7 +1252,8 @@ class Dataset:
             coco_files = coco_file
             coco_root_dirs = coco_root_dir
 
-            import_coco(ds, coco_files, coco_root_dirs)
+            with ds.batch():
+                import_coco(ds, coco_files, coco_root_dirs, streaming=streaming, workers=workers)
 
             if len(coco_files) == 2:
                 logger.info("copying val set to test set")
@@ -855,7 +1277,8 @@ class Dataset:
         superb_root_dir: str,
         superb_file_dir: str,
         root_dir: str = None,
-        option = 'default'
+        option = 'default',
+        workers: int = None,
     ) -> "Dataset":
         """
         Import dataset from Superb AI format.
@@ -868,6 +1291,7 @@ class Dataset:
             superb_file_dir (Union[str, list[str]]): Superb AI Image File Directory 
             root_dir (str, optional): root directory of dataset. Defaults to None.
             option (str, optional): choice class type (e.g. default: object class, sub: options name)
+            workers (int, optional): Number of workers importing images. Images are hardlinked (or reflinked) instead of copied on the same filesystem. Defaults to None (auto).
 
         Raises:
             FileExistsError: if new dataset name already exist.
@@ -905,7 +1329,8 @@ class Dataset:
                 pass
 
 
-            import_superb_ai(ds, superb_project_json=project_json, superb_meta=meta_path, superb_root_dir=superb_file_dir, cls_type=option)
+            with ds.batch():
+                import_superb_ai(ds, superb_project_json=project_json, superb_meta=meta_path, superb_root_dir=superb_file_dir, cls_type=option, workers=workers)
 
             # # TODO: add unlabeled set
             io.save_json([], ds.unlabeled_set_file, create_directory=True)
@@ -925,6 +1350,7 @@ class Dataset:
         coco_file: Union[str, list[str]],
         coco_root_dir: Union[str, list[str]],
         root_dir: str = None,
+        workers: int = None,
     ) -> "Dataset":
         """
         Import dataset from autocare dlt format.
@@ -936,6 +1362,7 @@ class Dataset:
             coco_file (Union[str, list[str]]): coco annotation file path.
             coco_root_dir (Union[str, list[str]]): root directory of coco dataset.
             root_dir (str, optional): root directory of dataset. Defaults to None.
+            workers (int, optional): Number of workers importing images. Images are hardlinked (or reflinked) instead of copied on the same filesystem. Defaults to None (auto).
 
         Raises:
             FileExistsError: if new dataset name already exist.
@@ -973,7 +1400,8 @@ class Dataset:
             coco_files = coco_file
             coco_root_dirs = coco_root_dir
 
-            import_autocare_dlt(ds, coco_files, coco_root_dirs)
+            with ds.batch():
+                import_autocare_dlt(ds, coco_files, coco_root_dirs, workers=workers)
 
             if len(coco_files) == 2:
                 logging.info("copying val set to test set")
@@ -997,6 +1425,7 @@ class Dataset:
         yolo_root_dir: str,
         yaml_path: str = None,
         root_dir: str = None,
+        workers: int = None,
     ) -> "Dataset":
         """
         Import Dataset from yolo format.
@@ -1008,6 +1437,7 @@ class Dataset:
             yolo_root_dir (str): Yolo dataset root directory.
             yaml_path (str): Yolo yaml file path. when task is classification, yaml_path is not required.
             root_dir (str, optional): Dataset root directory. Defaults to None.
+            workers (int, optional): Number of workers importing images. Images are hardlinked (or reflinked) instead of copied on the same filesystem. Defaults to None (auto).
 
         Example:
             >>> ds = Dataset.from_yolo("yolo", "classification", "path/to/yolo_root_dir")
@@ -1020,7 +1450,8 @@ class Dataset:
         ds = Dataset.new(name=name, task=task, root_dir=root_dir)
 
         try:
-            import_yolo(ds, yolo_root_dir, yaml_path)
+            with ds.batch():
+                import_yolo(ds, yolo_root_dir, yaml_path, workers=workers)
 
         except Exception as e:
             ds.delete()
@@ -1060,7 +1491,8 @@ class Dataset:
         ds = Dataset.new(name=name, task=task, root_dir=root_dir)
 
         try:
-            import_transformers(ds, dataset_dir)
+            with ds.batch():
+                import_transformers(ds, dataset_dir)
 
             # TODO: add unlabeled set
             io.save_json([], ds.unlabeled_set_file, create_directory=True)
@@ -1080,6 +1512,7 @@ class Dataset:
         json_file: str,
         image_dir: str = None,
         root_dir: str = None,
+        workers: int = None,
     ) -> "Dataset":
         """
         Import Dataset from label_studio format.
@@ -1091,6 +1524,7 @@ class Dataset:
             json_file (str): Label studio json file path.
             image_dir (str): Label studio image directory.
             root_dir (str, optional): Dataset root directory. Defaults to None.
+            workers (int, optional): Number of workers importing images. Images are hardlinked (or reflinked) instead of copied on the same filesystem. Defaults to None (auto).
 
         Example:
             >>> ds = Dataset.from_label_studio(
@@ -1107,12 +1541,14 @@ class Dataset:
         ds = Dataset.new(name=name, task=task, root_dir=root_dir)
 
         try:
-            import_label_studio(
-                self=ds,
-                json_file=json_file,
-                task=task,
-                image_dir=image_dir,
-            )
+            with ds.batch():
+                import_label_studio(
+                    self=ds,
+                    json_file=json_file,
+                    task=task,
+                    image_dir=image_dir,
+                    workers=workers,
+                )
 
         except Exception as e:
             ds.delete()
@@ -1199,9 +1635,7 @@ class Dataset:
             raise FileExistsError(f"{self.name} is already initialized.")
 
         io.make_directory(self.raw_image_dir)
-        io.make_directory(self.image_dir)
-        io.make_directory(self.annotation_dir)
-        io.make_directory(self.category_dir)
+        self._storage.initialize()
 
     def initialized(self) -> bool:
         """Check if Dataset has been initialized or not.
@@ -1220,6 +1654,7 @@ class Dataset:
             task=self.task,
             categories=list(map(lambda x: x.to_dict(), self.categories)),
             created=self.created,
+            storage=self.storage,
         ).save_yaml(self.dataset_info_file)
 
     def trainable(self) -> bool:
@@ -1268,6 +1703,57 @@ class Dataset:
             self.save_dataset_info()
         return dataset_info
 
+    def migrate_storage(self, storage: Union[str, StorageType]):
+        """Migrate Dataset records to another storage engine in place.
+        Every image, annotation, prediction and category is read in bulk from the current storage
+        and written in bulk to the new one. The old storage is removed only after the copy succeeded.
+
+        Args:
+            storage (Union[str, StorageType]): storage engine to migrate to.
+
+        Raises:
+            ValueError: if storage is not one of StorageType.
+
+        Examples:
+            >>> ds = Dataset.load("my_dataset")
+            >>> ds.storage
+            'FILE'
+            >>> ds.migrate_storage("sqlite")
+            >>> ds.storage
+            'SQLITE'
+        """
+        if storage not in StorageType:
+            raise ValueError(
+                f"Invalid storage type: {storage}" f"Available storage types: {list(StorageType)}"
+            )
+        storage = str(storage).upper()
+        if storage == self.storage:
+            logger.info(f"Dataset {self.name} already uses {storage} storage")
+            return
+
+        src_storage = self._storage
+        dst_storage = get_storage(storage, self.dataset_dir, self.task)
+
+        start = time.time()
+        logger.info(f"Migrating dataset {self.name} storage from {self.storage} to {storage}")
+        try:
+            dst_storage.initialize()
+            dst_storage.add_categories(src_storage.get_categories())
+            dst_storage.add_images(src_storage.get_images())
+            dst_storage.add_annotations(src_storage.get_annotations())
+            dst_storage.add_predictions(src_storage.get_predictions())
+        except Exception as e:
+            dst_storage.delete()
+            raise e
+
+        self.storage = storage
+        self._storage = dst_storage
+        self.save_dataset_info()
+        src_storage.delete()
+
+        self.create_index()
+        logger.info(f"Migrating storage done {time.time() - start:.2f} seconds")
+
     # get
     def get_images(self, image_ids: list[int] = None, labeled: bool = True) -> list[Image]:
         """Get "Image"s.
@@ -1279,18 +1765,15 @@ class Dataset:
         Returns:
             list[Image]: "Image" list
         """
-        image_files = (
-            list(map(lambda x: self.image_dir / (str(x) + ".json"), image_ids))
-            if image_ids
-            else list(self.image_dir.glob("*.json"))
-        )
+        annotated_image_ids = self._storage.get_annotated_image_ids()
+
         labeled_images = []
         unlabeled_images = []
-        for image_file in image_files:
-            if self.get_annotations(image_file.stem):
-                labeled_images.append(Image.from_json(image_file))
+        for image in self._storage.get_images(image_ids):
+            if image.image_id in annotated_image_ids:
+                labeled_images.append(image)
             else:
-                unlabeled_images.append(Image.from_json(image_file))
+                unlabeled_images.append(image)
 
         if labeled:
             logger.info(f"Found {len(labeled_images)} labeled images")
@@ -1308,17 +1791,10 @@ class Dataset:
         Returns:
             list[Category]: "Category" list
         """
-        return sorted(
-            [
-                Category.from_json(f, self.task)
-                for f in (
-                    [self.category_dir / f"{category_id}.json" for category_id in category_ids]
-                    if category_ids
-                    else self.category_dir.glob("*.json")
-                )
-            ],
-            key=lambda x: x.category_id,
-        )
+        if category_ids and not set(category_ids) <= self._get_category_registry().keys():
+            return self._storage.get_categories(category_ids)  # raises like the storage
+        # copies, so that callers can modify them without touching the registry
+        return [copy.copy(category) for category in self._get_sorted_categories(category_ids)]
 
     def get_annotations(self, image_id: int = None) -> list[Annotation]:
         """Get "Annotation"s.
@@ -1329,13 +1805,7 @@ class Dataset:
         Returns:
             list[Annotation]: "Annotation" list
         """
-        if image_id:
-            return [
-                Annotation.from_json(f, self.task)
-                for f in self.annotation_dir.glob(f"{image_id}/*.json")
-            ]
-        else:
-            return [Annotation.from_json(f, self.task) for f in self.annotation_dir.glob("*/*.json")]
+        return self._storage.get_annotations(image_id)
 
     def get_predictions(self, image_id: int = None) -> list[Annotation]:
         """Get "Prediction"s.
@@ -1346,13 +1816,7 @@ class Dataset:
         Returns:
             list[Annotation]: "Prediction" list
         """
-        if image_id:
-            return [
-                Annotation.from_json(f, self.task)
-                for f in self.prediction_dir.glob(f"{image_id}/*.json")
-            ]
-        else:
-            return [Annotation.from_json(f, self.task) for f in self.prediction_dir.glob("*/*.json")]
+        return self._storage.get_predictions(image_id)
 
     def get_num_images_per_category(self) -> dict[int, int]:
         self.num_images_per_category = {
@@ -1367,8 +1831,22 @@ class Dataset:
         }
         return num_annotations_per_category
 
-    def create_index(self):
-        """Create index for faster search."""
+    def create_index(self, use_cache: bool = True):
+        """Create index for faster search.
+        Every record is read from the storage exactly once (one directory walk for file storage),
+        and labeled / unlabeled images are derived from the image to annotations map.
+        The built index is saved to the index cache file next to info.yaml, and reused as long as
+        the storage signature (a manifest of the record files) has not changed.
+
+        Args:
+            use_cache (bool, optional): load the index from the index cache file if it is valid. Defaults to True.
+        """
+        start = time.time()
+        signature = self._storage.signature()
+        if use_cache and self._load_index_cache(signature):
+            logger.info(f"Loading index from cache done {time.time() - start:.2f} seconds")
+            return
+
         self._image_dict = OrderedDict()
         self._unlabeled_image_dict = OrderedDict()
         self._annotation_dict = OrderedDict()
@@ -1378,21 +1856,25 @@ class Dataset:
         self._image_to_predictions = OrderedDict()
         self._annotation_to_image = OrderedDict()
         self._prediction_to_image = OrderedDict()
-        self._category_to_images = OrderedDict()
-        self._category_to_unique_images = OrderedDict()
         self._category_name_to_category = OrderedDict()
-        self._category_to_annotations = OrderedDict()
-        self._category_to_predictions = OrderedDict()
 
-        start = time.time()
         logger.info("Creating index for faster search")
 
-        for image in self.get_images():
-            self._image_dict[image.image_id] = image  # image_id: image
-            self._image_to_annotations[image.image_id] = []
-            self._image_to_predictions[image.image_id] = []
+        images = self._storage.get_images()
+        annotations = self._storage.get_annotations()
+        predictions = self._storage.get_predictions()
+        categories = self._storage.get_categories()
+
+        annotated_image_ids = set(annotation.image_id for annotation in annotations)
+        for image in images:
+            if image.image_id in annotated_image_ids:
+                self._image_dict[image.image_id] = image  # image_id: image
+                self._image_to_annotations[image.image_id] = []
+                self._image_to_predictions[image.image_id] = []
+            else:
+                self._unlabeled_image_dict[image.image_id] = image  # unlabeled_image_id: image
 
-        for annotation in self.get_annotations():
+        for annotation in annotations:
             self._annotation_dict[annotation.annotation_id] = annotation  # annotation_id: annotation
             self._image_to_annotations[annotation.image_id].append(
                 annotation
@@ -1401,7 +1883,7 @@ class Dataset:
                 annotation.image_id
             ]  # annotation_id: image
 
-        for prediction in self.get_predictions():
+        for prediction in predictions:
             self._prediction_dict[prediction.annotation_id] = prediction  # annotation_id: prediction
             self._image_to_predictions[prediction.image_id].append(
                 prediction
@@ -1410,61 +1892,274 @@ class Dataset:
                 prediction.image_id
             ]  # prediction_id: image
 
-        for category in self.get_categories():
+        for category in categories:
             self._category_dict[category.category_id] = category  # category_id: category
             self._category_name_to_category[category.name] = category  # category_name: category
+        self._set_category_registry(categories)
+
+        self._create_category_index()
+        self._save_index_cache(signature)
+
+        logger.info(f"Creating index done {time.time() - start:.2f} seconds")
+
+    def _create_category_index(self):
+        """Create category_to_* indexes from the image, annotation and category indexes (no storage access)."""
+        self._category_to_images = OrderedDict()
+        self._category_to_unique_images = OrderedDict()
+        self._category_to_annotations = OrderedDict()
+        self._category_to_predictions = OrderedDict()
+
+        for category in self._category_dict.values():
             self._category_to_unique_images[category.category_id] = []  # category_id: image
             self._category_to_images[category.category_id] = set()
             self._category_to_annotations[category.category_id] = []
 
         for annotation in self._annotation_dict.values():
-            if self.task == TaskType.TEXT_RECOGNITION:
-                chars = set(annotation.caption)
-                for char in chars:
-                    category_id = self._category_name_to_category[char].category_id
-                    self._category_to_annotations[category_id].append(annotation)
-                    self._category_to_images[category_id].add(
-                        self._annotation_to_image[annotation.annotation_id]
-                    )
-            else:
-                self._category_to_annotations[annotation.category_id].append(
+            for category_id in self._get_annotation_category_ids(annotation):
+                self._category_to_annotations[category_id].append(
                     annotation
                 )  # category_id: [annotations]
-                self._category_to_images[annotation.category_id].add(
+                self._category_to_images[category_id].add(
                     self._annotation_to_image[annotation.annotation_id]
                 )  # category_id: {images}
 
         for image_id, annotations in self._image_to_annotations.items():
-            if self.task == TaskType.TEXT_RECOGNITION:
-                most_common_category = Counter(
-                    sum([list(annotation.caption) for annotation in annotations], [])
-                ).most_common(1)[0][0]
-                most_common_category_id = self._category_name_to_category[
-                    most_common_category
-                ].category_id
-                self._category_to_unique_images[most_common_category_id].append(
-                    self._image_dict[image_id]
-                )
-            else:
-                most_common_category_id = Counter(
-                    [annotation.category_id for annotation in annotations]
-                ).most_common(1)[0][0]
-                self._category_to_unique_images[most_common_category_id].append(
-                    self._image_dict[image_id]
-                )
+            self._category_to_unique_images[self._get_main_category_id(annotations)].append(
+                self._image_dict[image_id]
+            )
 
         for category_id, images in self._category_to_images.items():
             self._category_to_images[category_id] = list(images)
 
         for prediction in self._prediction_dict.values():
-            self._category_to_predictions[prediction.category_id].append(
+            self._category_to_predictions.setdefault(prediction.category_id, []).append(
                 prediction
             )  # category_id: [predictions]
 
-        for image in self.get_images(labeled=False):
-            self._unlabeled_image_dict[image.image_id] = image  # unlabeled_image_id: image
+    def _get_annotation_category_ids(self, annotation: Annotation) -> list[int]:
+        """Categories of an annotation (every character of the caption for text recognition)."""
+        if self.task == TaskType.TEXT_RECOGNITION:
+            return [
+                self._category_name_to_category[char].category_id for char in set(annotation.caption)
+            ]
+        return [annotation.category_id]
+
+    def _get_main_category_id(self, annotations: list[Annotation]) -> int:
+        """Most common category of the annotations of an image (see category_to_unique_images)."""
+        if self.task == TaskType.TEXT_RECOGNITION:
+            most_common_category = Counter(
+                sum([list(annotation.caption) for annotation in annotations], [])
+            ).most_common(1)[0][0]
+            return self._category_name_to_category[most_common_category].category_id
+        return Counter([annotation.category_id for annotation in annotations]).most_common(1)[0][0]
 
-        logger.info(f"Creating index done {time.time() - start:.2f} seconds")
+    def _load_index_cache(self, signature: str) -> bool:
+        """Load index from the index cache file.
+
+        Args:
+            signature (str): current storage signature.
+
+        Returns:
+            bool: True if the cache was valid and loaded.
+        """
+        if not self.index_cache_file.exists():
+            return False
+
+        try:
+            with open(self.index_cache_file, "rb") as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load index cache {self.index_cache_file}: {e}")
+            return False
+
+        if (
+            cache.get("version") != Dataset.INDEX_CACHE_VERSION
+            or cache.get("signature") != signature
+        ):
+            logger.info("Index cache is outdated")
+            return False
+
+        for name, value in cache["index"].items():
+            setattr(self, name, value)
+        return True
+
+    def _save_index_cache(self, signature: str):
+        """Save index to the index cache file.
+
+        Args:
+            signature (str): storage signature the index was built from.
+        """
+        cache = {
+            "version": Dataset.INDEX_CACHE_VERSION,
+            "signature": signature,
+            "index": {name: getattr(self, name) for name in Dataset.INDEX_ATTRIBUTES},
+        }
+        temp_file = self.index_cache_file.with_suffix(f".{os.getpid()}.tmp")
+        self._index_cache_outdated = False
+        try:
+            with open(temp_file, "wb") as f:
+                pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_file, self.index_cache_file)
+        except Exception as e:
+            logger.warning(f"Failed to save index cache {self.index_cache_file}: {e}")
+            if temp_file.exists():
+                temp_file.unlink()
+
+    def _flush_index_cache(self):
+        """Save the index cache if the in-memory index was patched since it was saved."""
+        if self._index_cache_outdated and hasattr(self, "_image_dict"):
+            self._save_index_cache(self._storage.signature())
+
+    def _drop_index(self):
+        """Drop the in-memory index. It will be created again on next access."""
+        self._index_cache_outdated = False
+        for name in Dataset.INDEX_ATTRIBUTES:
+            if hasattr(self, name):
+                delattr(self, name)
+
+    def _update_index(
+        self,
+        images: list[Image] = None,
+        categories: list[Category] = None,
+        annotations: list[Annotation] = None,
+        predictions: list[Annotation] = None,
+    ):
+        """Patch the in-memory index with newly added records, in time proportional to the records.
+        Nothing is done if the index has not been created yet.
+        Records overwriting existing ones (same id) drop the index instead, so it is created again on next access.
+        Inside a batch() block, the records are kept and the index is updated once when the block exits.
+        The index cache is only marked outdated, it is saved when a batch() block exits or on close().
+        """
+        if not hasattr(self, "_image_dict"):
+            return
+
+        if self._batch_depth > 0:
+            self._pending_index_records["images"].extend(images or [])
+            self._pending_index_records["categories"].extend(categories or [])
+            self._pending_index_records["annotations"].extend(annotations or [])
+            self._pending_index_records["predictions"].extend(predictions or [])
+            return
+
+        if not self._patch_index(
+            images or [], categories or [], annotations or [], predictions or []
+        ):
+            self._drop_index()
+            return
+
+        self._index_cache_outdated = True
+
+    def _patch_index(
+        self,
+        images: list[Image],
+        categories: list[Category],
+        annotations: list[Annotation],
+        predictions: list[Annotation],
+    ) -> bool:
+        for category in categories:
+            if category.category_id in self._category_dict:
+                return False
+            self._category_dict[category.category_id] = category
+            self._category_name_to_category[category.name] = category
+            self._category_to_images[category.category_id] = []
+            self._category_to_unique_images[category.category_id] = []
+            self._category_to_annotations[category.category_id] = []
+
+        for image in images:
+            if image.image_id in self._image_dict or image.image_id in self._unlabeled_image_dict:
+                return False
+            self._unlabeled_image_dict[image.image_id] = image  # labeled when annotated
+
+        main_category_ids = {}  # image_id: main category before the patch (None if unlabeled)
+        for annotation in annotations:
+            if annotation.annotation_id in self._annotation_dict:
+                return False
+            image = self._image_dict.get(annotation.image_id)
+            if image is None:
+                image = self._unlabeled_image_dict.pop(annotation.image_id, None)
+                if image is None:
+                    return False
+                self._image_dict[image.image_id] = image
+                self._image_to_annotations[image.image_id] = []
+                self._image_to_predictions[image.image_id] = []
+
+            image_annotations = self._image_to_annotations[image.image_id]
+            if image.image_id not in main_category_ids:
+                main_category_ids[image.image_id] = (
+                    self._get_main_category_id(image_annotations) if image_annotations else None
+                )
+            image_category_ids = {
+                category_id
+                for image_annotation in image_annotations
+                for category_id in self._get_annotation_category_ids(image_annotation)
+            }
+            for category_id in self._get_annotation_category_ids(annotation):
+                self._category_to_annotations[category_id].append(annotation)
+                if category_id not in image_category_ids:
+                    self._category_to_images[category_id].append(image)
+
+            self._annotation_dict[annotation.annotation_id] = annotation
+            image_annotations.append(annotation)
+            self._annotation_to_image[annotation.annotation_id] = image
+
+        for image_id, old_category_id in main_category_ids.items():
+            new_category_id = self._get_main_category_id(self._image_to_annotations[image_id])
+            if new_category_id != old_category_id:
+                image = self._image_dict[image_id]
+                if old_category_id is not None:
+                    self._category_to_unique_images[old_category_id].remove(image)
+                self._category_to_unique_images[new_category_id].append(image)
+
+        for prediction in predictions:
+            if (
+                prediction.annotation_id in self._prediction_dict
+                or prediction.image_id not in self._image_dict
+            ):
+                return False
+            self._prediction_dict[prediction.annotation_id] = prediction
+            self._image_to_predictions[prediction.image_id].append(prediction)
+            self._category_to_predictions.setdefault(prediction.category_id, []).append(prediction)
+            self._prediction_to_image[prediction.annotation_id] = self._image_dict[
+                prediction.image_id
+            ]
+
+        return True
+
+    @contextmanager
+    def batch(self):
+        """Group many add_* calls.
+        Inside the block, records are written to the storage immediately, but saving the dataset info
+        and updating the index (and saving its cache) are deferred until the block exits.
+        The index (e.g. image_dict) is not updated with the records added inside the block until then.
+
+        Examples:
+            >>> ds = Dataset.load("my_dataset")
+            >>> with ds.batch():
+            >>>     for image, annotations in records:
+            >>>         ds.add_images([image])
+            >>>         ds.add_annotations(annotations)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                if self._dataset_info_outdated:
+                    self._dataset_info_outdated = False
+                    self.save_dataset_info()
+
+                pending_index_records = self._pending_index_records
+                self._pending_index_records = defaultdict(list)
+                if any(pending_index_records.values()):
+                    self._update_index(**pending_index_records)
+                self._flush_index_cache()
+
+    def close(self):
+        """Save the index cache if records were added since it was saved, and release the storage.
+        The dataset can still be used after (the storage reconnects when needed).
+        """
+        self._flush_index_cache()
+        self._storage.close()
 
     # add
     def add_images(self, images: Union[Image, list[Image]]):
@@ -1476,10 +2171,11 @@ class Dataset:
         if not isinstance(images, list):
             images = [images]
 
-        for item in images:
-            item_id = item.image_id
-            item_path = self.image_dir / f"{item_id}.json"
-            io.save_json(item.to_dict(), item_path, create_directory=True)
+        self._storage.add_images(images)
+        self._update_index(images=images)
+        self._add_raw_images_to_blob_store(
+            [self.raw_image_dir / image.file_name for image in images]
+        )
 
     def add_categories(self, categories: Union[Category, list[Category]]):
         """Add "Category"s to dataset.
@@ -1492,18 +2188,20 @@ class Dataset:
 
         category_names_list = [category.name for category in categories]
         category_names = set(category_names_list)
-        if (
-            len(category_names) != len(category_names_list)
-            or set(self.get_category_names()) & category_names
+        category_name_registry = self._get_category_name_registry()
+        if len(category_names) != len(category_names_list) or any(
+            name in category_name_registry for name in category_names
         ):
             raise ValueError("Category names should be unique")
 
-        for item in categories:
-            item_id = item.category_id
-            item_path = self.category_dir / f"{item_id}.json"
-            io.save_json(item.to_dict(), item_path, create_directory=True)
+        self._storage.add_categories(categories)
+        self._register_categories([copy.copy(category) for category in categories])
+        self._update_index(categories=categories)
 
-        self.save_dataset_info()
+        if self._batch_depth > 0:
+            self._dataset_info_outdated = True
+        else:
+            self.save_dataset_info()
 
     def add_annotations(self, annotations: Union[Annotation, list[Annotation]]):
         """Add "Annotation"s to dataset.
@@ -1514,14 +2212,15 @@ class Dataset:
         if not isinstance(annotations, list):
             annotations = [annotations]
 
-        categories = self.get_category_names()
-        for item in annotations:
-            if self.task == TaskType.TEXT_RECOGNITION:
+        if self.task == TaskType.TEXT_RECOGNITION:
+            category_name_registry = self._get_category_name_registry()
+            for item in annotations:
                 for char in item.caption:
-                    if char not in categories:
+                    if char not in category_name_registry:
                         raise ValueError(f"Category '{char}' is not in dataset")
-            item_path = self.annotation_dir / f"{item.image_id}" / f"{item.annotation_id}.json"
-            io.save_json(item.to_dict(), item_path, create_directory=True)
+
+        self._storage.add_annotations(annotations)
+        self._update_index(annotations=annotations)
 
     def add_predictions(self, predictions: Union[Annotation, list[Annotation]]):
         """Add "Annotation"s to dataset.
@@ -1532,14 +2231,15 @@ class Dataset:
         if not isinstance(predictions, list):
             predictions = [predictions]
 
-        categories = self.get_category_names()
-        for item in predictions:
-            if self.task == TaskType.TEXT_RECOGNITION:
+        if self.task == TaskType.TEXT_RECOGNITION:
+            category_name_registry = self._get_category_name_registry()
+            for item in predictions:
                 for char in item.caption:
-                    if char not in categories:
+                    if char not in category_name_registry:
                         raise ValueError(f"Category '{char}' is not in dataset")
-            item_path = self.prediction_dir / f"{item.image_id}" / f"{item.annotation_id}.json"
-            io.save_json(item.to_dict(), item_path, create_directory=True)
+
+        self._storage.add_predictions(predictions)
+        self._update_index(predictions=predictions)
 
     # functions
     def split(
@@ -1664,21 +2364,103 @@ class Dataset:
 
         return [train_ids, val_ids, test_ids, unlabeled_ids]
 
-    def export(self, data_type: Union[str, DataType]) -> str:
+    def _get_export_source_signature(self) -> str:
+        """Signature of everything an export is made from (records and set files).
+        Raw images modified in place are not detected here, but by the per-image hashes of the export manifest.
+        """
+        signature = hashlib.sha1(self._storage.signature().encode())
+        for set_file in [
+            self.train_set_file,
+            self.val_set_file,
+            self.test_set_file,
+            self.unlabeled_set_file,
+        ]:
+            signature.update(set_file.read_bytes() if set_file.exists() else b"-")
+        return signature.hexdigest()
+
+    def _get_export_meta(self, data_type: Union[str, DataType], link_mode: Union[str, LinkMode]):
+        """Export configuration. Exports with a different meta can not be updated incrementally."""
+        return {
+            "data_type": EXPORT_MAP[data_type.upper()],
+            "link_mode": str(link_mode).upper(),
+            "task": str(self.task).upper(),
+            "categories": [category.to_dict() for category in self.get_categories()],
+        }
+
+    def is_export_outdated(self, data_type: Union[str, DataType]) -> bool:
+        """Check if the export of the data type is missing or older than the dataset.
+        Only the export manifest is compared with the dataset, exported files are not read.
+
+        Args:
+            data_type (Union[str, DataType]): export data type.
+
+        Examples:
+            >>> dataset.export("YOLO")
+            >>> dataset.is_export_outdated("YOLO")
+            False
+            >>> dataset.add_images(...)
+            >>> dataset.is_export_outdated("YOLO")
+            True
+
+        Returns:
+            bool: True if the dataset should be exported again.
+        """
+        manifest = ExportManifest.read(self.export_dir / EXPORT_MAP[data_type.upper()])
+        if manifest is None:
+            return True
+        return manifest.get("source") != self._get_export_source_signature()
+
+    def export(
+        self,
+        data_type: Union[str, DataType],
+        link_mode: Union[str, LinkMode] = None,
+        incremental: bool = True,
+        workers: int = None,
+        callback: ThreadProgressCallback = None,
+        shard_size: int = None,
+    ) -> str:
         """
-        Export Dataset to Specific data formats
+        Export Dataset to Specific data formats.
+        An export manifest is written with the export. When exporting again with the same link mode and categories,
+        only images whose records, annotations, raw image or split changed are exported again,
+        and files of removed images are deleted.
 
         Args:
-            data_type (Union[str, DataType]): export data type. one of ["YOLO", "COCO"].
+            data_type (Union[str, DataType]): export data type. one of ["YOLO", "COCO", "AUTOCARE_DLT", "TRANSFORMERS", "WEBDATASET"].
+                WEBDATASET writes size-bounded tar shards (image bytes and a json per sample) with an index,
+                to be streamed with sequential reads by LabeledDataset and ImageDataset.
+            link_mode (Union[str, LinkMode], optional): How to put raw images to the export directory.
+                one of ["copy", "hardlink", "symlink", "reflink"]. Linked exports do not duplicate the raw images on disk.
+                Falls back to "copy" if the filesystem does not support the link mode.
+                Defaults to None (the link mode of the existing export, or LinkMode.COPY).
+            incremental (bool, optional): Update the existing export incrementally. False to export everything again. Defaults to True.
+            workers (int, optional): Number of worker threads linking images and writing label files. Defaults to None (auto).
+            callback (ThreadProgressCallback, optional): Progress callback. Its steps are images, so get_throughput() is images/s. Defaults to None.
+            shard_size (int, optional): Maximum size of a WEBDATASET shard in bytes. Defaults to None (1GB).
 
         Raises:
             ValueError: if data_type is not one of DataType.
+            ValueError: if link_mode is not one of LinkMode.
 
         Examples:
             >>> dataset = Dataset.load("some_dataset")
             >>> dataset.export(data_type="YOLO")
             path/to/dataset_dir/exports/yolo
 
+            # Export without duplicating raw images
+            >>> dataset.export(data_type="YOLO", link_mode="hardlink")
+            path/to/dataset_dir/exports/yolo
+
+            # Export with 8 workers and watch the progress
+            >>> callback = ThreadProgressCallback(total_steps=1)
+            >>> dataset.export(data_type="YOLO", workers=8, callback=callback)
+            >>> callback.get_progress(), callback.get_throughput()
+            (1.0, 2345.6)
+
+            # Export tar shards of 256MB
+            >>> dataset.export(data_type="WEBDATASET", shard_size=256 << 20)
+            path/to/dataset_dir/exports/webdataset
+
             # You can train with exported dataset
             >>> hub.train("path/to/dataset_dir/exports/yolo", ...)
 
@@ -1697,27 +2479,66 @@ class Dataset:
             export_function = export_autocare_dlt
         elif data_type in [DataType.TRANSFORMERS]:
             export_function = export_transformers
+            incremental = False
+        elif data_type in [DataType.WEBDATASET]:
+            export_function = export_webdataset
+            if shard_size is not None:
+                export_function = partial(export_webdataset, shard_size=shard_size)
+            incremental = False
 
         else:
             raise ValueError(f"Invalid data_type: {data_type}")
 
+        if link_mode is None:
+            link_mode = (ExportManifest.read(export_dir) or {}).get("meta", {}).get("link_mode")
+            link_mode = link_mode or LinkMode.COPY
+        if link_mode not in LinkMode:
+            raise ValueError(f"Invalid link_mode: {link_mode}. It should be one of {list(LinkMode)}")
+
         try:
-            if export_dir.exists():
-                io.remove_directory(export_dir)
-                warnings.warn(f"{export_dir} already exists. Removing exist export and override.")
+            source_signature = self._get_export_source_signature()
+            manifest = ExportManifest.load(export_dir, self._get_export_meta(data_type, link_mode))
+            if not (incremental and manifest.incremental):
+                manifest = ExportManifest(manifest.meta)
+                if export_dir.exists():
+                    io.remove_directory(export_dir)
+                    warnings.warn(
+                        f"{export_dir} already exists. Removing exist export and override."
+                    )
+
+            export_dir = export_function(
+                self,
+                export_dir,
+                link_mode=link_mode,
+                manifest=manifest,
+                workers=workers,
+                callback=callback,
+            )
 
-            export_dir = export_function(self, export_dir)
+            removed_num = manifest.remove_orphans(export_dir)
+            if removed_num:
+                logger.info(f"Removed {removed_num} files not exported anymore from {export_dir}")
+            manifest.source = source_signature
+            manifest.save(export_dir)
 
+            if callback is not None:
+                callback.force_finish()
             return export_dir
 
         except Exception as e:
-            if export_dir.exists():
+            if callback is not None:
+                callback.force_finish()
+                callback.set_failed()
+            if Path(export_dir).exists():
                 io.remove_directory(export_dir)
             raise e
 
     def delete(self):
-        """Delete Dataset"""
+        """Delete Dataset. Blobs of its raw images are removed if no other dataset links to them."""
+        digests = self._get_blob_digests()
+        self._storage.close()
         io.remove_directory(self.dataset_dir)
+        self._release_blobs(digests)
         del self
 
     def draw_annotations(self, image_ids=None):
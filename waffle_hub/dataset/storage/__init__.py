@@ -0,0 +1,37 @@
+from pathlib import Path
+from typing import Union
+
+from waffle_hub import StorageType
+
+from .base_storage import BaseStorage
+from .file_storage import FileStorage
+from .sqlite_storage import SQLiteStorage
+
+STORAGE_CLASSES = {
+    StorageType.FILE: FileStorage,
+    StorageType.SQLITE: SQLiteStorage,
+}
+
+
+def get_storage(storage_type: Union[str, StorageType], dataset_dir: Path, task: str) -> BaseStorage:
+    """Get storage instance of given storage type.
+
+    Args:
+        storage_type (Union[str, StorageType]): storage type. one of StorageType.
+        dataset_dir (Path): dataset directory.
+        task (str): dataset task.
+
+    Raises:
+        ValueError: if storage_type is not one of StorageType.
+
+    Returns:
+        BaseStorage: storage instance.
+    """
+    if storage_type not in StorageType:
+        raise ValueError(
+            f"Invalid storage type: {storage_type}. Available storage types: {list(StorageType)}"
+        )
+    return STORAGE_CLASSES[StorageType[str(storage_type).upper()]](dataset_dir, task)
+
+
+__all__ = ["BaseStorage", "FileStorage", "SQLiteStorage", "get_storage"]
@@ -0,0 +1,94 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from waffle_hub.schema.fields import Annotation, Category, Image
+
+
+class BaseStorage(ABC):
+    """Base class of dataset record storages.
+
+    A storage keeps the "Image", "Annotation", "Prediction" and "Category" records of a dataset.
+    Raw images, set files and exports are not managed by a storage.
+
+    Args:
+        dataset_dir (Path): dataset directory.
+        task (str): dataset task.
+    """
+
+    def __init__(self, dataset_dir: Path, task: str):
+        self.dataset_dir = Path(dataset_dir)
+        self.task = task
+
+    @abstractmethod
+    def initialize(self):
+        """Create the storage under the dataset directory."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self):
+        """Remove the storage from the dataset directory."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def signature(self) -> str:
+        """Get a signature that changes whenever any record of the storage is added, removed or modified.
+        It is used to validate the index cache of a dataset.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def clone(self, dataset_dir: Path) -> "BaseStorage":
+        """Copy every record to the storage of another dataset directory, replacing its records.
+        Data is shared with this storage as long as neither of them modifies it (copy-on-write),
+        if the storage engine and the filesystem allow it.
+
+        Args:
+            dataset_dir (Path): dataset directory to copy the records to.
+
+        Returns:
+            BaseStorage: storage of the dataset directory.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release resources held by the storage (e.g. database connections)."""
+        pass
+
+    # get
+    @abstractmethod
+    def get_images(self, image_ids: list[int] = None) -> list[Image]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_categories(self, category_ids: list[int] = None) -> list[Category]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_annotations(self, image_id: int = None) -> list[Annotation]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_predictions(self, image_id: int = None) -> list[Annotation]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_annotated_image_ids(self) -> set[int]:
+        """Get ids of images that have at least one annotation, without parsing the annotations."""
+        raise NotImplementedError
+
+    # add
+    @abstractmethod
+    def add_images(self, images: list[Image]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_categories(self, categories: list[Category]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_annotations(self, annotations: list[Annotation]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_predictions(self, predictions: list[Annotation]):
+        raise NotImplementedError
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from waffle_utils.file import io
+
+from waffle_hub import LinkMode
+from waffle_hub.schema.fields import Annotation, Category, Image
+from waffle_hub.utils.file import link_directory
+
+from .base_storage import BaseStorage
+
+
+class FileStorage(BaseStorage):
+    """Storage that keeps one json file per record.
+
+    {dataset_dir}/
+        images/{image_id}.json
+        annotations/{image_id}/{annotation_id}.json
+        predictions/{image_id}/{annotation_id}.json
+        categories/{category_id}.json
+    """
+
+    IMAGE_DIR = Path("images")
+    ANNOTATION_DIR = Path("annotations")
+    PREDICTION_DIR = Path("predictions")
+    CATEGORY_DIR = Path("categories")
+
+    # bulk writes are grouped by directory and written by a bounded thread pool
+    MAX_WRITE_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+    WRITE_CHUNK_SIZE = 256
+
+    def __init__(self, dataset_dir: Path, task: str):
+        super().__init__(dataset_dir, task)
+
+        self.image_dir = self.dataset_dir / FileStorage.IMAGE_DIR
+        self.annotation_dir = self.dataset_dir / FileStorage.ANNOTATION_DIR
+        self.prediction_dir = self.dataset_dir / FileStorage.PREDICTION_DIR
+        self.category_dir = self.dataset_dir / FileStorage.CATEGORY_DIR
+
+    def initialize(self):
+        io.make_directory(self.image_dir)
+        io.make_directory(self.annotation_dir)
+        io.make_directory(self.category_dir)
+
+    def delete(self):
+        for directory in [
+            self.image_dir,
+            self.annotation_dir,
+            self.prediction_dir,
+            self.category_dir,
+        ]:
+            if directory.exists():
+                io.remove_directory(directory)
+
+    def signature(self) -> str:
+        manifest = hashlib.sha1()
+        for directory in [self.image_dir, self.category_dir]:
+            self._update_manifest(manifest, str(directory), directory.name)
+        for root_dir in [self.annotation_dir, self.prediction_dir]:
+            for sub_directory in self._scan_sub_directories(str(root_dir)):
+                self._update_manifest(
+                    manifest, sub_directory, f"{root_dir.name}/{os.path.basename(sub_directory)}"
+                )
+        return manifest.hexdigest()
+
+    def clone(self, dataset_dir: Path) -> "FileStorage":
+        # records are hardlinked, writes replace the files instead of modifying them (see _write_json)
+        storage = FileStorage(dataset_dir, self.task)
+        storage.delete()
+        for src_dir, dst_dir in [
+            (self.image_dir, storage.image_dir),
+            (self.annotation_dir, storage.annotation_dir),
+            (self.prediction_dir, storage.prediction_dir),
+            (self.category_dir, storage.category_dir),
+        ]:
+            link_directory(src_dir, dst_dir, LinkMode.HARDLINK)
+        storage.initialize()
+        return storage
+
+    @staticmethod
+    def _update_manifest(manifest, directory: str, prefix: str):
+        """Add (name, mtime, size) of every file in the directory to the manifest hash."""
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            stat = entry.stat()
+            manifest.update(f"{prefix}/{entry.name}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+
+    # scan (plain str paths and os.scandir, pathlib is too slow for hundreds of thousands of files)
+    @staticmethod
+    def _id_sort_key(entry: os.DirEntry):
+        stem = entry.name.split(".")[0]
+        return (0, int(stem), "") if stem.isdigit() else (1, 0, entry.name)
+
+    @staticmethod
+    def _scan_json_files(directory: str) -> list[str]:
+        """List json files of a directory with one scandir call, sorted by their id."""
+        try:
+            with os.scandir(directory) as entries:
+                files = [entry for entry in entries if entry.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        return [entry.path for entry in sorted(files, key=FileStorage._id_sort_key)]
+
+    @staticmethod
+    def _scan_sub_directories(directory: str) -> list[str]:
+        try:
+            with os.scandir(directory) as entries:
+                sub_directories = [entry for entry in entries if entry.is_dir()]
+        except FileNotFoundError:
+            return []
+        return [entry.path for entry in sorted(sub_directories, key=FileStorage._id_sort_key)]
+
+    @staticmethod
+    def _load_json(file: str) -> dict:
+        with open(file) as f:
+            return json.load(f)
+
+    # get
+    def get_images(self, image_ids: list[int] = None) -> list[Image]:
+        image_files = (
+            list(map(lambda x: self.image_dir / (str(x) + ".json"), image_ids))
+            if image_ids
+            else self._scan_json_files(self.image_dir)
+        )
+        return [Image.from_trusted_dict(self._load_json(image_file)) for image_file in image_files]
+
+    def get_categories(self, category_ids: list[int] = None) -> list[Category]:
+        return sorted(
+            [
+                Category.from_json(f, self.task)
+                for f in (
+                    [self.category_dir / f"{category_id}.json" for category_id in category_ids]
+                    if category_ids
+                    else self._scan_json_files(self.category_dir)
+                )
+            ],
+            key=lambda x: x.category_id,
+        )
+
+    def get_annotations(self, image_id: int = None) -> list[Annotation]:
+        return self._get_annotations(self.annotation_dir, image_id)
+
+    def get_predictions(self, image_id: int = None) -> list[Annotation]:
+        return self._get_annotations(self.prediction_dir, image_id)
+
+    def get_annotated_image_ids(self) -> set[int]:
+        annotated_image_ids = set()
+        for image_annotation_dir in self._scan_sub_directories(self.annotation_dir):
+            with os.scandir(image_annotation_dir) as entries:
+                if any(entry.name.endswith(".json") for entry in entries):
+                    annotated_image_ids.add(int(os.path.basename(image_annotation_dir)))
+        return annotated_image_ids
+
+    def _get_annotations(self, root_dir: Path, image_id: int = None) -> list[Annotation]:
+        if image_id:
+            annotation_files = self._scan_json_files(root_dir / str(image_id))
+        else:
+            annotation_files = [
+                f
+                for image_annotation_dir in self._scan_sub_directories(root_dir)
+                for f in self._scan_json_files(image_annotation_dir)
+            ]
+        return [
+            Annotation.from_trusted_dict(self._load_json(f), self.task) for f in annotation_files
+        ]
+
+    # add
+    def add_images(self, images: list[Image]):
+        self._write_json_files(
+            [
+                (os.path.join(self.image_dir, f"{item.image_id}.json"), item.to_dict())
+                for item in images
+            ]
+        )
+
+    def add_categories(self, categories: list[Category]):
+        self._write_json_files(
+            [
+                (os.path.join(self.category_dir, f"{item.category_id}.json"), item.to_dict())
+                for item in categories
+            ]
+        )
+
+    def add_annotations(self, annotations: list[Annotation]):
+        self._add_annotations(self.annotation_dir, annotations)
+
+    def add_predictions(self, predictions: list[Annotation]):
+        self._add_annotations(self.prediction_dir, predictions)
+
+    def _add_annotations(self, root_dir: Path, annotations: list[Annotation]):
+        self._write_json_files(
+            [
+                (
+                    os.path.join(root_dir, str(item.image_id), f"{item.annotation_id}.json"),
+                    item.to_dict(),
+                )
+                for item in annotations
+            ]
+        )
+
+    @staticmethod
+    def _write_json(file: str, obj: dict):
+        # never write through a record hardlinked to a clone or a snapshot of the dataset
+        try:
+            os.unlink(file)
+        except FileNotFoundError:
+            pass
+        with open(file, "w") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def _write_json_chunk(chunk: list[tuple[str, dict]]):
+        for file, obj in chunk:
+            FileStorage._write_json(file, obj)
+
+    def _write_json_files(self, files: list[tuple[str, dict]]):
+        """Write json files in bulk.
+        Files are grouped by directory so that every directory is created only once,
+        and chunks of files are written concurrently by at most MAX_WRITE_WORKERS threads.
+
+        Args:
+            files (list[tuple[str, dict]]): (file path, json object) list.
+        """
+        files_by_directory = defaultdict(list)
+        for file, obj in files:
+            files_by_directory[os.path.dirname(file)].append((file, obj))
+
+        for directory in files_by_directory:
+            os.makedirs(directory, exist_ok=True)
+
+        files = [file for directory_files in files_by_directory.values() for file in directory_files]
+        chunks = [
+            files[i : i + FileStorage.WRITE_CHUNK_SIZE]
+            for i in range(0, len(files), FileStorage.WRITE_CHUNK_SIZE)
+        ]
+        if len(chunks) <= 1:
+            for chunk in chunks:
+                self._write_json_chunk(chunk)
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=min(FileStorage.MAX_WRITE_WORKERS, len(chunks))
+        ) as executor:
+            for _ in executor.map(self._write_json_chunk, chunks):  # re-raise write errors
+                pass
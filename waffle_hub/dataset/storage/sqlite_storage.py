@@ -0,0 +1,212 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from waffle_hub.schema.fields import Annotation, Category, Image
+from waffle_hub.utils.file import clone_file
+
+from .base_storage import BaseStorage
+
+# keep "IN (...)" queries under the default SQLITE_MAX_VARIABLE_NUMBER of old sqlite builds
+_MAX_QUERY_VARIABLES = 900
+
+
+class SQLiteStorage(BaseStorage):
+    """Storage that keeps every record in a single sqlite database file.
+
+    {dataset_dir}/
+        dataset.db
+            images(image_id, data)
+            annotations(image_id, annotation_id, data)
+            predictions(image_id, annotation_id, data)
+            categories(category_id, data)
+            meta(key, value)
+
+    Each record is stored as the json of its to_dict(), so the content is identical to FileStorage.
+    Adding a list of records is done with a single transaction, which also sets a new meta "revision".
+    The revision is the signature of the storage, so checkpoints of the database file (e.g. when the last
+    connection is closed) do not change it.
+    A connection is kept per thread (and per process, for forked dataloader workers).
+    """
+
+    DB_FILE_NAME = Path("dataset.db")
+
+    def __init__(self, dataset_dir: Path, task: str):
+        super().__init__(dataset_dir, task)
+
+        self.db_file = self.dataset_dir / SQLiteStorage.DB_FILE_NAME
+        self._local = threading.local()
+
+    @contextmanager
+    def _connect(self):
+        pid, conn = getattr(self._local, "connection", (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.db_file)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = (os.getpid(), conn)
+        with conn:  # commit on success, rollback on error
+            yield conn
+
+    def close(self):
+        """Close the connection of the current thread."""
+        pid, conn = getattr(self._local, "connection", (None, None))
+        if conn is not None and pid == os.getpid():
+            conn.close()
+        self._local.connection = (None, None)
+
+    def initialize(self):
+        self.dataset_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS images (image_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS categories (category_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+            )
+            for table in ["annotations", "predictions"]:
+                conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} ("
+                    "image_id INTEGER NOT NULL, annotation_id INTEGER NOT NULL, data TEXT NOT NULL, "
+                    "PRIMARY KEY (image_id, annotation_id))"
+                )
+            self._create_meta_table(conn)
+            self._set_revision(conn)
+
+    def delete(self):
+        self.close()
+        for suffix in ["", "-wal", "-shm"]:
+            db_file = Path(str(self.db_file) + suffix)
+            if db_file.exists():
+                db_file.unlink()
+
+    def clone(self, dataset_dir: Path) -> "SQLiteStorage":
+        # the database is modified in place, so it is reflinked (copy-on-write) or copied, never hardlinked
+        storage = SQLiteStorage(dataset_dir, self.task)
+        storage.delete()
+        with self._connect() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        clone_file(self.db_file, storage.db_file, create_directory=True)
+        return storage
+
+    def signature(self) -> str:
+        with self._connect() as conn:
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+            except sqlite3.OperationalError:  # database created before the meta table
+                row = None
+        return row[0] if row else ""
+
+    @staticmethod
+    def _create_meta_table(conn: sqlite3.Connection):
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _set_revision(self, conn: sqlite3.Connection):
+        """Set a new revision in the transaction of a write (see signature)."""
+        self._create_meta_table(conn)
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('revision', ?)", (uuid.uuid4().hex,)
+        )
+
+    # get
+    def _select_by_ids(self, table: str, key: str, ids: list[int]) -> list[str]:
+        ids = list(map(int, ids))
+        rows = {}
+        with self._connect() as conn:
+            for i in range(0, len(ids), _MAX_QUERY_VARIABLES):
+                chunk = ids[i : i + _MAX_QUERY_VARIABLES]
+                rows.update(
+                    conn.execute(
+                        f"SELECT {key}, data FROM {table} WHERE {key} IN ({','.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                )
+        missing_ids = [id_ for id_ in ids if id_ not in rows]
+        if missing_ids:
+            raise ValueError(f"{table} {missing_ids} do not exist in {self.db_file}")
+        return [rows[id_] for id_ in ids]
+
+    def _select_all(self, table: str, order_by: str) -> list[str]:
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(f"SELECT data FROM {table} ORDER BY {order_by}")]
+
+    def get_images(self, image_ids: list[int] = None) -> list[Image]:
+        rows = (
+            self._select_by_ids("images", "image_id", image_ids)
+            if image_ids
+            else self._select_all("images", "image_id")
+        )
+        return [Image.from_trusted_dict(json.loads(row)) for row in rows]
+
+    def get_categories(self, category_ids: list[int] = None) -> list[Category]:
+        rows = (
+            self._select_by_ids("categories", "category_id", category_ids)
+            if category_ids
+            else self._select_all("categories", "category_id")
+        )
+        return sorted(
+            [Category.from_dict(json.loads(row), self.task) for row in rows],
+            key=lambda x: x.category_id,
+        )
+
+    def get_annotations(self, image_id: int = None) -> list[Annotation]:
+        return self._get_annotations("annotations", image_id)
+
+    def get_predictions(self, image_id: int = None) -> list[Annotation]:
+        return self._get_annotations("predictions", image_id)
+
+    def get_annotated_image_ids(self) -> set[int]:
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute("SELECT DISTINCT image_id FROM annotations")}
+
+    def _get_annotations(self, table: str, image_id: int = None) -> list[Annotation]:
+        if image_id:
+            with self._connect() as conn:
+                rows = [
+                    row[0]
+                    for row in conn.execute(
+                        f"SELECT data FROM {table} WHERE image_id = ? ORDER BY annotation_id",
+                        (int(image_id),),
+                    )
+                ]
+        else:
+            rows = self._select_all(table, "image_id, annotation_id")
+        return [Annotation.from_trusted_dict(json.loads(row), self.task) for row in rows]
+
+    # add
+    def add_images(self, images: list[Image]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO images (image_id, data) VALUES (?, ?)",
+                [(item.image_id, json.dumps(item.to_dict())) for item in images],
+            )
+            self._set_revision(conn)
+
+    def add_categories(self, categories: list[Category]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO categories (category_id, data) VALUES (?, ?)",
+                [(item.category_id, json.dumps(item.to_dict())) for item in categories],
+            )
+            self._set_revision(conn)
+
+    def add_annotations(self, annotations: list[Annotation]):
+        self._add_annotations("annotations", annotations)
+
+    def add_predictions(self, predictions: list[Annotation]):
+        self._add_annotations("predictions", predictions)
+
+    def _add_annotations(self, table: str, annotations: list[Annotation]):
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (image_id, annotation_id, data) VALUES (?, ?, ?)",
+                [
+                    (item.image_id, item.annotation_id, json.dumps(item.to_dict()))
+                    for item in annotations
+                ],
+            )
+            self._set_revision(conn)
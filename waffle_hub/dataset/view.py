@@ -0,0 +1,311 @@
+import copy
+import hashlib
+import logging
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+from typing import Callable, Union
+
+from waffle_utils.file import io
+
+from waffle_hub import LinkMode
+from waffle_hub.schema import Annotation, Category, DatasetInfo, Image
+from waffle_hub.utils.file import link_file
+
+from .dataset import Dataset
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetView(Dataset):
+    """Read only, filtered view of a Dataset built from its in-memory index.
+    Nothing is copied: images and annotations are shared with the dataset index, and raw images are read from
+    the raw image directory of the dataset. A view can be split, exported and given to Hub.train and Hub.evaluate
+    like a Dataset. Its set files and exports are kept under {dataset_dir}/views/{view name}.
+    Use materialize() to write it to disk as an independent dataset.
+
+    Args:
+        dataset (Dataset): dataset to view.
+        image_ids (list[int], optional): image ids to keep. Defaults to None (all images).
+        category_ids (list[int], optional): category ids to keep. Annotations of other categories are dropped,
+            images without remaining annotations are dropped, and the categories are renumbered from 1
+            in the given order. Defaults to None (all categories).
+        predicate (Callable[[Image, list[Annotation]], bool], optional): keep images for which it returns True.
+            It is called with each image and its (category filtered) annotations. Defaults to None.
+        name (str, optional): view name. Defaults to None (derived from the selected records,
+            so that the same selection reuses its set files and exports).
+    """
+
+    VIEW_DIR = Path("views")
+
+    def __init__(
+        self,
+        dataset: Dataset,
+        image_ids: list[int] = None,
+        category_ids: list[int] = None,
+        predicate: Callable[[Image, list[Annotation]], bool] = None,
+        name: str = None,
+    ):
+        if isinstance(dataset, DatasetView):
+            raise ValueError("A view of a view is not supported. Filter the dataset at once.")
+
+        self._dataset = dataset
+        self._image_ids = image_ids
+        self._category_ids = category_ids
+        self._predicate = predicate
+
+        self.task = dataset.task
+        self.created = dataset.created
+        self.storage = dataset.storage
+        self._storage = dataset._storage  # read only, for the export signature
+
+        self._batch_depth = 0
+        self._dataset_info_outdated = False
+        self._index_cache_outdated = False
+        self._pending_index_records = defaultdict(list)
+
+        self.create_index()
+        self.name = name or f"view_{self._selection_digest[:12]}"
+        self.root_dir = dataset.dataset_dir / DatasetView.VIEW_DIR
+
+    def __repr__(self):
+        return f"DatasetView(dataset={self._dataset.name}, name={self.name}, images={len(self.image_dict)})"
+
+    @property
+    def dataset(self) -> Dataset:
+        """Dataset of the view."""
+        return self._dataset
+
+    @property
+    def raw_image_dir(self) -> Path:
+        return self._dataset.raw_image_dir
+
+    # index
+    def create_index(self, use_cache: bool = True):
+        """Create the index of the view by filtering the index of the dataset (no storage access).
+
+        Args:
+            use_cache (bool, optional): not used, the dataset index is used (and cached) as is. Defaults to True.
+        """
+        dataset = self._dataset
+
+        if self._category_ids is None:
+            category_old2new = {category_id: category_id for category_id in dataset.category_dict}
+        else:
+            for category_id in self._category_ids:
+                if category_id not in dataset.category_dict:
+                    raise ValueError(f"Category {category_id} does not exist in {dataset.name}")
+            category_old2new = {
+                category_id: new_category_id
+                for new_category_id, category_id in enumerate(self._category_ids, start=1)
+            }
+
+        categories = []
+        for category_id, new_category_id in category_old2new.items():
+            category = dataset.category_dict[category_id]
+            if category_id != new_category_id:
+                category = copy.copy(category)
+                category.category_id = new_category_id
+            categories.append(category)
+
+        def _filter(annotations: list[Annotation]) -> list[Annotation]:
+            if self._category_ids is None:
+                return annotations
+            filtered = []
+            for annotation in annotations:
+                if annotation.category_id in category_old2new:
+                    if category_old2new[annotation.category_id] != annotation.category_id:
+                        annotation = copy.copy(annotation)
+                        annotation.category_id = category_old2new[annotation.category_id]
+                    filtered.append(annotation)
+            return filtered
+
+        image_ids = set(self._image_ids) if self._image_ids is not None else None
+        if image_ids is not None:
+            missing_image_ids = [
+                image_id
+                for image_id in self._image_ids
+                if image_id not in dataset.image_dict
+                and image_id not in dataset.unlabeled_image_dict
+            ]
+            if missing_image_ids:
+                raise ValueError(f"Images {missing_image_ids} do not exist in {dataset.name}")
+
+        self._image_dict = OrderedDict()
+        self._unlabeled_image_dict = OrderedDict()
+        self._annotation_dict = OrderedDict()
+        self._prediction_dict = OrderedDict()
+        self._category_dict = OrderedDict()
+        self._image_to_annotations = OrderedDict()
+        self._image_to_predictions = OrderedDict()
+        self._annotation_to_image = OrderedDict()
+        self._prediction_to_image = OrderedDict()
+        self._category_name_to_category = OrderedDict()
+
+        for image_id, image in dataset.image_dict.items():
+            if image_ids is not None and image_id not in image_ids:
+                continue
+            annotations = _filter(dataset.image_to_annotations[image_id])
+            if not annotations or (self._predicate and not self._predicate(image, annotations)):
+                continue
+
+            self._image_dict[image_id] = image
+            self._image_to_annotations[image_id] = annotations
+            self._image_to_predictions[image_id] = _filter(dataset.image_to_predictions[image_id])
+            for annotation in annotations:
+                self._annotation_dict[annotation.annotation_id] = annotation
+                self._annotation_to_image[annotation.annotation_id] = image
+            for prediction in self._image_to_predictions[image_id]:
+                self._prediction_dict[prediction.annotation_id] = prediction
+                self._prediction_to_image[prediction.annotation_id] = image
+
+        if self._category_ids is None:  # unlabeled images have no category
+            for image_id, image in dataset.unlabeled_image_dict.items():
+                if image_ids is not None and image_id not in image_ids:
+                    continue
+                if self._predicate and not self._predicate(image, []):
+                    continue
+                self._unlabeled_image_dict[image_id] = image
+
+        for category in categories:
+            self._category_dict[category.category_id] = category
+            self._category_name_to_category[category.name] = category
+        self._set_category_registry(categories)
+        self._create_category_index()
+
+        self._selection_digest = hashlib.sha1(
+            repr(
+                (
+                    list(self._image_dict),
+                    list(self._unlabeled_image_dict),
+                    list(category_old2new.items()),
+                )
+            ).encode()
+        ).hexdigest()
+
+    def _get_export_source_signature(self) -> str:
+        signature = hashlib.sha1(super()._get_export_source_signature().encode())
+        signature.update(self._selection_digest.encode())
+        return signature.hexdigest()
+
+    # get
+    def get_dataset_info(self) -> DatasetInfo:
+        return DatasetInfo(
+            name=self.name,
+            task=self.task,
+            categories=[category.to_dict() for category in self.get_categories()],
+            created=self.created,
+            storage=self.storage,
+        )
+
+    def get_images(self, image_ids: list[int] = None, labeled: bool = True) -> list[Image]:
+        images = self._image_dict if labeled else self._unlabeled_image_dict
+        if not image_ids:
+            return [copy.copy(image) for image in images.values()]
+
+        missing_ids = [
+            image_id
+            for image_id in image_ids
+            if image_id not in self._image_dict and image_id not in self._unlabeled_image_dict
+        ]
+        if missing_ids:
+            raise ValueError(f"images {missing_ids} do not exist in {self}")
+        # like the storage, the labeled flag only applies when no ids are given
+        return [
+            copy.copy(self._image_dict.get(image_id) or self._unlabeled_image_dict[image_id])
+            for image_id in image_ids
+        ]
+
+    def get_categories(self, category_ids: list[int] = None) -> list[Category]:
+        if category_ids and not set(category_ids) <= self._get_category_registry().keys():
+            raise ValueError(f"categories {category_ids} do not exist in {self}")
+        return super().get_categories(category_ids)
+
+    def get_annotations(self, image_id: int = None) -> list[Annotation]:
+        annotations = (
+            self._image_to_annotations.get(image_id, [])
+            if image_id
+            else self._annotation_dict.values()
+        )
+        return [copy.copy(annotation) for annotation in annotations]
+
+    def get_predictions(self, image_id: int = None) -> list[Annotation]:
+        predictions = (
+            self._image_to_predictions.get(image_id, [])
+            if image_id
+            else self._prediction_dict.values()
+        )
+        return [copy.copy(prediction) for prediction in predictions]
+
+    # read only
+    def _read_only(self, *args, **kwargs):
+        raise ValueError(
+            "DatasetView is read only. Modify the dataset, or materialize() the view first."
+        )
+
+    add_images = _read_only
+    add_categories = _read_only
+    add_annotations = _read_only
+    add_predictions = _read_only
+    migrate_storage = _read_only
+    snapshot = _read_only
+    restore_snapshot = _read_only
+    save_dataset_info = _read_only
+
+    def view(self, *args, **kwargs):
+        raise ValueError("A view of a view is not supported. Filter the dataset at once.")
+
+    def close(self):
+        """Nothing to release: the view has no index cache, and the storage belongs to the dataset."""
+        pass
+
+    def delete(self):
+        """Delete the set files and exports of the view. The dataset is not touched."""
+        if self.dataset_dir.exists():
+            io.remove_directory(self.dataset_dir)
+
+    def materialize(
+        self,
+        name: str,
+        root_dir: str = None,
+        link_mode: Union[str, LinkMode] = LinkMode.HARDLINK,
+    ) -> Dataset:
+        """Write the view to disk as a new, independent dataset.
+        Raw images are linked (see link_file), and the split of the view is kept.
+
+        Args:
+            name (str): new dataset name.
+            root_dir (str, optional): new dataset root directory. Defaults to None.
+            link_mode (Union[str, LinkMode], optional): How to put raw images to the new dataset. Defaults to LinkMode.HARDLINK.
+
+        Raises:
+            FileExistsError: if the new dataset already exists.
+
+        Returns:
+            Dataset: new dataset
+        """
+        ds = Dataset.new(name=name, task=self.task, root_dir=root_dir, storage=self.storage)
+        try:
+            images = list(self._image_dict.values()) + list(self._unlabeled_image_dict.values())
+            for image in images:
+                link_file(
+                    self.raw_image_dir / image.file_name,
+                    ds.raw_image_dir / image.file_name,
+                    link_mode,
+                    create_directory=True,
+                )
+
+            with ds.batch():
+                ds.add_categories(self.get_categories())
+                ds.add_images(images)
+                ds.add_annotations(list(self._annotation_dict.values()))
+                ds.add_predictions(list(self._prediction_dict.values()))
+
+            if self.train_set_file.exists():
+                io.copy_files_to_directory(self.set_dir, ds.set_dir, create_directory=True)
+
+            ds.create_index()
+        except Exception as e:
+            ds.delete()
+            raise e
+
+        return ds
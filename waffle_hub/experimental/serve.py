@@ -64,7 +64,7 @@ async def predict(file: fastapi.UploadFile = fastapi.File(...)):
 
     logging.info(f"end inference")
 
-    return [res.to_dict() for res in result]
+    return result.to_dicts()
 
 
 if __name__ == "__main__":
@@ -284,8 +284,12 @@ class AutocareDLTHub(Hub):
         io.save_json(self.get_metrics(), self.metric_file)
 
     # Inference Hook
-    def get_model(self):
+    def get_model(self, top_k: int = None):
         """Get model.
+
+        Args:
+            top_k (int, optional): Not used, predictions are limited by the result parser. Defaults to None.
+
         Returns:
             ModelWrapper: Model wrapper
         """
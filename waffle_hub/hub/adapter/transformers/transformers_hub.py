@@ -279,7 +279,7 @@ class TransformersHub(Hub):
 
         return inner
 
-    def get_model(self) -> ModelWrapper:
+    def get_model(self, top_k: int = None) -> ModelWrapper:
         self.check_train_sanity()
 
         # get adapt functions
@@ -244,3 +244,6 @@ DEFAULT_PARAMS = {
         }
     },
 }
+
+# number of candidates (by confidence) per image whose masks are assembled before nms
+DEFAULT_TOP_K = 100
@@ -22,7 +22,7 @@ from waffle_hub.schema.configs import TrainConfig
 from waffle_hub.utils.callback import TrainCallback
 from waffle_hub.utils.process import run_python_file
 
-from .config import DEFAULT_PARAMS, MODEL_TYPES, TASK_MAP
+from .config import DEFAULT_PARAMS, DEFAULT_TOP_K, MODEL_TYPES, TASK_MAP
 
 logger = logging.getLogger(__name__)
 
@@ -141,6 +141,7 @@ class UltralyticsHub(Hub):
     def get_postprocess(self, *args, **kwargs):
 
         id_mapper: list[int] = kwargs.get("id_mapper", [i for i in range(len(self.categories))])
+        top_k: int = kwargs.get("top_k") or DEFAULT_TOP_K
 
         if self.task == TaskType.CLASSIFICATION:
 
@@ -178,8 +179,8 @@ class UltralyticsHub(Hub):
                 probs = preds[:, :, 4 : 4 + num_category]
                 confidences, class_ids = torch.max(probs, dim=-1)
                 _, indicies = torch.topk(
-                    confidences, k=min(100, confidences.shape[-1]), dim=-1, largest=True
-                )  # TODO: make k configurable
+                    confidences, k=min(top_k, confidences.shape[-1]), dim=-1, largest=True
+                )
 
                 preds = torch.gather(preds, 1, indicies.unsqueeze(-1).repeat(1, 1, preds.shape[-1]))
                 confidences = torch.gather(confidences, 1, indicies)
@@ -335,8 +336,13 @@ class UltralyticsHub(Hub):
         io.save_json(self.get_metrics(), self.metric_file)
 
     # Inference Hook
-    def get_model(self):
+    def get_model(self, top_k: int = None):
         """Get model.
+
+        Args:
+            top_k (int, optional): number of candidates per image kept by the segmentation postprocess
+                (masks are only assembled for them). Defaults to None (DEFAULT_TOP_K).
+
         Returns:
             ModelWrapper: Model wrapper
         """
@@ -360,7 +366,7 @@ class UltralyticsHub(Hub):
             id_mapper[i] = yolo_names_inv[name]
 
         preprocess = self.get_preprocess()
-        postprocess = self.get_postprocess(id_mapper=id_mapper)
+        postprocess = self.get_postprocess(id_mapper=id_mapper, top_k=top_k)
 
         # wrap model
         model = ModelWrapper(
@@ -15,7 +15,7 @@ import time
 import warnings
 from functools import cached_property
 from pathlib import Path, PurePath
-from typing import Union
+from typing import Iterator, Union
 
 import cpuinfo
 import cv2
@@ -27,8 +27,21 @@ from waffle_utils.image.io import save_image
 from waffle_utils.utils import type_validator
 from waffle_utils.video.io import create_video_writer
 
-from waffle_hub import BACKEND_MAP, EXPORT_MAP, TaskType
+from waffle_hub import (
+    BACKEND_MAP,
+    EXPORT_MAP,
+    InferenceEngine,
+    Precision,
+    PredictionFormat,
+    TaskType,
+)
 from waffle_hub.dataset import Dataset
+from waffle_hub.hub.model.runtime import (
+    OnnxRuntimeModel,
+    TorchRuntimeModel,
+    check_precision,
+    get_max_abs_diff,
+)
 from waffle_hub.hub.model.wrapper import get_parser
 from waffle_hub.schema.configs import (
     EvaluateConfig,
@@ -38,7 +51,7 @@ from waffle_hub.schema.configs import (
     TrainConfig,
 )
 from waffle_hub.schema.data import ImageInfo
-from waffle_hub.schema.fields import Category
+from waffle_hub.schema.fields import Annotation, Category
 from waffle_hub.schema.result import (
     EvaluateResult,
     ExportOnnxResult,
@@ -60,11 +73,24 @@ from waffle_hub.utils.data import (
 )
 from waffle_hub.utils.draw import draw_results
 from waffle_hub.utils.evaluate import evaluate_function
+from waffle_hub.utils.journal import ProgressJournal
 from waffle_hub.utils.memory import device_context
 from waffle_hub.utils.metric_logger import MetricLogger
+from waffle_hub.utils.pipeline import DEFAULT_PIPELINE_WORKERS, Pipeline
+from waffle_hub.utils.prediction import (
+    PREDICTION_FILE_NAMES,
+    JsonlPredictionWriter,
+    PredictionReader,
+    get_prediction_files,
+    get_prediction_writer,
+    iter_predictions,
+)
 
 logger = logging.getLogger(__name__)
 
+# config values that do not change the outputs of an evaluation or inference
+_RESUME_IGNORED_CONFIG_KEYS = ["device", "workers", "postprocess_workers", "show", "resume"]
+
 
 class Hub:
     # Hub Spec. must have
@@ -98,9 +124,12 @@ class Hub:
 
     # evaluate results
     EVALUATE_FILE = "evaluate.json"
+    EVALUATE_PREDICTION_FILE = "evaluate_predictions.jsonl"  # cache of a resumable evaluation
+    EVALUATE_PROGRESS_FILE = "evaluate_progress.jsonl"
 
     # inference results
     INFERENCE_FILE = "inferences.json"
+    INFERENCE_PROGRESS_FILE = "progress.jsonl"
 
     # export results
     ONNX_FILE = "weights/model.onnx"
@@ -654,6 +683,21 @@ class Hub:
         """Evaluate Json File"""
         return self.hub_dir / Hub.EVALUATE_FILE
 
+    @cached_property
+    def evaluate_prediction_file(self) -> Path:
+        """Evaluate Predictions Jsonl File (resumable evaluation)"""
+        return self.hub_dir / Hub.EVALUATE_PREDICTION_FILE
+
+    @cached_property
+    def evaluate_progress_file(self) -> Path:
+        """Evaluate Progress Journal File (resumable evaluation)"""
+        return self.hub_dir / Hub.EVALUATE_PROGRESS_FILE
+
+    @cached_property
+    def inference_progress_file(self) -> Path:
+        """Inference Progress Journal File (resumable inference)"""
+        return self.inference_dir / Hub.INFERENCE_PROGRESS_FILE
+
     @cached_property
     def waffle_file(self) -> Path:
         """Export Waffle file"""
@@ -789,26 +833,48 @@ class Hub:
             return []
         return io.load_json(self.evaluate_file)
 
+    def get_inference_file(self) -> Path:
+        """Get the prediction file of the last inference (json, jsonl, coco or parquet, see inference output_format).
+
+        Returns:
+            Path: prediction file. None if there is no inference result.
+        """
+        files = get_prediction_files(self.inference_dir)
+        return files[0] if files else None
+
     def get_inference_result(self) -> list[dict]:
-        """Get inference result from inference file.
+        """Get inference result from inference file. Every prediction is loaded, use iter_inference_result for large results.
 
         Example:
             >>> hub.get_inference_result()
             [
                 {
-                    "id": "00000001",
-                    "category": "person",
-                    "bbox": [0.1, 0.2, 0.3, 0.4],
-                    "score": 0.9,
+                    "relative/path/to/image/file": [
+                        {"category_id": 1, "bbox": [0.1, 0.2, 0.3, 0.4], "score": 0.9},
+                    ]
                 },
             ]
 
         Returns:
             list[dict]: inference result
         """
-        if not self.inference_file.exists():
-            return []
-        return io.load_json(self.inference_file)
+        return list(self.iter_inference_result())
+
+    def iter_inference_result(self) -> Iterator[dict]:
+        """Iterate the inference result one image at a time, without loading the whole inference file.
+
+        Example:
+            >>> for prediction in hub.iter_inference_result():
+            ...     print(prediction)
+            {"relative/path/to/image/file": [{"category_id": 1, "bbox": [0.1, 0.2, 0.3, 0.4], "score": 0.9}]}
+
+        Yields:
+            Iterator[dict]: {image relative path: [annotation dict, ...]}
+        """
+        inference_file = self.get_inference_file()
+        if inference_file is None:
+            return
+        yield from iter_predictions(inference_file)
 
     # Hub Utils
     def get_image_loader(self) -> tuple[torch.Tensor, ImageInfo]:
@@ -924,7 +990,7 @@ class Hub:
         """Start Train
 
         Args:
-            dataset (Union[Dataset, str]): Waffle Dataset object or path or name.
+            dataset (Union[Dataset, str]): Waffle Dataset object (or DatasetView) or path or name.
             dataset_root_dir (str, optional): Waffle Dataset root directory. Defaults to None.
             epochs (int, optional): number of epochs. None to use default. Defaults to None.
             batch_size (int, optional): batch size. None to use default. Defaults to None.
@@ -1035,9 +1101,9 @@ class Hub:
                 + f"Dataset categories: {dataset.get_category_names()}, Hub categories: {self.get_category_names()}"
             )
 
-        ## convert dataset to backend format if not exist
+        ## convert dataset to backend format if not exist or outdated (updated incrementally)
         export_dir = dataset.export_dir / EXPORT_MAP[self.backend.upper()]
-        if not export_dir.exists():
+        if not export_dir.exists() or dataset.is_export_outdated(self.backend):
             logger.info(f"[Dataset] Exporting dataset to {self.backend} format...")
             export_dir = dataset.export(self.backend)
             logger.info("[Dataset] Exporting done.")
@@ -1112,9 +1178,68 @@ class Hub:
         return result
 
     # Evaluation Hook
-    def get_model(self):
+    def get_model(self, top_k: int = None):
         raise NotImplementedError
 
+    def _get_engine_model(
+        self,
+        engine: Union[str, InferenceEngine],
+        device: str,
+        top_k: int = None,
+        precision: Union[str, Precision] = None,
+        channels_last: bool = False,
+    ) -> Union[TorchRuntimeModel, OnnxRuntimeModel]:
+        """Get the model run by an inference engine: the ModelWrapper (torch) or an onnxruntime session
+        of the exported onnx model. Both take the same inputs and give the same outputs to the result parsers.
+        """
+        if engine == InferenceEngine.ONNXRUNTIME:
+            return OnnxRuntimeModel(self.onnx_file, device=device)
+        return TorchRuntimeModel(
+            self.get_model(top_k=top_k),
+            device=device,
+            precision=precision,
+            channels_last=channels_last,
+        )
+
+    @staticmethod
+    def _check_engine(engine: Union[str, InferenceEngine], precision: Union[str, Precision] = None):
+        if engine not in list(InferenceEngine):
+            raise ValueError(f"Invalid engine: {engine}. Available engines: {list(InferenceEngine)}")
+        if engine == InferenceEngine.ONNXRUNTIME and precision not in [None, Precision.FP32]:
+            raise ValueError(
+                "The precision of onnxruntime is set by the onnx export. Use export_onnx(half=True)."
+            )
+
+    def _get_progress_journal(
+        self,
+        journal_file: Path,
+        output_file: Path,
+        cfg: Union[EvaluateConfig, InferenceConfig],
+        total: int,
+    ) -> tuple[ProgressJournal, dict]:
+        """Get the progress journal of a resumable evaluation or inference, and the checkpoint to resume from.
+        A journal is resumed only if it is of the same config, number of images and weights, and its output exists.
+
+        Returns:
+            tuple[ProgressJournal, dict]: journal (None if cfg.resume is False) and checkpoint (None to start over).
+        """
+        if not cfg.resume:
+            if journal_file.exists():
+                journal_file.unlink()  # outputs are written again, the journal does not match them anymore
+            return None, None
+
+        config = {k: v for k, v in cfg.to_dict().items() if k not in _RESUME_IGNORED_CONFIG_KEYS}
+        config["weights"] = {
+            file.name: file.stat().st_mtime
+            for file in [self.best_ckpt_file, self.onnx_file]
+            if file.exists()
+        }
+        journal = ProgressJournal(journal_file, config, total)
+        checkpoint = journal.load()
+        if checkpoint is not None and not output_file.exists():
+            checkpoint = None
+        return journal, checkpoint
+
     def before_evaluate(self, cfg: EvaluateConfig, dataset: Dataset):
         if len(dataset.get_split_ids()[2]) == 0:
             cfg.set_name = "val"
@@ -1126,32 +1251,70 @@ class Hub:
     def evaluating(self, cfg: EvaluateConfig, callback: EvaluateCallback, dataset: Dataset) -> str:
         device = cfg.device
 
-        model = self.get_model().to(device)
+        model = self._get_engine_model(
+            cfg.engine, device, cfg.top_k, cfg.precision, cfg.channels_last
+        )
 
-        dataset = Dataset.load(cfg.dataset_name, cfg.dataset_root_dir)
-        dataloader = get_dataset_class("dataset")(
+        if dataset is None:
+            dataset = Dataset.load(cfg.dataset_name, cfg.dataset_root_dir)
+        labeled_dataset = get_dataset_class("dataset")(
             dataset,
             cfg.image_size,
             letter_box=cfg.letter_box,
             set_name=cfg.set_name,
-        ).get_dataloader(cfg.batch_size, cfg.workers)
+            cache=cfg.cache,
+        )
+
+        preds = []
+        labels = []
+        journal, checkpoint = self._get_progress_journal(
+            self.evaluate_progress_file, self.evaluate_prediction_file, cfg, len(labeled_dataset)
+        )
+        if checkpoint is not None:
+            # predictions of the images done before are read back from the cache
+            for _, prediction in zip(
+                range(checkpoint["done"]), iter_predictions(self.evaluate_prediction_file)
+            ):
+                annotations = next(iter(prediction.values()))
+                preds.append([Annotation.from_trusted_dict(a, task=self.task) for a in annotations])
+            labels = [labeled_dataset.get_annotations(i) for i in range(len(preds))]
+
+        dataloader = labeled_dataset.get_dataloader(cfg.batch_size, cfg.workers, start=len(preds))
+        prediction_writer = None
+        if journal is not None:
+            journal.open(resume=checkpoint is not None)
+            prediction_writer = JsonlPredictionWriter(
+                self.evaluate_prediction_file, checkpoint["writer"] if checkpoint else None
+            )
 
         result_parser = get_parser(self.task)(**cfg.to_dict(), categories=self.categories)
 
         callback._total_steps = len(dataloader) + 1
 
-        preds = []
-        labels = []
-        for i, (images, image_infos, annotations) in tqdm.tqdm(
-            enumerate(dataloader, start=1), total=len(dataloader)
-        ):
-            result_batch = model(images.to(device))
-            result_batch = result_parser(result_batch, image_infos)
-
-            preds.extend(result_batch)
-            labels.extend(annotations)
+        try:
+            for i, (images, image_infos, annotations) in tqdm.tqdm(
+                enumerate(dataloader, start=1), total=len(dataloader)
+            ):
+                result_batch = model(images)
+                result_batch = result_parser(result_batch, image_infos)
+
+                preds.extend(result_batch)
+                labels.extend(annotations)
+
+                if journal is not None:
+                    prediction_writer.write(
+                        [
+                            {str(image_info.image_rel_path): result.to_dicts()}
+                            for result, image_info in zip(result_batch, image_infos)
+                        ]
+                    )
+                    journal.checkpoint(len(preds), writer=prediction_writer.get_state())
 
-            callback.update(i)
+                callback.update(i)
+        finally:
+            if journal is not None:
+                prediction_writer.close()
+                journal.close()
 
         metrics = evaluate_function(preds, labels, self.task, len(self.categories))
 
@@ -1191,22 +1354,38 @@ class Hub:
         device: str = "0",
         draw: bool = False,
         hold: bool = True,
+        cache: bool = False,
+        top_k: int = None,
+        engine: str = "torch",
+        precision: str = None,
+        channels_last: bool = False,
+        resume: bool = False,
     ) -> EvaluateResult:
         """Start Evaluate
 
         Args:
-            dataset (Union[Dataset, str]): Waffle Dataset object or path or name.
+            dataset (Union[Dataset, str]): Waffle Dataset object (or DatasetView) or path or name.
             dataset_root_dir (str, optional): Waffle Dataset root directory. Defaults to None.
             batch_size (int, optional): batch size. Defaults to 4.
             image_size (Union[int, list[int]], optional): image size. Defaults to None.
             letter_box (bool, optional): letter box. Defaults to None.
             confidence_threshold (float, optional): confidence threshold. Defaults to 0.25.
             iou_threshold (float, optional): iou threshold. Defaults to 0.5.
-            half (bool, optional): half. Defaults to False.
+            half (bool, optional): half. Same as precision="fp16". Defaults to False.
             workers (int, optional): workers. Defaults to 2.
             device (str, optional): device. Defaults to "0".
             draw (bool, optional): draw. Defaults to False.
             hold (bool, optional): hold. Defaults to True.
+            cache (bool, optional): read pre-resized images from a memory-mapped cache of the dataset split
+                (created by the first evaluation), instead of decoding and resizing every image. Defaults to False.
+            top_k (int, optional): maximum number of predictions per image, by score. Defaults to None (no limit).
+            engine (str, optional): inference engine, "torch" or "onnxruntime" (runs the model exported by
+                export_onnx, with the image size of the export). Defaults to "torch".
+            precision (str, optional): "fp32", "fp16" (cuda only) or "bf16" (cuda and cpu) autocast.
+                Defaults to None ("fp16" if half else "fp32").
+            channels_last (bool, optional): run the model in channels last (NHWC) memory format. Defaults to False.
+            resume (bool, optional): cache the predictions of every image and the progress in the hub directory,
+                and continue an interrupted evaluation of the same config instead of starting over. Defaults to False.
 
         Raises:
             FileNotFoundError: if can not detect appropriate dataset.
@@ -1257,6 +1436,11 @@ class Hub:
             warnings.warn("multi-gpu is not supported in evaluation. use first gpu only.")
             device = device.split(",")[0]
 
+        precision = precision or ("fp16" if half else "fp32")
+        self._check_engine(engine, precision)
+        if engine == InferenceEngine.TORCH:
+            check_precision(precision, "cpu" if device == "cpu" else f"cuda:{device}")
+
         if isinstance(dataset, (str, Path)):
             if Path(dataset).exists():
                 dataset = Path(dataset)
@@ -1288,6 +1472,12 @@ class Hub:
             device="cpu" if device == "cpu" else f"cuda:{device}",
             draw=draw,
             dataset_root_dir=dataset.root_dir,
+            cache=cache,
+            top_k=top_k,
+            engine=engine,
+            precision=precision,
+            channels_last=channels_last,
+            resume=resume,
         )
 
         callback = EvaluateCallback(100)  # dummy step
@@ -1312,54 +1502,71 @@ class Hub:
 
     def inferencing(self, cfg: InferenceConfig, callback: InferenceCallback) -> str:
         device = cfg.device
-        model = self.get_model().to(device)
+        model = self._get_engine_model(
+            cfg.engine, device, cfg.top_k, cfg.precision, cfg.channels_last
+        )
         result_parser = get_parser(self.task)(**cfg.to_dict(), categories=self.categories)
 
         if cfg.source_type == "image":
             dataset = get_dataset_class(cfg.source_type)(
                 cfg.source, cfg.image_size, letter_box=cfg.letter_box, recursive=cfg.recursive
             )
-            dataloader = dataset.get_dataloader(cfg.batch_size, cfg.workers)
         elif cfg.source_type == "video":
             dataset = get_dataset_class(cfg.source_type)(
                 cfg.source, cfg.image_size, letter_box=cfg.letter_box
             )
-            dataloader = dataset.get_dataloader(cfg.batch_size, cfg.workers)
         else:
             raise ValueError(f"Invalid source type: {cfg.source_type}")
 
-        if cfg.draw and cfg.source_type == "video":
-            writer = None
+        journal, checkpoint = self._get_progress_journal(
+            self.inference_progress_file,
+            self.inference_dir / PREDICTION_FILE_NAMES[PredictionFormat[cfg.output_format.upper()]],
+            cfg,
+            len(dataset),
+        )
+        if checkpoint is not None and cfg.draw and cfg.source_type == "video":
+            warnings.warn("A drawn video can not be resumed. Inference starts over.")
+            checkpoint = None
+        done = checkpoint["done"] if checkpoint else 0
+
+        if checkpoint is None:
+            # predictions of a previous inference (possibly in another format) are replaced
+            for inference_file in get_prediction_files(self.inference_dir):
+                inference_file.unlink()
+        prediction_writer = get_prediction_writer(
+            cfg.output_format, self.inference_dir, checkpoint["writer"] if checkpoint else None
+        )
+        if journal is not None:
+            journal.open(resume=checkpoint is not None)
+
+        dataloader = dataset.get_dataloader(
+            cfg.batch_size,
+            cfg.workers,
+            pin_memory=device != "cpu" and cfg.engine == InferenceEngine.TORCH,
+            persistent_workers=True,
+            prefetch_factor=4,
+            start=done,
+        )
 
-        results = []
-        callback._total_steps = len(dataloader) + 1
-        for i, (images, image_infos) in tqdm.tqdm(
-            enumerate(dataloader, start=1), total=len(dataloader)
-        ):
-            result_batch = model(images.to(device))
-            result_batch = result_parser(result_batch, image_infos)
-            for result, image_info in zip(result_batch, image_infos):
+        names = [x["name"] for x in self.categories]
 
-                results.append({str(image_info.image_rel_path): [res.to_dict() for res in result]})
+        def _predict(batch):
+            images, image_infos = batch
+            return model(images), image_infos
 
-                if cfg.draw:
-                    io.make_directory(self.draw_dir)
-                    draw = draw_results(
-                        image_info.ori_image,
-                        result,
-                        names=[x["name"] for x in self.categories],
-                    )
+        def _postprocess(batch):
+            result_batch, image_infos = batch
+            return result_parser(result_batch, image_infos), image_infos
 
+        def _write(batch):
+            result_batch, image_infos = batch
+            outputs = []
+            for result, image_info in zip(result_batch, image_infos):
+                draw = None
+                if cfg.draw or cfg.show:
+                    draw = draw_results(image_info.ori_image, result, names=names)
+                if cfg.draw:
                     if cfg.source_type == "video":
-                        if writer is None:
-                            h, w = draw.shape[:2]
-                            writer = create_video_writer(
-                                str(self.inference_dir / Path(cfg.source).with_suffix(".mp4").name),
-                                dataset.fps,
-                                (w, h),
-                            )
-                        writer.write(draw)
-
                         draw_path = (
                             self.draw_dir
                             / Path(cfg.source).stem
@@ -1370,36 +1577,75 @@ class Hub:
                             ".png"
                         )
                     save_image(draw_path, draw, create_directory=True)
+                outputs.append(({str(image_info.image_rel_path): result.to_dicts()}, draw))
+            return outputs
 
-                if cfg.show:
-                    if not cfg.draw:
-                        draw = draw_results(
-                            image_info.ori_image,
-                            result,
-                            names=[x["name"] for x in self.categories],
-                        )
-                    cv2.imshow("result", draw)
-                    cv2.waitKey(1)
+        # load -> model -> postprocess -> write (draw) run concurrently, results come out in order
+        postprocess_workers = cfg.postprocess_workers or DEFAULT_PIPELINE_WORKERS
+        pipeline = Pipeline(
+            dataloader,
+            [
+                ("model", _predict, 1),
+                ("postprocess", _postprocess, postprocess_workers),
+                ("write", _write, postprocess_workers),
+            ],
+        )
+        callback.set_pipeline(pipeline)
+
+        if cfg.draw:
+            io.make_directory(self.draw_dir)
+        video_writer = None
+
+        callback._total_steps = len(dataloader) + 1
+        try:
+            for i, outputs in tqdm.tqdm(enumerate(pipeline, start=1), total=len(dataloader)):
+                # predictions are written in order and flushed batch by batch
+                prediction_writer.write([prediction for prediction, _ in outputs])
+                done += len(outputs)
+                if journal is not None:
+                    journal.checkpoint(done, writer=prediction_writer.get_state())
+
+                # frames are written to the video in order, and windows are shown from this thread only
+                for _, draw in outputs:
+                    if cfg.draw and cfg.source_type == "video":
+                        if video_writer is None:
+                            h, w = draw.shape[:2]
+                            video_writer = create_video_writer(
+                                str(self.inference_dir / Path(cfg.source).with_suffix(".mp4").name),
+                                dataset.fps,
+                                (w, h),
+                            )
+                        video_writer.write(draw)
 
-            callback.update(i)
+                    if cfg.show:
+                        cv2.imshow("result", draw)
+                        cv2.waitKey(1)
 
-        if cfg.draw and cfg.source_type == "video":
-            writer.release()
+                callback.update(i)
+        finally:
+            prediction_writer.close()
+            if journal is not None:
+                journal.close()
+            if video_writer is not None:
+                video_writer.release()
 
         if cfg.show:
             cv2.destroyAllWindows()
 
-        io.save_json(
-            results,
-            self.inference_file,
-            create_directory=True,
-        )
+        for stats in pipeline.get_stats():
+            logger.info(
+                f"{stats['name']:<12} {stats['throughput']:8.2f} batch/s  "
+                f"utilization {stats['utilization']:.2f}  "
+                f"queue depth {stats['mean_queue_depth']:.1f} (max {stats['max_queue_depth']})"
+            )
+        logger.info(f"inference bottleneck: {pipeline.get_bottleneck()}")
 
     def on_inference_end(self, cfg: InferenceConfig):
         pass
 
     def after_inference(self, cfg: InferenceConfig, result: EvaluateResult):
-        result.predictions = self.get_inference_result()
+        inference_file = self.get_inference_file()
+        result.predictions = PredictionReader(inference_file) if inference_file else []
         if cfg.draw:
             result.draw_dir = self.draw_dir
 
@@ -1418,6 +1664,14 @@ class Hub:
         draw: bool = False,
         show: bool = False,
         hold: bool = True,
+        top_k: int = None,
+        mask_format: str = "polygon",
+        engine: str = "torch",
+        precision: str = None,
+        channels_last: bool = False,
+        postprocess_workers: int = None,
+        output_format: str = "json",
+        resume: bool = False,
     ) -> InferenceResult:
         """Start Inference
 
@@ -1429,13 +1683,28 @@ class Hub:
             batch_size (int, optional): batch size. Defaults to 4.
             confidence_threshold (float, optional): confidence threshold. Defaults to 0.25.
             iou_threshold (float, optional): iou threshold. Defaults to 0.5.
-            half (bool, optional): half. Defaults to False.
+            half (bool, optional): half. Same as precision="fp16". Defaults to False.
             workers (int, optional): workers. Defaults to 2.
             device (str, optional): device. "cpu" or "gpu_id". Defaults to "0".
             draw (bool, optional): draw. Defaults to False.
             show (bool, optional): show. Defaults to False.
             hold (bool, optional): hold. Defaults to True.
-
+            top_k (int, optional): maximum number of predictions per image, by score. Defaults to None (no limit).
+            mask_format (str, optional): segmentation format of instance segmentation predictions,
+                "polygon" or "rle" (compressed coco RLE). Defaults to "polygon".
+            engine (str, optional): inference engine, "torch" or "onnxruntime" (runs the model exported by
+                export_onnx, with the image size of the export). Defaults to "torch".
+            precision (str, optional): "fp32", "fp16" (cuda only) or "bf16" (cuda and cpu) autocast.
+                Defaults to None ("fp16" if half else "fp32").
+            channels_last (bool, optional): run the model in channels last (NHWC) memory format. Defaults to False.
+            postprocess_workers (int, optional): threads parsing and drawing predictions while the model runs
+                on the next batches. Defaults to None (up to 4).
+            output_format (str, optional): format of the prediction file written batch by batch in the inference directory,
+                "json" (inferences.json), "jsonl" (inferences.jsonl), "coco" (coco results, inferences.coco.json)
+                or "parquet" (inferences.parquet, needs pyarrow). Defaults to "json".
+            resume (bool, optional): record the progress in a journal next to the predictions, keep them if the inference fails,
+                and continue an interrupted inference of the same config instead of starting over.
+                Not supported with "parquet". Defaults to False.
 
         Raises:
             FileNotFoundError: if can not detect appropriate dataset.
@@ -1460,7 +1729,7 @@ class Hub:
                     letterbox=None,  # use train option
                     ...
                 )
-            >>> inference_result.predictions
+            >>> inference_result.predictions  # read lazily from the prediction file
             [{"relative/path/to/image/file": [{"category": "1", "bbox": [0, 0, 100, 100], "score": 0.9}, ...]}, ...]
 
         Returns:
@@ -1475,14 +1744,31 @@ class Hub:
                 self.inferencing(cfg, callback)
                 self.on_inference_end(cfg)
                 self.after_inference(cfg, result)
+                result.stage_stats = callback.get_stage_stats()
                 callback.force_finish()
             except Exception as e:
-                if self.inference_dir.exists():
+                if cfg.resume:
+                    logger.warning(
+                        f"Inference failed after the progress in {self.inference_progress_file}. "
+                        "Run it again with resume=True to continue."
+                    )
+                elif self.inference_dir.exists():
                     io.remove_directory(self.inference_dir)
                 callback.force_finish()
                 callback.set_failed()
                 raise e
 
+        precision = precision or ("fp16" if half else "fp32")
+        self._check_engine(engine, precision)
+        if engine == InferenceEngine.TORCH:
+            check_precision(precision, "cpu" if device == "cpu" else f"cuda:{device}")
+        if output_format not in list(PredictionFormat):
+            raise ValueError(
+                f"Invalid output format: {output_format}. Available formats: {list(PredictionFormat)}"
+            )
+        if resume and output_format == PredictionFormat.PARQUET:
+            raise ValueError("parquet predictions can not be resumed. Use json, jsonl or coco.")
+
         # image_dir, image_path, video_path, dataset_name, dataset
         if isinstance(source, (str, Path)):
             if Path(source).exists():
@@ -1530,6 +1816,14 @@ class Hub:
             device="cpu" if device == "cpu" else f"cuda:{device}",
             draw=draw or show,
             show=show,
+            top_k=top_k,
+            mask_format=mask_format,
+            engine=engine,
+            precision=precision,
+            channels_last=channels_last,
+            postprocess_workers=postprocess_workers,
+            output_format=output_format,
+            resume=resume,
         )
 
         callback = InferenceCallback(100)  # dummy step
@@ -1681,6 +1975,9 @@ class Hub:
         device: str = "0",
         half: bool = False,
         trial: int = 100,
+        engine: str = "torch",
+        precision: str = None,
+        channels_last: bool = False,
     ) -> dict:
         """Benchmark Model
 
@@ -1688,8 +1985,14 @@ class Hub:
             image_size (Union[int, list[int]], optional): inference image size. None for same with train_config (recommended).
             batch_size (int, optional): dynamic batch size. Defaults to 16.
             device (str, optional): device. "cpu" or "gpu_id". Defaults to "0".
-            half (bool, optional): half. Defaults to False.
+            half (bool, optional): half. Same as precision="fp16". Defaults to False.
             trial (int, optional): number of trials. Defaults to 100.
+            engine (str, optional): inference engine, "torch" or "onnxruntime" (runs the model exported by
+                export_onnx, its precision is the one of the export). Defaults to "torch".
+            precision (str, optional): "fp32", "fp16" (cuda only) or "bf16" (cuda and cpu) autocast.
+                The maximum absolute difference of the outputs against fp32 is reported as "max_abs_diff".
+                Defaults to None ("fp16" if half else "fp32").
+            channels_last (bool, optional): run the model in channels last (NHWC) memory format. Defaults to False.
 
         Example:
             >>> hub.benchmark(
@@ -1704,6 +2007,9 @@ class Hub:
                 "fps": 123.123,
                 "image_size": [640, 640],
                 "batch_size": 16,
+                "precision": "fp32",
+                "max_abs_diff": 0.0,
+                "engine": "torch",
                 "device": "0",
                 "cpu_name": "Intel(R) Core(TM) i7-8700 CPU @ 3.20GHz",
                 "gpu_name": "GeForce GTX 1080 Ti",
@@ -1713,30 +2019,39 @@ class Hub:
             dict: benchmark result
         """
         self.check_train_sanity()
-
-        if half and (not torch.cuda.is_available() or device == "cpu"):
-            raise RuntimeError("half is not supported in cpu")
+        self._check_engine(engine, "fp16" if half else precision)
 
         image_size = image_size or self.get_train_config().image_size
         image_size = [image_size, image_size] if isinstance(image_size, int) else image_size
 
         device = "cpu" if device == "cpu" else f"cuda:{device}"
+        # created on the device once, so that the timed calls do not copy it from the host
+        dummy_input = torch.randn(batch_size, 3, *image_size, dtype=torch.float32, device=device)
 
-        model = self.get_model()
-        model = model.to(device) if not half else model.half().to(device)
+        max_abs_diff = None
+        if engine == InferenceEngine.ONNXRUNTIME:
+            model = self._get_engine_model(engine, device)
+            precision = model.precision
+        else:
+            precision = precision or ("fp16" if half else "fp32")
+            check_precision(precision, device)
+            model = self._get_engine_model(
+                engine, device, precision=precision, channels_last=channels_last
+            )
 
-        dummy_input = torch.randn(
-            batch_size, 3, *image_size, dtype=torch.float32 if not half else torch.float16
-        )
-        dummy_input = dummy_input.to(device)
+            # numerical tolerance of the reduced precision, against the same weights in fp32
+            max_abs_diff = 0.0
+            if precision != Precision.FP32:
+                reference = TorchRuntimeModel(model.model, device=device)(dummy_input)
+                max_abs_diff = get_max_abs_diff(model(dummy_input), reference)
 
-        model.eval()
-        with torch.no_grad():
-            start = time.time()
-            for _ in tqdm.tqdm(range(trial)):
-                model(dummy_input)
-            end = time.time()
-            inference_time = end - start
+        start = time.time()
+        for _ in tqdm.tqdm(range(trial)):
+            model(dummy_input)
+        if device != "cpu":
+            torch.cuda.synchronize(device)
+        end = time.time()
+        inference_time = end - start
 
         del model
 
@@ -1746,7 +2061,9 @@ class Hub:
             "fps": trial * batch_size / inference_time,
             "image_size": image_size,
             "batch_size": batch_size,
-            "precision": "fp16" if half else "fp32",
+            "precision": str(precision).lower(),
+            "max_abs_diff": max_abs_diff,
+            "engine": str(engine).lower(),
             "device": device,
             "cpu_name": cpuinfo.get_cpu_info()["brand_raw"],
             "gpu_name": torch.cuda.get_device_name(0) if device != "cpu" else None,
@@ -0,0 +1,202 @@
+import contextlib
+import logging
+import os
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import onnxruntime as ort
+import torch
+
+from waffle_hub import Precision
+
+logger = logging.getLogger(__name__)
+
+_PRECISION_TO_DTYPE = {
+    Precision.FP32: torch.float32,
+    Precision.FP16: torch.float16,
+    Precision.BF16: torch.bfloat16,
+}
+
+_ORT_TO_NUMPY_DTYPE = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+}
+
+
+def _get_providers(device: str) -> list:
+    available = ort.get_available_providers()
+    if device == "cpu" or "CUDAExecutionProvider" not in available:
+        if device != "cpu":
+            logger.warning(
+                f"CUDAExecutionProvider is not available in onnxruntime. {device} falls back to cpu."
+            )
+        return ["CPUExecutionProvider"]
+
+    device_id = int(device.split(":")[-1]) if ":" in device else 0
+    return [("CUDAExecutionProvider", {"device_id": device_id}), "CPUExecutionProvider"]
+
+
+class OnnxRuntimeModel:
+    """Run an exported onnx model (see Hub.export_onnx) with onnxruntime.
+    It is called like the ModelWrapper it was exported from: a [batch, channel, height, width] (0~1) tensor in,
+    the postprocessed output tensors out, so the result parsers are shared by both engines.
+
+    Args:
+        onnx_file (Union[str, Path]): onnx model file.
+        device (str, optional): "cpu" or "cuda:{gpu_id}" (needs onnxruntime-gpu). Defaults to "cpu".
+        intra_op_num_threads (int, optional): threads running an operator. Defaults to None (number of cpus).
+        inter_op_num_threads (int, optional): threads running independent operators in parallel.
+            Defaults to None (1, operators run one by one, each on every intra-op thread).
+        graph_optimization_level (ort.GraphOptimizationLevel, optional): graph optimizations (constant folding,
+            node fusions, layout optimizations) applied when the session is created. Defaults to ORT_ENABLE_ALL.
+
+    Raises:
+        FileNotFoundError: if the onnx file does not exist.
+    """
+
+    def __init__(
+        self,
+        onnx_file: Union[str, Path],
+        device: str = "cpu",
+        intra_op_num_threads: int = None,
+        inter_op_num_threads: int = None,
+        graph_optimization_level: ort.GraphOptimizationLevel = ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    ):
+        self.onnx_file = Path(onnx_file)
+        if not self.onnx_file.exists():
+            raise FileNotFoundError(
+                f"{self.onnx_file} does not exist. Export it with export_onnx first."
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = graph_optimization_level
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_num_threads or os.cpu_count() or 1
+        options.inter_op_num_threads = inter_op_num_threads or 1
+
+        self.device = device
+        self.session = ort.InferenceSession(
+            str(self.onnx_file), sess_options=options, providers=_get_providers(device)
+        )
+
+        input_meta = self.session.get_inputs()[0]
+        self.input_name = input_meta.name
+        self.input_shape = input_meta.shape  # [batch, channel, height, width], batch is dynamic
+        self.input_dtype = _ORT_TO_NUMPY_DTYPE.get(input_meta.type, np.float32)
+        self.output_names = [output.name for output in self.session.get_outputs()]
+
+    def __repr__(self):
+        return (
+            f"OnnxRuntimeModel(onnx_file={self.onnx_file}, providers={self.session.get_providers()})"
+        )
+
+    @property
+    def precision(self) -> str:
+        return "fp16" if self.input_dtype == np.float16 else "fp32"
+
+    def to(self, device: str) -> "OnnxRuntimeModel":
+        """The device is fixed when the session is created. Kept for the ModelWrapper interface."""
+        return self
+
+    def eval(self) -> "OnnxRuntimeModel":
+        return self
+
+    def __call__(self, x: Union[torch.Tensor, np.ndarray]) -> list[torch.Tensor]:
+        if isinstance(x, torch.Tensor):
+            x = x.detach().cpu().numpy()
+        x = x.astype(self.input_dtype, copy=False)
+
+        expected = [dim for dim in self.input_shape[1:] if isinstance(dim, int)]
+        if len(expected) == 3 and list(x.shape[1:]) != expected:
+            raise ValueError(
+                f"Input shape {list(x.shape[1:])} does not match the onnx model input {expected}. "
+                "Use the image size of the export."
+            )
+
+        outputs = self.session.run(self.output_names, {self.input_name: x})
+        return [torch.from_numpy(output) for output in outputs]
+
+
+def check_precision(precision: Union[str, Precision], device: str):
+    """Check if a precision can run on a device.
+
+    Raises:
+        ValueError: if the precision is not supported.
+        RuntimeError: if fp16 is requested on cpu.
+    """
+    if precision not in list(Precision):
+        raise ValueError(f"Invalid precision: {precision}. Available precisions: {list(Precision)}")
+    if precision == Precision.FP16 and (device == "cpu" or not torch.cuda.is_available()):
+        raise RuntimeError("fp16 is not supported in cpu. Use bf16 instead.")
+
+
+class TorchRuntimeModel:
+    """Run a ModelWrapper for inference: inputs are moved to the model device (and memory format),
+    and the forward runs under torch.inference_mode (no autograd state) and autocast for reduced precisions.
+    Weights are not converted, so the same model can be called in any precision (e.g. to compare with fp32).
+
+    Args:
+        model (torch.nn.Module): model (ModelWrapper).
+        device (str, optional): "cpu" or "cuda:{gpu_id}". Defaults to "cpu".
+        precision (Union[str, Precision], optional): fp32, fp16 (cuda only) or bf16 (cuda and cpu) autocast.
+            Defaults to Precision.FP32.
+        channels_last (bool, optional): use the channels last (NHWC) memory format for the model and the inputs,
+            which is faster for convolutions on tensor cores and recent cpus. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        device: str = "cpu",
+        precision: Union[str, Precision] = Precision.FP32,
+        channels_last: bool = False,
+    ):
+        precision = Precision.FP32 if precision is None else precision
+        check_precision(precision, device)
+
+        self.device = device
+        self.precision = str(precision).lower()
+        self.dtype = _PRECISION_TO_DTYPE[Precision[str(precision).upper()]]
+        self.channels_last = channels_last
+
+        self.model = model.eval().to(device)
+        if channels_last:
+            self.model = self.model.to(memory_format=torch.channels_last)
+
+    def __repr__(self):
+        return f"TorchRuntimeModel(device={self.device}, precision={self.precision}, channels_last={self.channels_last})"
+
+    def to(self, device: str) -> "TorchRuntimeModel":
+        self.device = device
+        self.model = self.model.to(device)
+        return self
+
+    def eval(self) -> "TorchRuntimeModel":
+        return self
+
+    def _autocast(self):
+        if self.dtype == torch.float32:
+            return contextlib.nullcontext()
+        device_type = "cpu" if self.device == "cpu" else "cuda"
+        return torch.autocast(device_type=device_type, dtype=self.dtype)
+
+    def __call__(self, x: torch.Tensor) -> list[torch.Tensor]:
+        x = x.to(self.device, non_blocking=True)
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        with torch.inference_mode(), self._autocast():
+            return self.model(x)
+
+
+def get_max_abs_diff(outputs: list[torch.Tensor], reference: list[torch.Tensor]) -> float:
+    """Maximum absolute difference between the floating point outputs of a model and reference outputs
+    (e.g. a reduced precision run against fp32).
+    """
+    diffs = [
+        float((output.float() - ref.float()).abs().max())
+        for output, ref in zip(outputs, reference)
+        if output.is_floating_point() and output.shape == ref.shape and output.numel() > 0
+    ]
+    return max(diffs, default=0.0)
@@ -12,13 +12,11 @@ from typing import Union
 
 import numpy as np
 import torch
-import torch.nn.functional as F
-from torchvision.ops import batched_nms
+from torchvision.ops import batched_nms, roi_align
 
-from waffle_hub import TaskType
-from waffle_hub.schema.data import ImageInfo
-from waffle_hub.schema.fields import Annotation
-from waffle_hub.utils.conversion import convert_mask_to_polygon
+from waffle_hub import MaskFormat, TaskType
+from waffle_hub.schema.data import ImageInfo, ParsedResult
+from waffle_hub.utils.geometry import encode_rle_crop, mask_to_polygons
 
 
 class PreprocessFunction:
@@ -33,191 +31,324 @@ class ResultParser:
     pass
 
 
+def _flatten_detections(
+    *columns: Union[torch.Tensor, list[torch.Tensor]]
+) -> tuple[torch.Tensor, ...]:
+    """Flatten per image detection columns ([batch, num, ...] tensors, or lists of [num, ...] tensors
+    when the number of detections differs between images) to [total, ...] tensors.
+
+    Returns:
+        tuple[torch.Tensor, ...]: flattened columns, and the batch index of each detection.
+    """
+    if isinstance(columns[0], torch.Tensor):
+        batch_size, num = columns[0].shape[:2]
+        flattened = [column.reshape(batch_size * num, *column.shape[2:]) for column in columns]
+        counts = torch.full((batch_size,), num, dtype=torch.long)
+    else:
+        flattened = [torch.cat(list(column)) for column in columns]
+        counts = torch.tensor([len(column) for column in columns[0]], dtype=torch.long)
+    batch_idxs = torch.repeat_interleave(
+        torch.arange(len(counts), device=flattened[0].device), counts.to(flattened[0].device)
+    )
+    return (*flattened, batch_idxs)
+
+
+def _select_detections(
+    bboxes: torch.Tensor,
+    confs: torch.Tensor,
+    class_ids: torch.Tensor,
+    batch_idxs: torch.Tensor,
+    batch_size: int,
+    confidence_threshold: float,
+    iou_threshold: float,
+    top_k: int = None,
+) -> tuple[torch.Tensor, torch.Tensor]:
+    """Confidence filter, class-wise NMS and top-k of the detections of a whole batch at once.
+
+    Returns:
+        tuple[torch.Tensor, torch.Tensor]: indices of the kept detections (grouped by image, by score in an image)
+            and the number of kept detections of each image.
+    """
+    idxs = torch.nonzero(confs > confidence_threshold).squeeze(1)
+    if len(idxs) > 0:
+        # one nms over the batch: boxes of different images (or classes) never suppress each other
+        class_ids = class_ids[idxs].long()
+        groups = batch_idxs[idxs] * (int(class_ids.max()) + 1) + class_ids
+        idxs = idxs[batched_nms(bboxes[idxs].float(), confs[idxs].float(), groups, iou_threshold)]
+        # batched_nms sorts by score, a stable sort by image keeps that order in each image
+        idxs = idxs[torch.sort(batch_idxs[idxs], stable=True).indices]
+
+    counts = torch.bincount(batch_idxs[idxs], minlength=batch_size)
+    if top_k is not None and len(idxs) > 0:
+        starts = torch.cumsum(counts, dim=0) - counts
+        ranks = torch.arange(len(idxs), device=idxs.device) - starts[batch_idxs[idxs]]
+        idxs = idxs[ranks < top_k]
+        counts = counts.clamp(max=top_k)
+    return idxs, counts.tolist()
+
+
+def _rescale_bboxes(
+    bboxes: torch.Tensor, batch_idxs: torch.Tensor, image_infos: list[ImageInfo]
+) -> torch.Tensor:
+    """Rescale normalized [x1, y1, x2, y2] bboxes of model inputs to [x1, y1, x2, y2] in pixels of the original
+    images (removing the letterbox padding), clipped to the original images.
+    """
+    params = torch.tensor(
+        [
+            [*image_info.input_shape, *image_info.pad, *image_info.new_shape, *image_info.ori_shape]
+            for image_info in image_infos
+        ],
+        dtype=bboxes.dtype,
+        device=bboxes.device,
+    )[batch_idxs]
+    input_wh, pad, new_wh, ori_wh = params[:, 0:2], params[:, 2:4], params[:, 4:6], params[:, 6:8]
+    input_wh, pad, new_wh, ori_wh = (t.repeat(1, 2) for t in (input_wh, pad, new_wh, ori_wh))
+
+    bboxes = (bboxes * input_wh - pad) / new_wh * ori_wh
+    return torch.minimum(bboxes.clamp(min=0), ori_wh)
+
+
+def _to_xywh(bboxes: np.ndarray) -> np.ndarray:
+    bboxes = bboxes.astype(np.float64)
+    bboxes[:, 2:] -= bboxes[:, :2]
+    return bboxes
+
+
 class ClassificationResultParser(ResultParser):
-    def __init__(self, *args, **kwargs):
-        pass
+    def __init__(self, top_k: int = None, *args, **kwargs):
+        """Classification result parser.
+
+        Args:
+            top_k (int, optional): number of classes kept per image, by score. Defaults to None (every class).
+        """
+        self.top_k = top_k
 
     def __call__(
         self, results: list[torch.Tensor], image_infos: list[ImageInfo] = None, *args, **kwargs
-    ) -> list[Annotation]:
-        parseds = []
-
+    ) -> list[ParsedResult]:
         results = results[0]  # TODO: multi label
-        scores, class_ids = results.cpu().topk(results.shape[1], dim=-1)
-        results = torch.cat([class_ids.unsqueeze(-1), scores.unsqueeze(-1)], dim=-1)
-        for result in results:
-            parsed = []
-            for class_id, score in result:
-                parsed.append(
-                    Annotation.classification(category_id=int(class_id) + 1, score=float(score))
-                )
-            parseds.append(parsed)
-        return parseds
+        k = results.shape[1] if self.top_k is None else min(self.top_k, results.shape[1])
+        scores, class_ids = results.topk(k, dim=-1)
+        scores, class_ids = scores.float().cpu().numpy(), class_ids.cpu().numpy() + 1
+
+        return [
+            ParsedResult(TaskType.CLASSIFICATION, category_ids=category_ids, scores=image_scores)
+            for category_ids, image_scores in zip(class_ids, scores)
+        ]
 
 
 class ObjectDetectionResultParser(ResultParser):
     def __init__(
-        self, confidence_threshold: float = 0.25, iou_threshold: float = 0.5, *args, **kwargs
+        self,
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.5,
+        top_k: int = None,
+        *args,
+        **kwargs,
     ):
+        """Object detection result parser.
+
+        Args:
+            confidence_threshold (float, optional): minimum score of a detection. Defaults to 0.25.
+            iou_threshold (float, optional): NMS IoU threshold. Defaults to 0.5.
+            top_k (int, optional): maximum number of detections per image, by score. Defaults to None (no limit).
+        """
         self.confidence_threshold = confidence_threshold
         self.iou_threshold = iou_threshold
+        self.top_k = top_k
 
-    def __call__(
-        self, results: list[torch.Tensor], image_infos: list[ImageInfo], *args, **kwargs
-    ) -> list[Annotation]:
-        parseds = []
-
-        bboxes_batch, confs_batch, class_ids_batch = results
-        for bboxes, confs, class_ids, image_info in zip(
-            bboxes_batch, confs_batch, class_ids_batch, image_infos
-        ):
+    def _parse_detections(
+        self, results: list, image_infos: list[ImageInfo]
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[int], torch.Tensor, torch.Tensor]:
+        """Select and rescale the detections of a batch.
 
-            mask = confs > self.confidence_threshold
+        Returns:
+            tuple: [x1, y1, w, h] bboxes in pixels, scores and category ids (cpu, grouped by image),
+                number of detections per image, and the selected indices and rescaled [x1, y1, x2, y2] bboxes
+                (on the result device) for further per detection outputs.
+        """
+        bboxes, confs, class_ids, batch_idxs = _flatten_detections(*results[:3])
+        idxs, counts = _select_detections(
+            bboxes,
+            confs,
+            class_ids,
+            batch_idxs,
+            len(image_infos),
+            self.confidence_threshold,
+            self.iou_threshold,
+            self.top_k,
+        )
+        xyxy = _rescale_bboxes(bboxes[idxs].float(), batch_idxs[idxs], image_infos)
+
+        return (
+            _to_xywh(xyxy.cpu().numpy()),
+            confs[idxs].float().cpu().numpy(),
+            class_ids[idxs].long().cpu().numpy() + 1,
+            counts,
+            idxs,
+            xyxy,
+        )
 
-            bboxes, confs, class_ids = (
-                bboxes[mask],
-                confs[mask],
-                class_ids[mask],
+    def __call__(
+        self, results: list[torch.Tensor], image_infos: list[ImageInfo], *args, **kwargs
+    ) -> list[ParsedResult]:
+        bboxes, scores, category_ids, counts, _, _ = self._parse_detections(results, image_infos)
+
+        splits = np.cumsum(counts)[:-1]
+        return [
+            ParsedResult(
+                TaskType.OBJECT_DETECTION,
+                category_ids=image_category_ids,
+                scores=image_scores,
+                bboxes=image_bboxes,
             )
-            idxs = batched_nms(bboxes, confs, class_ids, self.iou_threshold)
-
-            bboxes = bboxes[idxs, :].cpu()
-            confs = confs[idxs].cpu()
-            class_ids = class_ids[idxs].cpu()
-
-            W, H = image_info.input_shape
-            left_pad, top_pad = image_info.pad
-            ori_w, ori_h = image_info.ori_shape
-            new_w, new_h = image_info.new_shape
-
-            parsed = []
-            for (x1, y1, x2, y2), conf, class_id in zip(bboxes, confs, class_ids):
-
-                x1 = max(float((x1 * W - left_pad) / new_w * ori_w), 0)
-                y1 = max(float((y1 * H - top_pad) / new_h * ori_h), 0)
-                x2 = min(float((x2 * W - left_pad) / new_w * ori_w), ori_w)
-                y2 = min(float((y2 * H - top_pad) / new_h * ori_h), ori_h)
-
-                parsed.append(
-                    Annotation.object_detection(
-                        category_id=int(class_id) + 1,
-                        bbox=[x1, y1, x2 - x1, y2 - y1],
-                        area=float((x2 - x1) * (y2 - y1)),
-                        score=float(conf),
-                    )
-                )
-            parseds.append(parsed)
-        return parseds
+            for image_bboxes, image_scores, image_category_ids in zip(
+                np.split(bboxes, splits), np.split(scores, splits), np.split(category_ids, splits)
+            )
+        ]
+
+
+def _crop_masks(
+    masks: torch.Tensor, xyxy: torch.Tensor, image_info: ImageInfo
+) -> tuple[list[np.ndarray], np.ndarray]:
+    """Crop-then-resize mask decoding: sample the mask probabilities of each detection only over its box,
+    at the resolution of the original image, and threshold them at 0.5.
+
+    Args:
+        masks (torch.Tensor): [num, mask_height, mask_width] mask probabilities over the model input.
+        xyxy (torch.Tensor): [num, 4] boxes [x1, y1, x2, y2] in pixels of the original image.
+        image_info (ImageInfo): image info.
+
+    Returns:
+        tuple[list[np.ndarray], np.ndarray]: (h, w) binary crops and their (x, y) positions in the original image.
+    """
+    if len(masks) == 0:
+        return [], np.zeros((0, 2), dtype=np.int64)
+
+    # boxes snapped outwards to whole pixels of the original image
+    ori_w, ori_h = image_info.ori_shape
+    boxes = torch.cat([torch.floor(xyxy[:, :2]), torch.ceil(xyxy[:, 2:])], dim=1)
+    boxes = torch.minimum(boxes.clamp(min=0), boxes.new_tensor([ori_w, ori_h, ori_w, ori_h]))
+    sizes = (boxes[:, 2:] - boxes[:, :2]).long().tolist()
+
+    # the same boxes over the mask: original image -> model input (with letterbox padding) -> mask
+    mask_h, mask_w = masks.shape[-2:]
+    (input_w, input_h), (left_pad, top_pad), (new_w, new_h) = (
+        image_info.input_shape,
+        image_info.pad,
+        image_info.new_shape,
+    )
+    scale = boxes.new_tensor([new_w / ori_w, new_h / ori_h] * 2)
+    pad = boxes.new_tensor([left_pad, top_pad] * 2)
+    to_mask = boxes.new_tensor([mask_w / input_w, mask_h / input_h] * 2)
+    mask_boxes = (boxes * scale + pad) * to_mask
+
+    crops = []
+    masks = masks.float().unsqueeze(1)
+    for i, (w, h) in enumerate(sizes):
+        if w == 0 or h == 0:
+            crops.append(masks.new_zeros((h, w), dtype=torch.bool))
+            continue
+        crop = roi_align(
+            masks[i : i + 1], [mask_boxes[i : i + 1]], (h, w), sampling_ratio=1, aligned=True
+        )
+        crops.append(crop[0, 0] > 0.5)
+
+    # one device to host copy for the whole image
+    flat = torch.cat([crop.flatten() for crop in crops]).cpu().numpy().view(np.uint8)
+    splits = np.cumsum([w * h for w, h in sizes])[:-1]
+    crops = [crop.reshape(h, w) for crop, (w, h) in zip(np.split(flat, splits), sizes)]
+    return crops, boxes[:, :2].long().cpu().numpy()
 
 
 class InstanceSegmentationResultParser(ObjectDetectionResultParser):
     def __init__(
-        self, confidence_threshold: float = 0.25, iou_threshold: float = 0.5, *args, **kwargs
+        self,
+        confidence_threshold: float = 0.25,
+        iou_threshold: float = 0.5,
+        top_k: int = None,
+        mask_format: Union[str, MaskFormat] = MaskFormat.POLYGON,
+        *args,
+        **kwargs,
     ):
-        self.confidence_threshold = confidence_threshold
-        self.iou_threshold = iou_threshold
-        super().__init__(confidence_threshold, iou_threshold, *args, **kwargs)
+        """Instance segmentation result parser.
+
+        Args:
+            confidence_threshold (float, optional): minimum score of a detection. Defaults to 0.25.
+            iou_threshold (float, optional): NMS IoU threshold. Defaults to 0.5.
+            top_k (int, optional): maximum number of detections per image, by score. Defaults to None (no limit).
+            mask_format (Union[str, MaskFormat], optional): segmentation format, polygons or compressed coco RLE.
+                Defaults to MaskFormat.POLYGON.
+
+        Raises:
+            ValueError: if the mask format is not supported.
+        """
+        super().__init__(confidence_threshold, iou_threshold, top_k, *args, **kwargs)
+        mask_format = MaskFormat.POLYGON if mask_format is None else mask_format
+        if mask_format not in list(MaskFormat):
+            raise ValueError(
+                f"Invalid mask format: {mask_format}. Available mask formats: {list(MaskFormat)}"
+            )
+        self.mask_format = mask_format
 
     def __call__(
         self, results: list[torch.Tensor], image_infos: list[ImageInfo], *args, **kwargs
-    ) -> list[Annotation]:
+    ) -> list[ParsedResult]:
+        bboxes, scores, category_ids, counts, idxs, xyxy = self._parse_detections(
+            results, image_infos
+        )
+        masks = _flatten_detections(results[3])[0][idxs]
+
         parseds = []
-        bboxes_batch, confs_batch, class_ids_batch, masks_batch = results
-        for bboxes, confs, class_ids, masks, image_info in zip(
-            bboxes_batch,
-            confs_batch,
-            class_ids_batch,
-            masks_batch,
-            image_infos,
-        ):
-
-            mask = confs > self.confidence_threshold
-
-            bboxes, confs, class_ids, masks = (
-                bboxes[mask],
-                confs[mask],
-                class_ids[mask],
-                masks[mask],
-            )
-            idxs = batched_nms(bboxes, confs, class_ids, self.iou_threshold)
-
-            bboxes = bboxes[idxs, :].cpu()
-            confs = confs[idxs].cpu()
-            class_ids = class_ids[idxs].cpu()
-
-            masks = masks[idxs, :]
-            masks = (
-                F.interpolate(
-                    input=masks.gt_(0.5).unsqueeze(1),
-                    size=image_info.ori_shape,
-                    mode="bilinear",
-                    align_corners=False,
+        start = 0
+        for image_info, count in zip(image_infos, counts):
+            end = start + count
+            crops, offsets = _crop_masks(masks[start:end], xyxy[start:end], image_info)
+
+            if self.mask_format == MaskFormat.RLE:
+                ori_w, ori_h = image_info.ori_shape
+                segmentations = [
+                    encode_rle_crop(crop, offset, ori_w, ori_h)
+                    for crop, offset in zip(crops, offsets)
+                ]
+            else:
+                segmentations = [
+                    mask_to_polygons(crop, offset) for crop, offset in zip(crops, offsets)
+                ]
+
+            parseds.append(
+                ParsedResult(
+                    TaskType.INSTANCE_SEGMENTATION,
+                    category_ids=category_ids[start:end],
+                    scores=scores[start:end],
+                    bboxes=bboxes[start:end],
+                    segmentations=segmentations,
                 )
-                .cpu()
-                .squeeze(1)
             )
-
-            W, H = image_info.input_shape
-            left_pad, top_pad = image_info.pad
-            ori_w, ori_h = image_info.ori_shape
-            new_w, new_h = image_info.new_shape
-
-            parsed = []
-            for (x1, y1, x2, y2), conf, class_id, mask in zip(bboxes, confs, class_ids, masks):
-
-                x1 = max(float((x1 * W - left_pad) / new_w * ori_w), 0)
-                y1 = max(float((y1 * H - top_pad) / new_h * ori_h), 0)
-                x2 = min(float((x2 * W - left_pad) / new_w * ori_w), ori_w)
-                y2 = min(float((y2 * H - top_pad) / new_h * ori_h), ori_h)
-
-                # clean non roi area
-                mask[:, : round(x1)] = 0
-                mask[:, round(x2) :] = 0
-                mask[: round(y1), :] = 0
-                mask[round(y2) :, :] = 0
-
-                segment = convert_mask_to_polygon(mask.numpy().astype(np.uint8))
-
-                parsed.append(
-                    Annotation.instance_segmentation(
-                        category_id=int(class_id) + 1,
-                        bbox=[x1, y1, x2 - x1, y2 - y1],
-                        area=float((x2 - x1) * (y2 - y1)),
-                        score=float(conf),
-                        segmentation=segment,
-                    )
-                )
-            parseds.append(parsed)
+            start = end
         return parseds
 
 
 class TextRecognitionResultParser(ResultParser):
     def __init__(self, categories, *args, **kwargs):
         self.categories = categories
-        self.category_names = [""] + [d["name"] for d in self.categories]
+        self.category_names = np.array([""] + [d["name"] for d in self.categories], dtype=object)
 
     def __call__(
         self, results: list[torch.Tensor], image_infos: list[ImageInfo] = None, *args, **kwargs
-    ) -> list[Annotation]:
-        parseds = []
-
+    ) -> list[ParsedResult]:
         pred_batch, conf_batch = results
-        for preds, confs in zip(pred_batch, conf_batch):
-            mask = preds > 0
-            preds, confs = preds[mask], confs[mask]
-
-            text = "".join([self.category_names[pred] for pred in preds])
-
-            parsed = []
-            parsed.append(
-                Annotation.text_recognition(
-                    score=list(map(float, confs)),
-                    caption=text,
-                )
+        pred_batch, conf_batch = pred_batch.cpu().numpy(), conf_batch.float().cpu().numpy()
+        masks = pred_batch > 0
+
+        return [
+            ParsedResult(
+                TaskType.TEXT_RECOGNITION,
+                scores=confs[mask],
+                caption="".join(self.category_names[preds[mask]]),
             )
-            parseds.append(parsed)
-
-        return parseds
+            for preds, confs, mask in zip(pred_batch, conf_batch, masks)
+        ]
 
 
 def get_parser(task: str):
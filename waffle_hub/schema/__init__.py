@@ -1,5 +1,5 @@
 from .configs import ExportOnnxConfig, InferenceConfig, ModelConfig, TrainConfig
-from .data import DatasetInfo, ImageInfo
+from .data import DatasetInfo, ImageInfo, ParsedResult
 from .fields import Annotation, Category, Image
 
 __all__ = [
@@ -9,6 +9,7 @@ __all__ = [
     "ExportOnnxConfig",
     "DatasetInfo",
     "ImageInfo",
+    "ParsedResult",
     "Image",
     "Category",
     "Annotation",
@@ -45,6 +45,12 @@ class EvaluateConfig(BaseSchema):
     device: str = None
     draw: bool = None
     dataset_root_dir: str = None
+    cache: bool = None
+    top_k: int = None
+    engine: str = None
+    precision: str = None
+    channels_last: bool = None
+    resume: bool = None
 
 
 @dataclass
@@ -62,6 +68,14 @@ class InferenceConfig(BaseSchema):
     device: str = None
     draw: bool = None
     show: bool = None
+    top_k: int = None
+    mask_format: str = None
+    engine: str = None
+    precision: str = None
+    channels_last: bool = None
+    postprocess_workers: int = None
+    output_format: str = None
+    resume: bool = None
 
 
 @dataclass
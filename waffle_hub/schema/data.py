@@ -1,10 +1,12 @@
 from dataclasses import dataclass
+from typing import Iterator, Union
 
 import numpy as np
 from waffle_utils.log import datetime_now
 
+from waffle_hub import TaskType
 from waffle_hub.schema.base_schema import BaseSchema
-from waffle_hub.schema.fields import Category
+from waffle_hub.schema.fields import Annotation, Category
 
 
 @dataclass
@@ -13,6 +15,7 @@ class DatasetInfo(BaseSchema):
     task: str
     categories: list[Category] = None
     created: str = None
+    storage: str = None
 
     def __post_init__(self):
         self.created = self.created or datetime_now()
@@ -39,3 +42,111 @@ class ImageInfo(BaseSchema):
     ori_image: np.ndarray = None
     image_path: str = None
     image_rel_path: str = None
+
+
+class ParsedResult:
+    """Predictions of an image, stored column by column (see the result parsers of waffle_hub.hub.model.wrapper).
+
+    It behaves like a read only list of prediction Annotations, which are only built when they are accessed.
+    Use the columns (or to_dicts) directly to avoid building Annotation objects at all.
+
+    Args:
+        task (Union[str, TaskType]): task type.
+        category_ids (np.ndarray, optional): (N,) category ids (natural numbers). Defaults to None.
+        scores (np.ndarray, optional): (N,) scores. Per character scores for text recognition. Defaults to None.
+        bboxes (np.ndarray, optional): (N, 4) bboxes [x1, y1, w, h] in pixels. Defaults to None.
+        segmentations (list, optional): N segmentations (polygons, or compressed coco RLEs). Defaults to None.
+        caption (str, optional): recognized text of text recognition. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        task: Union[str, TaskType],
+        category_ids: np.ndarray = None,
+        scores: np.ndarray = None,
+        bboxes: np.ndarray = None,
+        segmentations: list = None,
+        caption: str = None,
+    ):
+        self.task = str(task).upper()
+        self.category_ids = category_ids
+        self.scores = scores
+        self.bboxes = bboxes
+        self.segmentations = segmentations
+        self.caption = caption
+        self._annotations = None
+
+    def __repr__(self):
+        return f"ParsedResult(task={self.task}, num_predictions={len(self)})"
+
+    def __len__(self) -> int:
+        if self.task == TaskType.TEXT_RECOGNITION:
+            return 0 if self.caption is None else 1
+        return 0 if self.category_ids is None else len(self.category_ids)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Annotation, list[Annotation]]:
+        return self.to_annotations()[idx]
+
+    def __iter__(self) -> Iterator[Annotation]:
+        return iter(self.to_annotations())
+
+    @property
+    def areas(self) -> np.ndarray:
+        """(N,) bbox areas."""
+        return self.bboxes[:, 2] * self.bboxes[:, 3]
+
+    def to_dicts(self) -> list[dict]:
+        """Get the predictions as annotation dictionaries (the same as Annotation.to_dict), without building Annotations.
+
+        Returns:
+            list[dict]: annotation dictionaries.
+        """
+        if self.task == TaskType.TEXT_RECOGNITION:
+            if self.caption is None:
+                return []
+            return [{"caption": self.caption, "score": self.scores.tolist()}]
+
+        category_ids = self.category_ids.tolist()
+        scores = self.scores.tolist()
+        if self.task == TaskType.CLASSIFICATION:
+            return [
+                {"category_id": category_id, "score": score}
+                for category_id, score in zip(category_ids, scores)
+            ]
+
+        bboxes = self.bboxes.tolist()
+        areas = self.areas.tolist()
+        if self.segmentations is None:
+            return [
+                {
+                    "category_id": category_id,
+                    "bbox": bbox,
+                    "area": area,
+                    "iscrowd": 0,
+                    "score": score,
+                }
+                for category_id, bbox, area, score in zip(category_ids, bboxes, areas, scores)
+            ]
+        return [
+            {
+                "category_id": category_id,
+                "bbox": bbox,
+                "segmentation": segmentation,
+                "area": area,
+                "iscrowd": 0,
+                "score": score,
+            }
+            for category_id, bbox, segmentation, area, score in zip(
+                category_ids, bboxes, self.segmentations, areas, scores
+            )
+        ]
+
+    def to_annotations(self) -> list[Annotation]:
+        """Get the predictions as Annotations. They are built once, on the first call.
+
+        Returns:
+            list[Annotation]: prediction annotations.
+        """
+        if self._annotations is None:
+            self._annotations = [Annotation.from_trusted_dict(d, self.task) for d in self.to_dicts()]
+        return self._annotations
@@ -1,15 +1,75 @@
 from typing import Union
 
-from shapely import Polygon
 from waffle_utils.utils import type_validator
 
 from waffle_hub import TaskType
 from waffle_hub.utils.conversion import convert_rle_to_polygon
+from waffle_hub.utils.geometry import segmentation_area, segmentation_bbox
 
 from .base_field import BaseField
 
+_SEGMENTATION_FIELDS = ("category_id", "bbox", "segmentation", "area", "iscrowd", "score")
+
+# (fields kept by the factory of the task, default iscrowd, fields the factory derives when missing)
+# keyed by the task name for fast lookups while loading millions of annotations
+_TRUSTED_TASK_SPECS = {
+    "CLASSIFICATION": (("category_id", "score"), None, ()),
+    "OBJECT_DETECTION": (("category_id", "bbox", "area", "iscrowd", "score"), 0, ("area",)),
+    "SEMANTIC_SEGMENTATION": (_SEGMENTATION_FIELDS, 0, ("bbox", "area")),
+    "INSTANCE_SEGMENTATION": (_SEGMENTATION_FIELDS, 0, ("bbox", "area")),
+    "KEYPOINT_DETECTION": (
+        (
+            "category_id",
+            "bbox",
+            "keypoints",
+            "num_keypoints",
+            "segmentation",
+            "area",
+            "iscrowd",
+            "score",
+        ),
+        0,
+        (),
+    ),
+    "REGRESSION": (("value",), None, ()),
+    "TEXT_RECOGNITION": (("caption", "score"), None, ()),
+    "NONE": (
+        (
+            "category_id",
+            "bbox",
+            "segmentation",
+            "area",
+            "keypoints",
+            "num_keypoints",
+            "caption",
+            "value",
+            "iscrowd",
+            "score",
+        ),
+        None,
+        (),
+    ),
+}
+
 
 class Annotation(BaseField):
+    # no __dict__ per instance, datasets hold millions of annotations
+    __slots__ = (
+        "__annotation_id",
+        "__image_id",
+        "__category_id",
+        "__bbox",
+        "__segmentation",
+        "__area",
+        "__keypoints",
+        "__num_keypoints",
+        "__caption",
+        "__value",
+        "__iscrowd",
+        "__score",
+        "__task",
+    )
+
     def __init__(
         self,
         # required
@@ -362,18 +422,10 @@ class Annotation(BaseField):
             segmentation = convert_rle_to_polygon(segmentation)
 
         if bbox is None:
-            xs = [x for polygon in segmentation for x in polygon[::2]]
-            ys = [y for polygon in segmentation for y in polygon[1::2]]
-            x1 = min(xs)
-            y1 = min(ys)
-            w = max(xs) - x1
-            h = max(ys) - y1
-            bbox = [x1, y1, w, h]
+            bbox = segmentation_bbox(segmentation)
 
         if area is None:
-            area = 0
-            for polygon in segmentation:
-                area += Polygon([(x, y) for x, y in zip(polygon[::2], polygon[1::2])]).area
+            area = segmentation_area(segmentation)
 
         return cls(
             annotation_id,
@@ -420,18 +472,10 @@ class Annotation(BaseField):
             segmentation = convert_rle_to_polygon(segmentation)
 
         if bbox is None:
-            xs = [x for polygon in segmentation for x in polygon[::2]]
-            ys = [y for polygon in segmentation for y in polygon[1::2]]
-            x1 = min(xs)
-            y1 = min(ys)
-            w = max(xs) - x1
-            h = max(ys) - y1
-            bbox = [x1, y1, w, h]
+            bbox = segmentation_bbox(segmentation)
 
         if area is None:
-            area = 0
-            for polygon in segmentation:
-                area += Polygon([(x, y) for x, y in zip(polygon[::2], polygon[1::2])]).area
+            area = segmentation_area(segmentation)
 
         return cls(
             annotation_id,
@@ -535,6 +579,47 @@ class Annotation(BaseField):
             annotation_id, image_id, caption=caption, score=score, task=TaskType.TEXT_RECOGNITION
         )
 
+    @classmethod
+    def from_trusted_dict(cls, d: dict, task: Union[str, TaskType] = None) -> "Annotation":
+        """Load Annotation from a dictionary written by to_dict (e.g. read from the dataset storage).
+        The values are set without validation, which is much faster than from_dict.
+        Dictionaries that need a conversion (RLE segmentation, missing bbox or area) fall back to from_dict.
+
+        Args:
+            d (dict): annotation dictionary.
+            task (Union[str, TaskType], optional): task type. Default to None.
+
+        Returns:
+            Annotation: annotation class
+        """
+        task_name = str(task).upper()
+        if task_name not in _TRUSTED_TASK_SPECS:
+            raise ValueError(f"Invalid task type: {task}" f"Available task types: {list(TaskType)}")
+        fields, default_iscrowd, derived_fields = _TRUSTED_TASK_SPECS[task_name]
+        if isinstance(d.get("segmentation"), dict) or any(
+            d.get(field) is None for field in derived_fields
+        ):
+            return cls.from_dict(d, task)
+
+        get = lambda field: d.get(field) if field in fields else None
+        annotation = cls.__new__(cls)
+        annotation.__annotation_id = d.get("annotation_id")
+        annotation.__image_id = d.get("image_id")
+        annotation.__category_id = get("category_id")
+        annotation.__bbox = get("bbox")
+        annotation.__segmentation = get("segmentation")
+        area = get("area")
+        annotation.__area = float(area) if area is not None else None
+        annotation.__keypoints = get("keypoints")
+        annotation.__num_keypoints = get("num_keypoints")
+        annotation.__caption = get("caption")
+        annotation.__value = get("value")
+        iscrowd = get("iscrowd")
+        annotation.__iscrowd = default_iscrowd if iscrowd is None else iscrowd
+        annotation.__score = get("score")
+        annotation.__task = task_name
+        return annotation
+
     def to_dict(self) -> dict:
         """Get Dictionary of Annotation Data
 
@@ -6,6 +6,8 @@ from waffle_hub import TaskType
 
 
 class BaseField(ABC):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -44,6 +46,20 @@ class BaseField(ABC):
         else:
             return cls.new(**d)
 
+    @classmethod
+    def from_trusted_dict(cls, d: dict, task: str = None) -> "BaseField":
+        """Load Field from a dictionary written by to_dict (e.g. read from the dataset storage).
+        Fields with a fast constructor skip the validation, the others fall back to from_dict.
+
+        Args:
+            d (dict): dictionary of the field.
+            task (str, optional): task name. Default to None.
+
+        Returns:
+            Field Object: Field Object.
+        """
+        return cls.from_dict(d, task)
+
     @classmethod
     def from_json(cls, f: str, task: str = None) -> "BaseField":
         """Load Field from json file.
@@ -5,6 +5,16 @@ from .base_field import BaseField
 
 
 class Image(BaseField):
+    # no __dict__ per instance, datasets hold millions of images
+    __slots__ = (
+        "__image_id",
+        "__file_name",
+        "__width",
+        "__height",
+        "__original_file_name",
+        "__date_captured",
+    )
+
     def __init__(
         self,
         # required
@@ -108,7 +118,35 @@ class Image(BaseField):
         Returns:
             Image: image class
         """
-        return cls(image_id, file_name, width, height, date_captured)
+        return cls(
+            image_id,
+            file_name,
+            width,
+            height,
+            original_file_name=original_file_name,
+            date_captured=date_captured,
+        )
+
+    @classmethod
+    def from_trusted_dict(cls, d: dict, task: str = None) -> "Image":
+        """Load Image from a dictionary written by to_dict (e.g. read from the dataset storage).
+        The values are set without validation, which is much faster than from_dict.
+
+        Args:
+            d (dict): image dictionary.
+            task (str, optional): not used. Default to None.
+
+        Returns:
+            Image: image class
+        """
+        image = cls.__new__(cls)
+        image.__image_id = d["image_id"]
+        image.__file_name = d["file_name"]
+        image.__width = d["width"]
+        image.__height = d["height"]
+        image.__original_file_name = d.get("original_file_name") or d["file_name"]
+        image.__date_captured = d.get("date_captured") or datetime_now()
+        return image
 
     def to_dict(self) -> dict:
         """Get Dictionary of Category
@@ -18,8 +18,9 @@ class EvaluateResult(BaseSchema):
 
 @dataclass
 class InferenceResult(BaseSchema):
-    predictions: list[dict[list]] = None
+    predictions: list[dict[list]] = None  # PredictionReader of the prediction file
     draw_dir: str = None
+    stage_stats: list[dict] = None
 
 
 @dataclass
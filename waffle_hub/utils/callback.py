@@ -49,6 +49,7 @@ class ThreadProgressCallback:
         self._finished = False
         self._failed = False
         self._progress = 0
+        self._step = 0
         self._start_time = time.time()
 
     def get_progress(self) -> float:
@@ -74,14 +75,27 @@ class ThreadProgressCallback:
             return float("inf")
         return (elapsed / self._progress) - elapsed
 
+    def get_throughput(self) -> float:
+        """Get the number of steps done per second. (e.g. images/s)"""
+        elapsed = time.time() - self._start_time
+        if elapsed <= 0:
+            return 0.0
+        return self._step / elapsed
+
+    def set_total_steps(self, total_steps: int):
+        """Set the total steps when it is known after the task has started."""
+        self._total_steps = total_steps
+
     def update(self, step: int):
         """Update the progress of the task. (0 ~ total_steps)"""
         if self._finished:
             warnings.warn("Callback has already ended")
         elif step >= self._total_steps:
             self._finished = True
+            self._step = step
             self._progress = step / self._total_steps
         else:
+            self._step = step
             self._progress = step / self._total_steps
 
     def force_finish(self):
@@ -143,6 +157,19 @@ class InferenceCallback(ThreadProgressCallback):
     def __init__(self, total_steps: int):
         super().__init__(total_steps)
 
+        self._pipeline = None
+
+    def set_pipeline(self, pipeline):
+        """Set the pipeline running the inference (see waffle_hub.utils.pipeline.Pipeline)."""
+        self._pipeline = pipeline
+
+    def get_stage_stats(self) -> list[dict]:
+        """Get the throughput, utilization and queue depth of every inference stage (load, model, postprocess, write).
+        The stage with the highest utilization is the bottleneck."""
+        if self._pipeline is None:
+            return []
+        return self._pipeline.get_stats()
+
 
 class ExportCallback(ThreadProgressCallback):
     def __init__(self, total_steps: int):
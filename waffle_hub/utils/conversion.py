@@ -1,11 +1,10 @@
-import cv2
 import numpy as np
-from pycocotools import mask as mask_utils
+
+from waffle_hub.utils.geometry import decode_rle, mask_to_polygons
 
 
 def convert_rle_to_mask(rle: dict) -> np.ndarray:
-    mask = mask_utils.frPyObjects(rle, rle["size"][0], rle["size"][1])  # height, width
-    return mask_utils.decode(mask)
+    return decode_rle(rle)  # compressed (e.g. inference with mask_format="rle") or not
 
 
 def convert_rle_to_polygon(rle: dict) -> list:
@@ -14,19 +13,7 @@ def convert_rle_to_polygon(rle: dict) -> list:
 
 
 def convert_mask_to_polygon(mask: np.ndarray) -> list[list]:
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    polygon = []
-
-    for contour in contours:
-        # contour = np.flip(contour, axis=1)
-        # polygon.append(contour.ravel().tolist())
-
-        p = []
-        contour = contour.reshape(-1, 2)
-        for point in contour:
-            p.extend(point.tolist())
-        polygon.append(p)
-    return polygon
+    return mask_to_polygons(mask)
 
 
 def merge_multi_segment(segments: list[list], image_size: tuple) -> list:
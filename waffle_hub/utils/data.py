@@ -1,4 +1,9 @@
+import hashlib
+import json
+import os
+import shutil
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Union
 
@@ -11,6 +16,7 @@ from waffle_utils.file import io
 from waffle_utils.image.io import load_image
 
 from waffle_hub.dataset import Dataset
+from waffle_hub.dataset.adapter.webdataset import WebDatasetReader
 from waffle_hub.schema.data import ImageInfo
 from waffle_hub.schema.fields import Annotation, Category, Image
 
@@ -107,6 +113,14 @@ def resize_image(
     )
 
 
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """Decode encoded image bytes (e.g. a sample of a WebDataset shard) to an opencv (BGR) image."""
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Failed to decode image bytes.")
+    return image
+
+
 def get_image_transform(image_size: Union[int, list[int]], letter_box: bool = False):
     def transform(image: Union[np.ndarray, str]) -> tuple[torch.Tensor, ImageInfo]:
         if isinstance(image, str):
@@ -118,6 +132,148 @@ def get_image_transform(image_size: Union[int, list[int]], letter_box: bool = Fa
     return transform
 
 
+class ImageCache:
+    """Cache of pre-resized uint8 (RGB) images of a dataset split, in a memory-mapped array.
+
+    {dataset_dir}/caches/{set_name}_{width}x{height}_{letterbox|resize}/
+        images.npy  # uint8 array of shape (N, height, width, 3)
+        infos.json  # signature of the images and the ImageInfo (shapes and padding) of each image
+
+    The cache is keyed by (dataset, set_name, image_size, letter_box) and is created again
+    when an image of the split is added, removed or replaced. Reading an image is a copy from the page cache,
+    without decoding, colour conversion or resizing. ImageInfo.ori_image is not cached (None).
+
+    Args:
+        cache_dir (Union[str, Path]): cache directory.
+    """
+
+    VERSION = 1
+    IMAGE_FILE_NAME = "images.npy"
+    INFO_FILE_NAME = "infos.json"
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        self.cache_dir = Path(cache_dir)
+        with open(self.cache_dir / ImageCache.INFO_FILE_NAME) as f:
+            self.infos: list[dict] = json.load(f)["infos"]
+        self._images = None
+
+    @classmethod
+    def get_cache_dir(
+        cls, dataset: Dataset, set_name: str, image_size: list[int], letter_box: bool
+    ) -> Path:
+        W, H = image_size
+        return (
+            dataset.cache_dir
+            / f"{set_name or 'all'}_{W}x{H}_{'letterbox' if letter_box else 'resize'}"
+        )
+
+    @staticmethod
+    def get_signature(image_dir: Path, images: list[Image]) -> str:
+        """Signature of the images. Raw image files are represented by their size and modification time."""
+        signature = hashlib.sha1(str(ImageCache.VERSION).encode())
+        for image in images:
+            stat = os.stat(image_dir / image.file_name)
+            signature.update(
+                f"{image.image_id}:{image.file_name}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+            )
+        return signature.hexdigest()
+
+    @classmethod
+    def load_or_create(
+        cls,
+        dataset: Dataset,
+        images: list[Image],
+        set_name: str,
+        image_size: list[int],
+        letter_box: bool,
+        workers: int = None,
+    ) -> "ImageCache":
+        """Load the cache of a dataset split, or create it if it is missing or outdated.
+
+        Args:
+            dataset (Dataset): dataset.
+            images (list[Image]): images of the split, in order.
+            set_name (str): split name. None for every labeled image.
+            image_size (list[int]): image [width, height].
+            letter_box (bool): letter box.
+            workers (int, optional): number of worker threads decoding images. Defaults to None (cpu count).
+
+        Returns:
+            ImageCache: cache of the split.
+        """
+        cache_dir = cls.get_cache_dir(dataset, set_name, image_size, letter_box)
+        signature = cls.get_signature(dataset.raw_image_dir, images)
+
+        info_file = cache_dir / ImageCache.INFO_FILE_NAME
+        if info_file.exists():
+            try:
+                with open(info_file) as f:
+                    if json.load(f).get("signature") == signature:
+                        return cls(cache_dir)
+            except ValueError:
+                pass
+
+        temp_dir = cache_dir.with_name(f"{cache_dir.name}.{os.getpid()}.tmp")
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+        temp_dir.mkdir(parents=True)
+
+        W, H = image_size
+        array = np.lib.format.open_memmap(
+            temp_dir / ImageCache.IMAGE_FILE_NAME,
+            mode="w+",
+            dtype=np.uint8,
+            shape=(len(images), H, W, 3),
+        )
+
+        def _resize(idx: int) -> dict:
+            image = cv2.cvtColor(
+                load_image(str(dataset.raw_image_dir / images[idx].file_name)), cv2.COLOR_BGR2RGB
+            )
+            resized_image, image_info = resize_image(image, image_size, letter_box)
+            array[idx] = resized_image
+            return {
+                "ori_shape": list(image_info.ori_shape),
+                "new_shape": list(image_info.new_shape),
+                "input_shape": list(image_info.input_shape),
+                "pad": list(image_info.pad),
+            }
+
+        workers = (os.cpu_count() or 1) if workers is None else workers
+        if workers <= 0 or len(images) <= 1:
+            infos = list(map(_resize, range(len(images))))
+        else:
+            with ThreadPoolExecutor(
+                max_workers=min(workers, len(images))
+            ) as executor:  # cv2 releases the GIL
+                infos = list(executor.map(_resize, range(len(images))))
+        array.flush()
+        del array
+
+        with open(temp_dir / ImageCache.INFO_FILE_NAME, "w") as f:
+            json.dump({"version": ImageCache.VERSION, "signature": signature, "infos": infos}, f)
+
+        if cache_dir.exists():
+            shutil.rmtree(cache_dir)
+        os.replace(temp_dir, cache_dir)
+        return cls(cache_dir)
+
+    def __len__(self) -> int:
+        return len(self.infos)
+
+    def __getstate__(self):
+        # the memory map is opened again by each DataLoader worker, instead of being pickled
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def get(self, idx: int) -> tuple[np.ndarray, ImageInfo]:
+        """Get the resized (RGB) image and its ImageInfo."""
+        if self._images is None:
+            self._images = np.load(self.cache_dir / ImageCache.IMAGE_FILE_NAME, mmap_mode="r")
+        return np.array(self._images[idx]), ImageInfo(**self.infos[idx])
+
+
 def get_dataset_class(dataset_type: str):
     if dataset_type == "image":
         return ImageDataset
@@ -155,18 +311,53 @@ class BaseDataset:
     def collate_fn(self, batch):
         raise NotImplementedError
 
-    def get_dataloader(self, batch_size: int = 4, num_workers: int = 0):
+    def get_dataloader(
+        self,
+        batch_size: int = 4,
+        num_workers: int = 0,
+        pin_memory: bool = False,
+        persistent_workers: bool = False,
+        prefetch_factor: int = None,
+        start: int = 0,
+    ):
+        """Get a DataLoader of the dataset (in order).
+
+        Args:
+            batch_size (int, optional): batch size. Defaults to 4.
+            num_workers (int, optional): number of worker processes decoding images. Defaults to 0 (in the caller).
+            pin_memory (bool, optional): put the batches in page-locked memory, so that they are copied to cuda
+                asynchronously. Defaults to False.
+            persistent_workers (bool, optional): keep the worker processes alive between iterations. Defaults to False.
+            prefetch_factor (int, optional): number of batches loaded in advance by each worker.
+                Defaults to None (DataLoader default).
+            start (int, optional): index of the first item, the items before are skipped
+                (e.g. done before a resume). Defaults to 0.
+
+        Returns:
+            torch.utils.data.DataLoader: dataloader of (images, image_infos) batches.
+        """
+        worker_kwargs = {}
+        if num_workers > 0:
+            worker_kwargs["persistent_workers"] = persistent_workers
+            if prefetch_factor is not None:
+                worker_kwargs["prefetch_factor"] = prefetch_factor
         return torch.utils.data.DataLoader(
-            self,
+            torch.utils.data.Subset(self, range(start, len(self))) if start > 0 else self,
             batch_size,
             num_workers=num_workers,
             collate_fn=self.collate_fn,
             shuffle=False,
             drop_last=False,
+            pin_memory=pin_memory,
+            **worker_kwargs,
         )
 
 
 class ImageDataset(BaseDataset):
+    """Dataset of an image file, an image directory or a WEBDATASET export directory.
+    Images of a WEBDATASET export are read from its tar shards (sequential reads in order).
+    """
+
     def __init__(
         self,
         image_dir: str,
@@ -178,7 +369,12 @@ class ImageDataset(BaseDataset):
         super().__init__(image_size, letter_box)
 
         self.image_dir = image_dir
-        if Path(self.image_dir).is_file():
+        self.reader = None
+        if WebDatasetReader.is_webdataset(self.image_dir):
+            self.reader = WebDatasetReader(self.image_dir)
+            self.image_paths = None
+            self.image_root_dir = Path(self.image_dir)
+        elif Path(self.image_dir).is_file():
             self.image_paths = [self.image_dir]
             self.image_root_dir = Path(self.image_dir).parent
         else:
@@ -186,9 +382,18 @@ class ImageDataset(BaseDataset):
             self.image_root_dir = Path(self.image_dir)
 
     def __len__(self):
+        if self.reader is not None:
+            return len(self.reader)
         return len(self.image_paths)
 
     def __getitem__(self, idx):
+        if self.reader is not None:
+            image_bytes, sample = self.reader.get_sample(idx)
+            image_tensor, image_info = self.transform(decode_image(image_bytes))
+            image_info.image_path = str(self.image_root_dir / sample["image"]["file_name"])
+            image_info.image_rel_path = sample["image"]["file_name"]
+            return image_tensor, image_info
+
         image_path = self.image_paths[idx]
 
         image_tensor, image_info = self.transform(image_path)
@@ -203,16 +408,35 @@ class ImageDataset(BaseDataset):
 
 
 class LabeledDataset(BaseDataset):
+    """Dataset of the labeled images of a Dataset, or of a WEBDATASET export directory.
+    Samples of a WEBDATASET export (images and annotations) are read from its tar shards (sequential reads in order).
+    With cache=True, images of a Dataset are resized once into an ImageCache and read from it afterwards.
+    """
+
     def __init__(
         self,
-        dataset: Dataset,
+        dataset: Union[Dataset, str, Path],
         image_size: Union[int, list[int]],
         letter_box: bool = False,
         set_name: str = None,
+        cache: bool = False,
         **kwargs,
     ):
         super().__init__(image_size, letter_box)
 
+        self.reader = None
+        self.cache = None
+        if isinstance(dataset, (str, Path)):
+            splits = [set_name] if set_name else ["train", "val", "test"]
+            self.reader = WebDatasetReader(
+                dataset,
+                [split for split in splits if split in WebDatasetReader.get_split_list(dataset)],
+            )
+            self.dataset = None
+            self.image_dir = Path(dataset)
+            self.set_name = set_name
+            return
+
         self.dataset = dataset
         self.image_dir = dataset.raw_image_dir
         self.set_name = set_name
@@ -233,20 +457,53 @@ class LabeledDataset(BaseDataset):
             image.image_id: self.dataset.get_annotations(image.image_id) for image in self.images
         }
 
+        if cache:
+            self.cache = ImageCache.load_or_create(
+                self.dataset, self.images, self.set_name, self.image_size, self.letter_box
+            )
+
     def __len__(self):
+        if self.reader is not None:
+            return len(self.reader)
         return len(self.images)
 
     def __getitem__(self, idx):
+        if self.reader is not None:
+            image_bytes, sample = self.reader.get_sample(idx)
+            file_name = sample["image"]["file_name"]
+            annotations = [
+                Annotation.from_trusted_dict(annotation, task=self.reader.task)
+                for annotation in sample["annotations"]
+            ]
+            image_tensor, image_info = self.transform(decode_image(image_bytes))
+            image_info.image_path = str(self.image_dir / file_name)
+            image_info.image_rel_path = file_name
+            return image_tensor, image_info, annotations
+
         image = self.images[idx]
         image_path = str(self.image_dir / image.file_name)
         annotations: list[Annotation] = self.image_to_annotations[image.image_id]
 
-        image_tensor, image_info = self.transform(image_path)
+        if self.cache is not None:
+            resized_image, image_info = self.cache.get(idx)
+            image_tensor = T.ToTensor()(resized_image)
+        else:
+            image_tensor, image_info = self.transform(image_path)
         image_info.image_path = image_path
         image_info.image_rel_path = image.file_name
 
         return image_tensor, image_info, annotations
 
+    def get_annotations(self, idx: int) -> list[Annotation]:
+        """Get the annotations of an item without reading its image."""
+        if self.reader is not None:
+            _, sample = self.reader.get_sample(idx)
+            return [
+                Annotation.from_trusted_dict(annotation, task=self.reader.task)
+                for annotation in sample["annotations"]
+            ]
+        return self.image_to_annotations[self.images[idx].image_id]
+
     def collate_fn(self, batch):
         images, infos, annotations = list(zip(*batch))
         return torch.stack(images, dim=0), infos, annotations
@@ -284,9 +541,20 @@ class VideoDataset(BaseDataset):
         images, infos = list(zip(*batch))
         return torch.stack(images, dim=0), infos
 
-    def get_dataloader(self, batch_size: int = 1, num_workers: int = 0):
+    def get_dataloader(
+        self,
+        batch_size: int = 1,
+        num_workers: int = 0,
+        pin_memory: bool = False,
+        start: int = 0,
+        **kwargs,
+    ):
         if batch_size > 1:
             warnings.warn("batch_size > 1 is not supported for video dataset.")
         if num_workers > 0:
             warnings.warn("num_workers > 0 is not supported for video dataset.")
-        return super().get_dataloader(batch_size=1, num_workers=0)
+        if start > 0:  # frames are read one after another
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        return super().get_dataloader(
+            batch_size=1, num_workers=0, pin_memory=pin_memory, start=start
+        )
@@ -9,6 +9,7 @@ from waffle_utils.image.io import load_image
 
 from waffle_hub import TaskType
 from waffle_hub.schema.fields import Annotation
+from waffle_hub.utils.geometry import decode_rle, mask_to_polygons
 
 FONT_URL = "https://raw.githubusercontent.com/snuailab/assets/main/waffle/fonts/gulim.ttc"
 FONT_NAME = "gulim.ttc"
@@ -115,6 +116,8 @@ def draw_instance_segmentation(
 ):
     image = draw_object_detection(image, annotation, names, score)
     segments: list = annotation.segmentation
+    if isinstance(segments, dict):  # rle (e.g. inference with mask_format="rle")
+        segments = mask_to_polygons(decode_rle(segments))
 
     if len(segments) == 0:
         return image
@@ -124,6 +127,8 @@ def draw_instance_segmentation(
     fill_color = tuple(colors[annotation.category_id - 1])
     fill_color = fill_color + (120,)
     for segment in segments:
+        if len(segment) < 6:  # not a polygon
+            continue
         draw.polygon(
             segment,
             fill=fill_color,
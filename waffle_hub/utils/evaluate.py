@@ -14,6 +14,7 @@ from torchmetrics.classification import (
 from torchmetrics.detection import mean_ap
 
 from waffle_hub import TaskType
+from waffle_hub.schema.data import ParsedResult
 from waffle_hub.schema.evaluate import (
     ClassificationMetric,
     InstanceSegmentationMetric,
@@ -30,7 +31,10 @@ def convert_to_torchmetric_format(total: list[Annotation], task: TaskType, predi
     datas = []
     for annotations in total:
 
-        if task == TaskType.CLASSIFICATION:  # single attribute
+        if isinstance(annotations, ParsedResult):  # read the columns, no Annotation is built
+            datas.append(_convert_parsed_result(annotations, task, prediction))
+
+        elif task == TaskType.CLASSIFICATION:  # single attribute
             datas.append(annotations[0].category_id - 1)
 
         elif task == TaskType.OBJECT_DETECTION:
@@ -83,6 +87,23 @@ def convert_to_torchmetric_format(total: list[Annotation], task: TaskType, predi
     return datas
 
 
+def _convert_parsed_result(result: ParsedResult, task: TaskType, prediction: bool = False):
+    if task == TaskType.CLASSIFICATION:
+        return int(result.category_ids[0]) - 1
+    elif task in [TaskType.OBJECT_DETECTION, TaskType.INSTANCE_SEGMENTATION]:
+        data = {
+            "boxes": result.bboxes.tolist(),
+            "labels": (result.category_ids - 1).tolist(),
+        }
+        if prediction:
+            data["scores"] = result.scores.tolist()
+        return data
+    elif task == TaskType.TEXT_RECOGNITION:
+        return result.caption
+    else:
+        raise NotImplementedError
+
+
 def evaluate_classification(
     preds: list[Annotation], labels: list[Annotation], num_classes: int
 ) -> ClassificationMetric:
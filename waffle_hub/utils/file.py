@@ -0,0 +1,181 @@
+import errno
+import os
+import shutil
+import sys
+import warnings
+from pathlib import Path
+from typing import Union
+
+from waffle_hub import LinkMode
+
+# linux ioctl request of FICLONE (clone a whole file, e.g. btrfs, xfs)
+_FICLONE = 0x40049409
+
+
+def reflink_file(src: Union[str, Path], dst: Union[str, Path]):
+    """Create a copy-on-write clone of a file (reflink).
+    The clone shares data blocks with the source until either of them is modified.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path.
+
+    Raises:
+        OSError: if the platform or the filesystem does not support reflinks.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink is only supported on linux", str(src))
+
+    import fcntl
+
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        try:
+            fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        except OSError:
+            dst_file.close()
+            os.unlink(dst)
+            raise
+
+
+def _is_same_filesystem(src: Union[str, Path], dst: Union[str, Path]) -> bool:
+    try:
+        return os.stat(src).st_dev == os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    except OSError:
+        return False
+
+
+def _put_file(src: Union[str, Path], dst: Union[str, Path], method: str):
+    if method == "reflink":
+        reflink_file(src, dst)
+    elif method == "hardlink":
+        os.link(src, dst)
+    elif method == "symlink":
+        os.symlink(os.path.abspath(src), dst)
+    else:
+        shutil.copy(src, dst)
+
+
+def _put_file_with_fallback(
+    src: Union[str, Path], dst: Union[str, Path], methods: list[str], create_directory: bool
+) -> str:
+    if create_directory:
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    # never write through an existing (linked) destination
+    if os.path.lexists(dst):
+        os.unlink(dst)
+
+    for method in methods:
+        try:
+            _put_file(src, dst, method)
+            return method
+        except OSError:
+            if method == "copy":
+                raise
+    raise OSError(errno.EIO, f"Failed to put file with {methods}", str(src))
+
+
+# fallback chains of each link mode. reflink falls back to copy (not hardlink) to keep files independent.
+_LINK_MODE_METHODS = {
+    LinkMode.COPY: ["copy"],
+    LinkMode.HARDLINK: ["hardlink", "copy"],
+    LinkMode.SYMLINK: ["symlink", "copy"],
+    LinkMode.REFLINK: ["reflink", "copy"],
+}
+
+
+def link_file(
+    src: Union[str, Path],
+    dst: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.COPY,
+    create_directory: bool = False,
+) -> str:
+    """Put a file to the destination with the given link mode.
+    If the platform or the filesystem does not support the link mode (e.g. hardlink across devices,
+    reflink on ext4, symlink without privileges on windows), the file is copied instead.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path. Removed first if it exists, so linked files are never overwritten.
+        link_mode (Union[str, LinkMode], optional): one of "copy", "hardlink", "symlink", "reflink". Defaults to LinkMode.COPY.
+        create_directory (bool, optional): create destination directory or not. Defaults to False.
+
+    Raises:
+        ValueError: if link_mode is invalid.
+
+    Returns:
+        str: the method used. one of "copy", "hardlink", "symlink", "reflink".
+    """
+    if link_mode not in LinkMode:
+        raise ValueError(f"Invalid link_mode: {link_mode}. It should be one of {list(LinkMode)}")
+    methods = _LINK_MODE_METHODS[
+        LinkMode[link_mode.upper()] if isinstance(link_mode, str) else link_mode
+    ]
+
+    method = _put_file_with_fallback(src, dst, methods, create_directory)
+    if method != methods[0]:
+        # same message for every file, so that it is shown once
+        warnings.warn(f"{methods[0]} is not supported by the filesystem. Fall back to {method}.")
+    return method
+
+
+def link_or_copy_file(
+    src: Union[str, Path], dst: Union[str, Path], create_directory: bool = False
+) -> str:
+    """Put a file to the destination as cheap as possible.
+    When the source and the destination share a filesystem, a reflink and then a hardlink are tried.
+    Otherwise (or if both fail), the file is copied.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path. Overwritten if it exists.
+        create_directory (bool, optional): create destination directory or not. Defaults to False.
+
+    Returns:
+        str: the method used. one of "reflink", "hardlink", "copy".
+    """
+    if create_directory:
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    methods = ["reflink", "hardlink", "copy"] if _is_same_filesystem(src, dst) else ["copy"]
+    return _put_file_with_fallback(src, dst, methods, create_directory=False)
+
+
+def clone_file(src: Union[str, Path], dst: Union[str, Path], create_directory: bool = False) -> str:
+    """Put an independent copy of a file to the destination.
+    A copy-on-write clone (reflink) is tried first, so the copy is free on filesystems supporting it.
+    Use it for files that are modified in place (e.g. databases), which must not be hardlinked.
+
+    Args:
+        src (Union[str, Path]): source file path.
+        dst (Union[str, Path]): destination file path. Overwritten if it exists.
+        create_directory (bool, optional): create destination directory or not. Defaults to False.
+
+    Returns:
+        str: the method used. one of "reflink", "copy".
+    """
+    return _put_file_with_fallback(src, dst, ["reflink", "copy"], create_directory)
+
+
+def link_directory(
+    src_dir: Union[str, Path],
+    dst_dir: Union[str, Path],
+    link_mode: Union[str, LinkMode] = LinkMode.HARDLINK,
+) -> int:
+    """Put every file of a directory tree to the destination directory with the given link mode.
+    See link_file for the fallbacks. Nothing is done if the source directory does not exist.
+
+    Args:
+        src_dir (Union[str, Path]): source directory.
+        dst_dir (Union[str, Path]): destination directory. Created if it does not exist.
+        link_mode (Union[str, LinkMode], optional): one of "copy", "hardlink", "symlink", "reflink". Defaults to LinkMode.HARDLINK.
+
+    Returns:
+        int: the number of files.
+    """
+    num_files = 0
+    for root, _, files in os.walk(src_dir):
+        dst_root = os.path.join(dst_dir, os.path.relpath(root, src_dir))
+        os.makedirs(dst_root, exist_ok=True)
+        for file in files:
+            link_file(os.path.join(root, file), os.path.join(dst_root, file), link_mode)
+            num_files += 1
+    return num_files
@@ -0,0 +1,246 @@
+"""NumPy geometry kernels for annotations.
+
+Coordinates follow the waffle conventions:
+    bbox: [x1, y1, w, h] in pixels
+    yolo bbox: [cx, cy, w, h] normalized by the image size
+    polygon: [x1, y1, x2, y2, ...] in pixels, a segmentation is a list of polygons
+    mask: uint8 array of shape (H, W) (or (N, H, W) for a batch)
+    rle: coco run-length encoding {"size": [H, W], "counts": ...}
+
+Every function takes a batch at once, so loops over annotations or points stay in NumPy.
+"""
+from typing import Union
+
+import cv2
+import numpy as np
+from pycocotools import mask as mask_utils
+
+
+def _flatten_polygons(polygons: list[list[float]]) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenate polygons to a (P, 2) point array, with the start index of each polygon."""
+    lengths = np.fromiter(
+        (len(polygon) // 2 for polygon in polygons), dtype=np.int64, count=len(polygons)
+    )
+    starts = np.zeros(len(polygons), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    if lengths.sum() == 0:
+        return np.zeros((0, 2), dtype=np.float64), starts
+    points = np.concatenate(
+        [
+            np.asarray(polygon, dtype=np.float64)[: length * 2]
+            for polygon, length in zip(polygons, lengths)
+        ]
+    ).reshape(-1, 2)
+    return points, starts
+
+
+def polygon_areas(polygons: list[list[float]]) -> np.ndarray:
+    """Area of each polygon (shoelace formula). Polygons with less than 3 points have no area.
+
+    Args:
+        polygons (list[list[float]]): polygons [x1, y1, x2, y2, ...].
+
+    Returns:
+        np.ndarray: (N,) areas.
+    """
+    if len(polygons) == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    points, starts = _flatten_polygons(polygons)
+    lengths = np.diff(np.append(starts, len(points)))
+    if len(points) == 0:
+        return np.zeros(len(polygons), dtype=np.float64)
+
+    # next point of each point, wrapping around inside its own polygon
+    next_index = np.arange(1, len(points) + 1)
+    ends = starts + lengths - 1
+    valid = lengths > 0
+    next_index[ends[valid]] = starts[valid]
+
+    x, y = points[:, 0], points[:, 1]
+    cross = x * y[next_index] - x[next_index] * y
+
+    areas = np.zeros(len(polygons), dtype=np.float64)
+    areas[valid] = np.abs(np.add.reduceat(cross, starts[valid])) / 2
+    areas[lengths < 3] = 0.0
+    return areas
+
+
+def segmentation_area(segmentation: list[list[float]]) -> float:
+    """Area of a segmentation (sum of the areas of its polygons)."""
+    return float(polygon_areas(segmentation).sum())
+
+
+def segmentation_bbox(segmentation: list[list[float]]) -> list[float]:
+    """Bounding box [x1, y1, w, h] of a segmentation."""
+    points, _ = _flatten_polygons(segmentation)
+    if len(points) == 0:
+        raise ValueError("segmentation has no point.")
+    x1, y1 = points.min(axis=0)
+    x2, y2 = points.max(axis=0)
+    return [float(x1), float(y1), float(x2 - x1), float(y2 - y1)]
+
+
+def normalize_bboxes(bboxes: Union[list, np.ndarray], width: float, height: float) -> np.ndarray:
+    """Convert bboxes [x1, y1, w, h] in pixels to yolo bboxes [cx, cy, w, h] normalized by the image size.
+
+    Args:
+        bboxes (Union[list, np.ndarray]): (N, 4) bboxes.
+        width (float): image width.
+        height (float): image height.
+
+    Returns:
+        np.ndarray: (N, 4) yolo bboxes.
+    """
+    bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4) / [width, height, width, height]
+    bboxes[:, :2] += bboxes[:, 2:] / 2
+    return bboxes
+
+
+def denormalize_bboxes(bboxes: Union[list, np.ndarray], width: float, height: float) -> np.ndarray:
+    """Convert yolo bboxes [cx, cy, w, h] normalized by the image size to bboxes [x1, y1, w, h] in pixels.
+
+    Args:
+        bboxes (Union[list, np.ndarray]): (N, 4) yolo bboxes.
+        width (float): image width.
+        height (float): image height.
+
+    Returns:
+        np.ndarray: (N, 4) bboxes.
+    """
+    bboxes = np.array(bboxes, dtype=np.float64).reshape(-1, 4)
+    bboxes[:, :2] -= bboxes[:, 2:] / 2
+    return bboxes * [width, height, width, height]
+
+
+def normalize_polygon(polygon: Union[list, np.ndarray], width: float, height: float) -> np.ndarray:
+    """Divide the x and y coordinates of a polygon [x1, y1, x2, y2, ...] by the image width and height."""
+    return (np.asarray(polygon, dtype=np.float64).reshape(-1, 2) / [width, height]).reshape(-1)
+
+
+def normalize_polygons(
+    polygons: list[list[float]], width: float, height: float
+) -> list[list[float]]:
+    """normalize_polygon over many polygons with a single array operation."""
+    if len(polygons) == 0:
+        return []
+    points, starts = _flatten_polygons(polygons)
+    points = (points / [width, height]).reshape(-1).tolist()
+    ends = list(starts[1:] * 2) + [len(points)]
+    return [points[start * 2 : end] for start, end in zip(starts.tolist(), ends)]
+
+
+def denormalize_polygon(polygon: Union[list, np.ndarray], width: float, height: float) -> np.ndarray:
+    """Multiply the x and y coordinates of a polygon [x1, y1, x2, y2, ...] by the image width and height."""
+    return (np.asarray(polygon, dtype=np.float64).reshape(-1, 2) * [width, height]).reshape(-1)
+
+
+def mask_to_polygons(mask: np.ndarray, offset: tuple[int, int] = (0, 0)) -> list[list]:
+    """Outer contours of a binary mask as polygons [x1, y1, x2, y2, ...].
+
+    Args:
+        mask (np.ndarray): (H, W) mask. Non-zero pixels are foreground.
+        offset (tuple[int, int], optional): (x, y) added to every point, e.g. the position of a mask crop
+            in its image. Defaults to (0, 0).
+
+    Returns:
+        list[list]: polygons.
+    """
+    mask = np.ascontiguousarray(mask, dtype=np.uint8)
+    contours, _ = cv2.findContours(
+        mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=tuple(map(int, offset))
+    )
+    return [contour.reshape(-1).tolist() for contour in contours]
+
+
+def encode_rle(masks: np.ndarray) -> list[dict]:
+    """Encode masks to compressed coco RLEs.
+
+    Args:
+        masks (np.ndarray): (N, H, W) or (H, W) masks.
+
+    Returns:
+        list[dict]: RLE of each mask. "counts" is a str (compressed), so that it is json serializable.
+    """
+    masks = np.asarray(masks, dtype=np.uint8)
+    if masks.ndim == 2:
+        masks = masks[None]
+    rles = mask_utils.encode(np.asfortranarray(masks.transpose(1, 2, 0)))
+    for rle in rles:
+        rle["counts"] = rle["counts"].decode("ascii")
+    return rles
+
+
+def encode_rle_crop(crop: np.ndarray, offset: tuple[int, int], width: int, height: int) -> dict:
+    """Encode a mask crop placed in a larger, otherwise empty, image to a compressed coco RLE,
+    without building the image size mask.
+
+    Args:
+        crop (np.ndarray): (h, w) mask crop. Non-zero pixels are foreground.
+        offset (tuple[int, int]): (x, y) position of the crop in the image.
+        width (int): image width.
+        height (int): image height.
+
+    Returns:
+        dict: RLE of the image size mask, "counts" is a str (compressed).
+    """
+    x, y = map(int, offset)
+    h, w = crop.shape
+    if x < 0 or y < 0 or x + w > width or y + h > height:
+        raise ValueError(f"crop {w}x{h} at {(x, y)} is out of the image {width}x{height}.")
+
+    # only the columns of the crop have foreground pixels, runs are counted column by column (fortran order)
+    columns = np.zeros((height, w), dtype=bool)
+    columns[y : y + h] = crop != 0
+    values = columns.ravel(order="F")
+
+    if len(values) == 0:
+        counts = np.zeros(1, dtype=np.int64)
+    else:
+        changes = np.flatnonzero(values[1:] != values[:-1]) + 1
+        counts = np.diff(np.concatenate([[0], changes, [len(values)]]))
+        if values[0]:  # runs start with background
+            counts = np.concatenate([[0], counts])
+    counts[0] += x * height
+    trailing = (width - x - w) * height
+    if len(counts) % 2 == 1:  # ends with background
+        counts[-1] += trailing
+    elif trailing > 0:
+        counts = np.append(counts, trailing)
+
+    rle = mask_utils.frPyObjects({"size": [height, width], "counts": counts.tolist()}, height, width)
+    rle["counts"] = rle["counts"].decode("ascii")
+    return rle
+
+
+def decode_rle(rles: Union[dict, list[dict]]) -> np.ndarray:
+    """Decode coco RLEs (compressed or not) to masks.
+
+    Args:
+        rles (Union[dict, list[dict]]): RLE or RLEs of the same size.
+
+    Returns:
+        np.ndarray: (N, H, W) uint8 masks ((H, W) for a single RLE).
+    """
+    single = isinstance(rles, dict)
+    if single:
+        rles = [rles]
+    if len(rles) == 0:
+        return np.zeros((0, 0, 0), dtype=np.uint8)
+
+    height, width = rles[0]["size"]
+    encoded = []
+    for rle in rles:
+        if isinstance(rle["counts"], list):  # uncompressed
+            encoded.append(mask_utils.frPyObjects(rle, height, width))
+        else:
+            counts = rle["counts"]
+            encoded.append(
+                {
+                    "size": rle["size"],
+                    "counts": counts.encode("ascii") if isinstance(counts, str) else counts,
+                }
+            )
+
+    masks = mask_utils.decode(encoded).transpose(2, 0, 1)
+    return masks[0] if single else masks
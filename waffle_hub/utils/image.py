@@ -0,0 +1,39 @@
+from pathlib import Path
+from typing import Union
+
+from PIL import Image as PILImage
+from waffle_utils.image.io import load_image
+
+# exif orientations rotating the image by 90 or 270 degrees (width and height are swapped when decoded)
+_EXIF_ORIENTATION_TAG = 0x0112
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def get_image_size(image_path: Union[str, Path]) -> tuple[int, int]:
+    """Get the size of an image by reading its header only, without decoding the pixels.
+    The exif orientation is applied, so the size is the same as the shape of the decoded image (load_image).
+    Falls back to decoding the image if the header can not be parsed.
+
+    Args:
+        image_path (Union[str, Path]): image file path.
+
+    Raises:
+        ValueError: if the file is not an image.
+
+    Returns:
+        tuple[int, int]: (width, height)
+    """
+    try:
+        with PILImage.open(image_path) as image:
+            width, height = image.size
+            if image.getexif().get(_EXIF_ORIENTATION_TAG) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            return width, height
+    except (OSError, SyntaxError):  # unknown or broken header
+        pass
+
+    image = load_image(image_path)
+    if image is None:
+        raise ValueError(f"{image_path} is not an image file.")
+    height, width = image.shape[:2]
+    return width, height
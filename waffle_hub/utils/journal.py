@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressJournal:
+    """Append-only journal (jsonl) of the progress of a long running task over an ordered list of items
+    (e.g. the images of an inference), to resume it after a crash.
+
+    The first line is the header {"config": ..., "total": ...}. Every other line is a checkpoint
+    {"done": number of items done from the start, ...} appended after the outputs of these items are flushed,
+    so a checkpoint never points at outputs that are not on disk. A line cut by a crash is ignored.
+
+    Args:
+        file (Union[str, Path]): journal file.
+        config (dict): config of the task (values that are not json serializable are compared as str).
+            A journal of another config is not resumed.
+        total (int): total number of items. A journal of another total (e.g. the source has changed) is not resumed.
+
+    Example:
+        >>> journal = ProgressJournal("progress.jsonl", config, total=len(dataset))
+        >>> checkpoint = journal.load()  # None if there is nothing to resume
+        >>> start = checkpoint["done"] if checkpoint else 0
+        >>> journal.open(resume=checkpoint is not None)
+        >>> for ...:
+        ...     journal.checkpoint(done, writer=writer.get_state())
+        >>> journal.close()
+    """
+
+    def __init__(self, file: Union[str, Path], config: dict, total: int):
+        self.file = Path(file)
+        self.header = json.loads(json.dumps({"config": config, "total": total}, default=str))
+        self._f = None
+        self._size = None  # size of the complete lines of the loaded journal
+
+    def load(self) -> dict:
+        """Get the last checkpoint of the journal.
+
+        Returns:
+            dict: last checkpoint. None if there is no journal, or if it is of another config or total.
+        """
+        if not self.file.exists():
+            return None
+
+        checkpoint = None
+        size = 0
+        with open(self.file, "rb") as f:
+            for i, line in enumerate(f):
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # cut by a crash
+                size += len(line)
+                if i == 0:
+                    if entry != self.header:
+                        logger.warning(
+                            f"{self.file} is of another config or source, it is not resumed."
+                        )
+                        return None
+                else:
+                    checkpoint = entry
+        self._size = size
+
+        if checkpoint is not None:
+            logger.info(f"resume from {self.file}: {checkpoint['done']}/{self.header['total']}")
+        return checkpoint
+
+    def open(self, resume: bool = False):
+        """Open the journal to append checkpoints.
+
+        Args:
+            resume (bool, optional): keep the checkpoints of the journal (see load). Defaults to False (start over).
+        """
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        if resume:
+            if self._size is None:
+                self.load()
+            os.truncate(self.file, self._size)  # drop a line cut by a crash
+            self._f = open(self.file, "a", encoding="utf-8")
+        else:
+            self._f = open(self.file, "w", encoding="utf-8")
+            self._write(self.header)
+
+    def checkpoint(self, done: int, **state):
+        """Append a checkpoint. Call it after the outputs of the done items are flushed.
+
+        Args:
+            done (int): number of items done from the start.
+            **state: json serializable state needed to resume (e.g. the size of an output file).
+        """
+        self._write({"done": done, **state})
+
+    def close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _write(self, entry: dict):
+        self._f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._f.flush()
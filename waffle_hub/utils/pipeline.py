@@ -0,0 +1,222 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PIPELINE_WORKERS = min(4, os.cpu_count() or 1)
+
+_END = object()
+_PUT_TIMEOUT = 0.1
+
+
+class StageStats:
+    """Throughput and queue depth of a pipeline stage.
+
+    Args:
+        name (str): stage name.
+        workers (int): number of worker threads of the stage.
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_time = 0.0
+        self.queue_depth_sum = 0
+        self.max_queue_depth = 0
+        self.queue_samples = 0
+        self.start_time = None
+        self.end_time = None
+        self._lock = threading.Lock()
+
+    def add_item(self, busy_time: float):
+        with self._lock:
+            self.items += 1
+            self.busy_time += busy_time
+
+    def add_queue_depth(self, depth: int):
+        with self._lock:
+            self.queue_samples += 1
+            self.queue_depth_sum += depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def to_dict(self) -> dict:
+        """Get the stats.
+
+        Returns:
+            dict: name, workers, items, throughput (items per second of the pipeline run),
+                capacity (items per second the stage could do if it was never waiting),
+                utilization (busy time over the available worker time, 1.0 is the bottleneck),
+                and the mean and max number of items waiting in the input queue of the stage.
+        """
+        end_time = self.end_time or time.time()
+        elapsed = end_time - self.start_time if self.start_time is not None else 0.0
+        return {
+            "name": self.name,
+            "workers": self.workers,
+            "items": self.items,
+            "throughput": self.items / elapsed if elapsed > 0 else 0.0,
+            "capacity": self.items * self.workers / self.busy_time if self.busy_time > 0 else None,
+            "utilization": self.busy_time / (elapsed * self.workers) if elapsed > 0 else 0.0,
+            "mean_queue_depth": (
+                self.queue_depth_sum / self.queue_samples if self.queue_samples else 0.0
+            ),
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+class Pipeline:
+    """Run the items of a source through stages, each with its own worker threads, connected by bounded queues.
+    Stages overlap (e.g. decoding the next batch while the model runs on the current one),
+    and a full queue blocks the stage before it, so memory stays bounded by the slowest stage.
+    Items come out in the source order. An exception in a stage is raised when its item is reached.
+
+    {source} -> queue -> {stage 1} -> queue -> {stage 2} -> ... -> iteration
+
+    Args:
+        source (Iterable): source of the items (e.g. a DataLoader). It is iterated in its own thread.
+        stages (list[tuple[str, Callable, int]]): (name, function, number of worker threads) of each stage.
+            A function takes the output of the previous stage. Use 1 worker for stages that must run one item at a time.
+        queue_size (int, optional): maximum number of items waiting between two stages.
+            Defaults to None (twice the number of workers of the next stage).
+
+    Example:
+        >>> pipeline = Pipeline(dataloader, [("model", model, 1), ("postprocess", parser, 4)])
+        >>> for results in pipeline:
+        ...     write(results)
+        >>> pipeline.get_stats()
+        [{"name": "load", "throughput": 120.3, "utilization": 0.98, ...}, ...]
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: list[tuple[str, Callable, int]],
+        queue_size: int = None,
+        source_name: str = "load",
+    ):
+        self.source = source
+        self.stages = [(name, fn, max(1, workers)) for name, fn, workers in stages]
+        self.queue_size = queue_size
+
+        self.stats = [StageStats(source_name, 1)] + [
+            StageStats(name, workers) for name, _, workers in self.stages
+        ]
+        self._stop = threading.Event()
+
+    def get_stats(self) -> list[dict]:
+        """Get the stats of every stage, from the source to the last stage. See StageStats.to_dict."""
+        return [stats.to_dict() for stats in self.stats]
+
+    def get_bottleneck(self) -> str:
+        """Get the name of the stage with the highest utilization."""
+        return max(self.stats, key=lambda stats: stats.to_dict()["utilization"]).name
+
+    def _put(self, q: queue.Queue, item: Any) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run_source(self, out_queue: queue.Queue, stats: StageStats):
+        stats.start_time = time.time()
+        iterator = iter(self.source)
+        try:
+            while not self._stop.is_set():
+                start = time.time()
+                future = Future()
+                try:
+                    future.set_result(next(iterator))
+                except StopIteration:
+                    break
+                except Exception as e:
+                    future.set_exception(e)
+                stats.add_item(time.time() - start)
+                if not self._put(out_queue, future) or future.exception() is not None:
+                    break
+        finally:
+            stats.end_time = time.time()
+            self._put(out_queue, _END)
+
+    def _run_stage(
+        self,
+        fn: Callable,
+        executor: ThreadPoolExecutor,
+        in_queue: queue.Queue,
+        out_queue: queue.Queue,
+        stats: StageStats,
+    ):
+        def _run(future: Future):
+            item = future.result()  # waits for the previous stage, re-raises its exception
+            start = time.time()
+            output = fn(item)
+            stats.add_item(time.time() - start)
+            return output
+
+        stats.start_time = time.time()
+        try:
+            while True:
+                stats.add_queue_depth(in_queue.qsize())
+                future = in_queue.get()
+                if future is _END:
+                    break
+                if not self._put(out_queue, executor.submit(_run, future)):
+                    break
+        finally:
+            executor.shutdown(wait=True)
+            stats.end_time = time.time()
+            self._put(out_queue, _END)
+
+    def __iter__(self) -> Iterator:
+        self._stop.clear()
+        queues = [
+            queue.Queue(maxsize=self.queue_size or 2 * workers) for _, _, workers in self.stages
+        ]
+        queues.append(queue.Queue(maxsize=self.queue_size or 2))  # to the iteration
+
+        threads = [
+            threading.Thread(target=self._run_source, args=(queues[0], self.stats[0]), daemon=True)
+        ]
+        for i, (name, fn, workers) in enumerate(self.stages):
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+            threads.append(
+                threading.Thread(
+                    target=self._run_stage,
+                    args=(fn, executor, queues[i], queues[i + 1], self.stats[i + 1]),
+                    daemon=True,
+                )
+            )
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                future = queues[-1].get()
+                if future is _END:
+                    break
+                yield future.result()
+        finally:
+            self._stop.set()
+            # unblock the stages waiting for a free slot or an item (on an early break or an exception)
+            for q in queues:
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                try:
+                    q.put_nowait(_END)
+                except queue.Full:
+                    pass
+            for thread in threads:
+                thread.join()
+
+        logger.debug(f"pipeline stats: {self.get_stats()}")
@@ -0,0 +1,335 @@
+"""Incremental writers and lazy readers of inference predictions.
+
+A prediction is {image relative path: [annotation dict, ...]} (see ParsedResult.to_dicts).
+Writers append the predictions of every batch and flush them, so memory does not grow with the number of images,
+and the predictions written before a crash are kept.
+
+    json: [{path: [...]}, ...]
+    jsonl: {path: [...]} per line
+    coco: [{"image_id": 1, "file_name": path, "category_id": 1, "bbox": [...], "score": 0.9, ...}, ...]
+        (coco results format, one element per annotation, images without annotation are not written)
+    parquet: rows of (file_name, predictions (json)), one row group per batch (needs pyarrow)
+"""
+import json
+from pathlib import Path
+from typing import Iterator, Union
+
+from waffle_hub import PredictionFormat
+from waffle_hub.utils.stream import iter_json_array
+
+PREDICTION_FILE_NAMES = {
+    PredictionFormat.JSON: "inferences.json",
+    PredictionFormat.JSONL: "inferences.jsonl",
+    PredictionFormat.COCO: "inferences.coco.json",
+    PredictionFormat.PARQUET: "inferences.parquet",
+}
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "parquet predictions need pyarrow. Install it with `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+class PredictionWriter:
+    """Base class of the prediction writers. Use get_prediction_writer to create one.
+
+    Args:
+        file (Union[str, Path]): output file. Its directory is created if needed.
+        state (dict, optional): state of a previous writer of the file (see get_state), to resume writing
+            after the predictions written until then. Defaults to None (new file).
+    """
+
+    def __init__(self, file: Union[str, Path], state: dict = None):
+        self.file = Path(file)
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.num_images = state["num_images"] if state else 0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def write(self, predictions: list[dict]):
+        """Write and flush the predictions of a batch.
+
+        Args:
+            predictions (list[dict]): [{image relative path: [annotation dict, ...]}, ...]
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.file} is already closed.")
+        self._write(predictions)
+        self.num_images += len(predictions)
+
+    def get_state(self) -> dict:
+        """Get the state after the last write, to resume writing later (e.g. after a crash)."""
+        return {"num_images": self.num_images}
+
+    def close(self):
+        """Finish the file. The writer can not be used after."""
+        if not self._closed:
+            self._closed = True
+            self._close()
+
+    def _write(self, predictions: list[dict]):
+        raise NotImplementedError
+
+    def _close(self):
+        raise NotImplementedError
+
+
+class _TextPredictionWriter(PredictionWriter):
+    """Text file between a header and a footer. A resumed file is cut at the offset of its state,
+    which drops the footer and anything written after the state was taken."""
+
+    HEADER = ""
+    FOOTER = ""
+
+    def __init__(self, file: Union[str, Path], state: dict = None):
+        super().__init__(file, state)
+        if state is None:
+            self.f = open(self.file, "wb")
+            self.f.write(self.HEADER.encode())
+        else:
+            self.f = open(self.file, "r+b")
+            self.f.truncate(state["offset"])
+            self.f.seek(state["offset"])
+
+    def get_state(self) -> dict:
+        return {**super().get_state(), "offset": self.f.tell()}
+
+    def _write_text(self, text: str):
+        self.f.write(text.encode("utf-8"))
+        self.f.flush()
+
+    def _close(self):
+        self.f.write(self.FOOTER.encode())
+        self.f.close()
+
+
+class JsonPredictionWriter(_TextPredictionWriter):
+    HEADER = "["
+    FOOTER = "]"
+
+    def _write(self, predictions: list[dict]):
+        chunks = [_dumps(prediction) for prediction in predictions]
+        if chunks:
+            self._write_text(("," if self.num_images else "") + ",".join(chunks))
+
+
+class JsonlPredictionWriter(_TextPredictionWriter):
+    def _write(self, predictions: list[dict]):
+        self._write_text("".join(_dumps(prediction) + "\n" for prediction in predictions))
+
+
+class CocoPredictionWriter(_TextPredictionWriter):
+    """Write the coco results format. Image ids are given in order from 1."""
+
+    HEADER = "["
+    FOOTER = "]"
+
+    def __init__(self, file: Union[str, Path], state: dict = None):
+        super().__init__(file, state)
+        self.num_annotations = state["num_annotations"] if state else 0
+
+    def get_state(self) -> dict:
+        return {**super().get_state(), "num_annotations": self.num_annotations}
+
+    def _write(self, predictions: list[dict]):
+        chunks = []
+        for i, prediction in enumerate(predictions, start=self.num_images + 1):
+            for file_name, annotations in prediction.items():
+                for annotation in annotations:
+                    annotation = {"image_id": i, "file_name": file_name, **annotation}
+                    chunks.append(("," if self.num_annotations else "") + _dumps(annotation))
+                    self.num_annotations += 1
+        self._write_text("".join(chunks))
+
+
+class ParquetPredictionWriter(PredictionWriter):
+    """Write a parquet file. It can not be resumed, its footer is only written when it is closed."""
+
+    def __init__(self, file: Union[str, Path], state: dict = None):
+        if state is not None:
+            raise ValueError("parquet predictions can not be resumed. Use json, jsonl or coco.")
+        pa = _import_pyarrow()
+        super().__init__(file)
+        self.schema = pa.schema([("file_name", pa.string()), ("predictions", pa.string())])
+        self.writer = pa.parquet.ParquetWriter(str(self.file), self.schema)
+
+    def get_state(self) -> dict:
+        return None
+
+    def _write(self, predictions: list[dict]):
+        pa = _import_pyarrow()
+        file_names, values = [], []
+        for prediction in predictions:
+            for file_name, annotations in prediction.items():
+                file_names.append(file_name)
+                values.append(_dumps(annotations))
+        self.writer.write_table(
+            pa.table({"file_name": file_names, "predictions": values}, schema=self.schema)
+        )
+
+    def _close(self):
+        self.writer.close()
+
+
+_WRITERS = {
+    PredictionFormat.JSON: JsonPredictionWriter,
+    PredictionFormat.JSONL: JsonlPredictionWriter,
+    PredictionFormat.COCO: CocoPredictionWriter,
+    PredictionFormat.PARQUET: ParquetPredictionWriter,
+}
+
+
+def get_prediction_writer(
+    output_format: Union[str, PredictionFormat], output_dir: Union[str, Path], state: dict = None
+) -> PredictionWriter:
+    """Create a prediction writer of a format, writing {output_dir}/{PREDICTION_FILE_NAMES[output_format]}.
+
+    Args:
+        output_format (Union[str, PredictionFormat]): "json", "jsonl", "coco" or "parquet".
+        output_dir (Union[str, Path]): output directory.
+        state (dict, optional): state of a previous writer of the file (see PredictionWriter.get_state)
+            to resume from. Defaults to None (new file).
+
+    Raises:
+        ValueError: if the format is not supported, or if a parquet file is resumed.
+
+    Returns:
+        PredictionWriter: writer
+    """
+    if output_format not in list(PredictionFormat):
+        raise ValueError(
+            f"Invalid output format: {output_format}. Available formats: {list(PredictionFormat)}"
+        )
+    output_format = PredictionFormat[str(output_format).upper()]
+    return _WRITERS[output_format](Path(output_dir) / PREDICTION_FILE_NAMES[output_format], state)
+
+
+def get_prediction_format(file: Union[str, Path]) -> PredictionFormat:
+    """Get the format of a prediction file from its name.
+
+    Raises:
+        ValueError: if the file is not a prediction file.
+    """
+    name = Path(file).name
+    for output_format, file_name in sorted(
+        PREDICTION_FILE_NAMES.items(), key=lambda item: -len(item[1])
+    ):
+        if name.endswith(file_name[len("inferences") :]):
+            return output_format
+    raise ValueError(f"{file} is not a prediction file. Available files: {PREDICTION_FILE_NAMES}")
+
+
+def get_prediction_files(output_dir: Union[str, Path]) -> list[Path]:
+    """Get the prediction files written in a directory."""
+    output_dir = Path(output_dir)
+    return [
+        output_dir / file_name
+        for file_name in PREDICTION_FILE_NAMES.values()
+        if (output_dir / file_name).exists()
+    ]
+
+
+def iter_predictions(file: Union[str, Path]) -> Iterator[dict]:
+    """Iterate the predictions of a prediction file one image at a time.
+
+    Args:
+        file (Union[str, Path]): prediction file (see PREDICTION_FILE_NAMES).
+
+    Yields:
+        Iterator[dict]: {image relative path: [annotation dict, ...]}
+    """
+    output_format = get_prediction_format(file)
+    if output_format == PredictionFormat.JSON:
+        yield from iter_json_array(file)
+    elif output_format == PredictionFormat.JSONL:
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif output_format == PredictionFormat.COCO:
+        image_id, file_name, annotations = None, None, []
+        for annotation in iter_json_array(file):
+            if annotation["image_id"] != image_id:
+                if image_id is not None:
+                    yield {file_name: annotations}
+                image_id, file_name, annotations = (
+                    annotation["image_id"],
+                    annotation["file_name"],
+                    [],
+                )
+            annotation = {k: v for k, v in annotation.items() if k not in ["image_id", "file_name"]}
+            annotations.append(annotation)
+        if image_id is not None:
+            yield {file_name: annotations}
+    elif output_format == PredictionFormat.PARQUET:
+        pa = _import_pyarrow()
+        for batch in pa.parquet.ParquetFile(str(file)).iter_batches():
+            for file_name, annotations in zip(
+                batch.column("file_name").to_pylist(), batch.column("predictions").to_pylist()
+            ):
+                yield {file_name: json.loads(annotations)}
+
+
+class PredictionReader:
+    """Lazy sequence of the predictions of a prediction file (see iter_predictions).
+    Iterating reads one image at a time. Indexing loads every prediction once and keeps them.
+
+    Args:
+        file (Union[str, Path]): prediction file.
+
+    Example:
+        >>> predictions = PredictionReader("inferences.jsonl")
+        >>> len(predictions)
+        10000000
+        >>> for prediction in predictions:
+        ...     print(prediction)
+        {"relative/path/to/image/file": [{"category_id": 1, "bbox": [0, 0, 100, 100], "score": 0.9}, ...]}
+    """
+
+    def __init__(self, file: Union[str, Path]):
+        self.file = Path(file)
+        self.format = get_prediction_format(self.file)
+        self._len = None
+        self._predictions = None
+
+    def __repr__(self):
+        return f"PredictionReader(file={self.file})"
+
+    def __iter__(self) -> Iterator[dict]:
+        if self._predictions is not None:
+            return iter(self._predictions)
+        return iter_predictions(self.file)
+
+    def __len__(self) -> int:
+        if self._len is None:
+            if self._predictions is not None:
+                self._len = len(self._predictions)
+            elif self.format == PredictionFormat.PARQUET:
+                self._len = _import_pyarrow().parquet.ParquetFile(str(self.file)).metadata.num_rows
+            else:
+                self._len = sum(1 for _ in iter_predictions(self.file))
+        return self._len
+
+    def __getitem__(self, idx):
+        return self.to_list()[idx]
+
+    def to_list(self) -> list[dict]:
+        """Load every prediction."""
+        if self._predictions is None:
+            self._predictions = list(iter_predictions(self.file))
+        return self._predictions
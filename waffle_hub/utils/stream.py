@@ -0,0 +1,145 @@
+import json
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class _JsonStreamReader:
+    """Buffered reader that decodes json values one by one from a text file."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self) -> bool:
+        if self.eof:
+            return False
+        # grow geometrically while a single value is larger than the chunk size
+        chunk = self.f.read(max(self.chunk_size, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespaces and return the next character ("" at the end of the file)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"Invalid json: expected one of {list(chars)}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next json value.
+        A value is accepted only if it is followed by a delimiter in the buffer (or at the end of the file),
+        so that numbers cut at the chunk boundary (e.g. "12." of "12.75") are never decoded partially.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in _DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read_more()  # at the end of the file, decode once more without the delimiter check
+
+
+def iter_json_object(
+    json_file: Union[str, Path], stream_keys: list[str] = None, chunk_size: int = 1 << 20
+) -> Iterator[tuple[str, Any]]:
+    """Iterate a json object file incrementally with bounded memory.
+    Values of the top level keys are yielded as (key, value).
+    For keys in stream_keys whose value is an array, every element is yielded as (key, element)
+    instead of the whole array, so huge arrays (e.g. coco "annotations") are never loaded at once.
+
+    Args:
+        json_file (Union[str, Path]): json file path. The top level value should be an object.
+        stream_keys (list[str], optional): keys of the arrays to stream element by element. Defaults to None.
+        chunk_size (int, optional): number of characters read at once. Defaults to 1MB.
+
+    Raises:
+        ValueError: if the file is not a json object.
+
+    Example:
+        >>> for key, value in iter_json_object("coco.json", stream_keys=["images", "annotations"]):
+        >>>     if key == "annotations":
+        >>>         print(value["id"])  # one annotation at a time
+        >>>     elif key == "categories":
+        >>>         print(len(value))  # whole categories list
+
+    Yields:
+        Iterator[tuple[str, Any]]: (key, value or array element)
+    """
+    stream_keys = set(stream_keys or [])
+
+    with open(json_file, encoding="utf-8") as f:
+        reader = _JsonStreamReader(f, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+
+        while True:
+            key = reader.value()
+            if not isinstance(key, str):
+                raise ValueError(f"Invalid json: object key should be string, got {key!r}")
+            reader.expect(":")
+
+            if key in stream_keys and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield key, reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            else:
+                yield key, reader.value()
+
+            if reader.expect(",}") == "}":
+                break
+
+
+def iter_json_array(json_file: Union[str, Path], chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """Iterate the elements of a json array file incrementally with bounded memory.
+
+    Args:
+        json_file (Union[str, Path]): json file path. The top level value should be an array.
+        chunk_size (int, optional): number of characters read at once. Defaults to 1MB.
+
+    Raises:
+        ValueError: if the file is not a json array.
+
+    Yields:
+        Iterator[Any]: array element
+    """
+    with open(json_file, encoding="utf-8") as f:
+        reader = _JsonStreamReader(f, chunk_size)
+        reader.expect("[")
+        if reader.peek() == "]":
+            return
+
+        while True:
+            yield reader.value()
+            if reader.expect(",]") == "]":
+                break